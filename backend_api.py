@@ -1,12 +1,36 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_file, abort
 from flask_cors import CORS
 import pandas as pd
 import numpy as np
 import re
 from pathlib import Path
 import tempfile
+import io
+import shutil
+import zipfile
+import csv
+import gzip
+import zlib
+import xml.etree.ElementTree as ET
+import itertools
+import mimetypes
+import contextlib
 import os
+import sys
+import sqlite3
+import json
+import hashlib
+import threading
+import contextvars
+import multiprocessing
+from collections import OrderedDict
 import traceback
+import time
+import random
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from functools import lru_cache
+from pandas._libs.parsers import STR_NA_VALUES
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
 from supabase import create_client
@@ -30,35 +54,199 @@ if supabase_url and supabase_key:
 else:
     print("[WARNING] Supabase credentials not found in environment variables")
 
-
-app = Flask(__name__, static_folder='dist', static_url_path='')
+# Table reads and writes go through rest_client: the Supabase client, or a
+# plain PostgREST endpoint (e.g. a local stand-in) when POSTGREST_URL is set
+rest_client = supabase
+postgrest_url = os.getenv('POSTGREST_URL')
+if postgrest_url:
+    from postgrest import SyncPostgrestClient
+    postgrest_headers = {"Accept": "application/json", "Content-Type": "application/json"}
+    if os.getenv('POSTGREST_TOKEN'):
+        postgrest_headers["Authorization"] = f"Bearer {os.getenv('POSTGREST_TOKEN')}"
+    rest_client = SyncPostgrestClient(postgrest_url.rstrip('/'), headers=postgrest_headers)
+    print(f"[INFO] Using PostgREST endpoint {postgrest_url} for table access")
+
+
+# The React build is served by StaticAssets below, not Flask's static route
+app = Flask(__name__, static_folder=None)
 CORS(app)  # Enable CORS for frontend communication
 
 # Configuration
-UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'xlsx', 'xls', 'csv'}
-
-# Create upload directory if it doesn't exist
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Uploads up to this size are parsed straight from memory; larger ones spill
+# to an anonymous temp file that is removed as soon as it is closed
+UPLOAD_SPOOL_BYTES = int(os.getenv('UPLOAD_SPOOL_BYTES', 8 * 1024 * 1024))
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def spool_upload(file_storage):
+    """
+    Copy an uploaded file into a private SpooledTemporaryFile: in memory below
+    UPLOAD_SPOOL_BYTES, an unnamed temp file above it. Nothing is written under
+    the user-supplied filename, so concurrent uploads never collide. The caller
+    closes the buffer, which also removes any spilled file.
+    """
+    buffer = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES)
+    shutil.copyfileobj(file_storage.stream, buffer)
+    buffer.seek(0)
+    return buffer
+
+def as_binary_source(source):
+    """Normalize a path, raw bytes or binary file object for the readers."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return source
+
+# ------------------------------
+# Progress reporting (used by async jobs)
+# ------------------------------
+# A job whose upload is in the parse cache goes from parse_cache straight to done
+PROGRESS_STAGES = ["parse_cache", "sheet_load", "header_detection", "block_extraction", "serialization"]
+_progress_callback = contextvars.ContextVar("progress_callback", default=None)
+
+def report_progress(stage):
+    """Tell the job running in this context (if any) which stage it reached."""
+    callback = _progress_callback.get()
+    if callback is not None:
+        callback(stage)
+
 # ------------------------------
 # Helper functions from data_backend.py
 # ------------------------------
+# NBSP -> space, zero-widths removed, in a single translate pass
+_INVISIBLE_CHARS = str.maketrans({"\xa0": " ", "\u200b": None, "\u200c": None, "\u200d": None})
+# Bounded memo table for normalized labels; the same header/outlet/metric
+# labels repeat thousands of times across blocks and sheets
+NORM_CACHE_SIZE = 65536
+
+def _normalize(s):
+    # remove NBSP & zero-widths; collapse whitespace
+    return " ".join(s.translate(_INVISIBLE_CHARS).split())
+
+# Normalizer counters of the current upload (see counting_norm_lookups):
+# norm_str/norm_upper count their memo lookups, the memoized bodies (which only
+# run on a miss) count the misses
+_norm_counts = contextvars.ContextVar("norm_counts", default=None)
+
+def _count_norm(key):
+    counts = _norm_counts.get()
+    if counts is not None:
+        counts[key] += 1
+
+@lru_cache(maxsize=NORM_CACHE_SIZE)
+def _norm_text(s):
+    _count_norm("misses")
+    return sys.intern(_normalize(s))
+
+@lru_cache(maxsize=NORM_CACHE_SIZE)
+def _norm_text_upper(s):
+    _count_norm("misses")
+    # _normalize, not _norm_text: one norm_upper call is one cache lookup
+    return sys.intern(_normalize(s).upper())
+
 def norm_str(x):
+    if type(x) is str:
+        _count_norm("lookups")
+        return _norm_text(x)
     if pd.isna(x):
         return ""
-    s = str(x)
-    # remove NBSP & zero-widths; collapse whitespace
-    s = s.replace("\xa0"," ").replace("\u200b","").replace("\u200c","").replace("\u200d","")
-    s = re.sub(r"\s+", " ", s)
-    return s.strip()
+    # Numbers/dates are mostly unique values: normalize without caching them
+    return _normalize(str(x))
 
 def norm_upper(x):
+    if type(x) is str:
+        _count_norm("lookups")
+        return _norm_text_upper(x)
     return norm_str(x).upper()
 
+@contextlib.contextmanager
+def counting_norm_lookups():
+    """Count the normalizer lookups made in this context; yields the counts."""
+    counts = {"lookups": 0, "misses": 0}
+    token = _norm_counts.set(counts)
+    try:
+        yield counts
+    finally:
+        _norm_counts.reset(token)
+
+def merge_norm_counts(counts):
+    """Add counts gathered elsewhere (a pool task) to the current context's."""
+    current = _norm_counts.get()
+    if current is not None:
+        for key, value in counts.items():
+            current[key] += value
+
+def norm_cache_stats(counts):
+    """Hits and misses of one upload's lookups, and the shared memo tables' size."""
+    info = [_norm_text.cache_info(), _norm_text_upper.cache_info()]
+    return {
+        "hits": counts["lookups"] - counts["misses"],
+        "misses": counts["misses"],
+        "size": sum(i.currsize for i in info),
+    }
+
+# Month column labels as our exports write them: "June-25", "July'25",
+# "Jul 2025", "Sept-25" (a ".1" suffix is pandas' duplicate-column marker)
+MONTH_LABEL_RE = re.compile(r"^([A-Za-z]+)\s*(?:[-'’‘`]\s*|\s)(\d{4}|\d{2})(?:\.\d+)?$")
+HEADER_MONTH_RE = MONTH_LABEL_RE
+
+MONTH_NAMES = {
+    m.lower(): full
+    for full in ["January", "February", "March", "April", "May", "June", "July",
+                 "August", "September", "October", "November", "December"]
+    for m in (full, full[:3], full[:4])
+}
+MONTH_NUMBERS = {full: i for i, full in enumerate(dict.fromkeys(MONTH_NAMES.values()), start=1)}
+MONTH_NAMES_BY_NUMBER = {i: full for full, i in MONTH_NUMBERS.items()}
+
+@lru_cache(maxsize=NORM_CACHE_SIZE)
+def _parse_month_text(label):
+    match = MONTH_LABEL_RE.match(norm_str(label))
+    if not match:
+        return None
+    name = MONTH_NAMES.get(match.group(1).lower())
+    if name is None:
+        return None
+    year = int(match.group(2))
+    return (year + 2000 if year < 100 else year), MONTH_NUMBERS[name]
+
+def parse_month_label(value):
+    """
+    (year, month number) of a month column label or date-typed header cell,
+    e.g. "July'25" -> (2025, 7); None when it does not name a month.
+    """
+    if isinstance(value, str):
+        return _parse_month_text(value)
+    if isinstance(value, datetime):  # also pd.Timestamp
+        return value.year, value.month
+    return None
+
+def month_period(value):
+    """ISO date of the first day of a label's month ("June-25" -> "2025-06-01")."""
+    ym = parse_month_label(value)
+    return f"{ym[0]:04d}-{ym[1]:02d}-01" if ym else None
+
+
+def text_label_grid(df0):
+    """
+    norm_upper applied to every text cell of df0, as a 2-D object array of str.
+    Missing and non-text cells become "" (a number can never be a header label).
+
+    Text cells are factorized once, so the Python-level normalization runs only
+    over the distinct labels of the sheet instead of every cell.
+    """
+    flat = df0.to_numpy(dtype=object).ravel()
+    out = np.full(flat.shape, "", dtype=object)
+    is_text = pd.Series(flat, dtype=object).map(type).to_numpy() == str
+    if is_text.any():
+        codes, uniques = pd.factorize(flat[is_text])
+        labels = np.array([norm_upper(u) for u in uniques], dtype=object)
+        out[is_text] = labels[codes]
+    return out.reshape(df0.shape)
+
 def detect_header(df0):
     """
     Return (hdr_row, part_col) using:
@@ -66,234 +254,908 @@ def detect_header(df0):
       B) substring 'PARTICULARS'
       C) fallback: row with most Month-YY tokens
     """
-    # Apply norm_upper to all cells
-    df_str = df0.copy()
-    for col in df_str.columns:
-        df_str[col] = df_str[col].apply(lambda x: norm_upper(x) if pd.notna(x) else "")
+    grid = text_label_grid(df0)
+    if grid.size == 0:
+        raise ValueError("Cannot detect a header in an empty sheet.")
 
     # A) exact
-    eq_pos = list(zip(*np.where(df_str.values == "PARTICULARS")))
-    if eq_pos:
+    eq_pos = np.argwhere(grid == "PARTICULARS")
+    if len(eq_pos):
         return int(eq_pos[0][0]), int(eq_pos[0][1])
 
+    # Every search below works on the distinct labels, then maps back to cells
+    codes, uniques = pd.factorize(grid.ravel())
+
     # B) contains
-    has_pos = list(zip(*np.where(df_str.apply(lambda s: isinstance(s, str) and "PARTICULARS" in s, axis=1).values)))
-    if has_pos:
+    has_label = np.array(["PARTICULARS" in u for u in uniques], dtype=bool)
+    has_pos = np.argwhere(has_label[codes].reshape(grid.shape))
+    if len(has_pos):
         return int(has_pos[0][0]), int(has_pos[0][1])
 
     # C) fallback
-    month_re = re.compile(r"^[A-Z]+-\d{2}(?:\.\d+)?$")
-    counts = [ sum(bool(month_re.match(v)) for v in df_str.iloc[i]) for i in range(df_str.shape[0]) ]
+    is_month = np.array([bool(HEADER_MONTH_RE.match(u)) for u in uniques], dtype=bool)
+    counts = is_month[codes].reshape(grid.shape).sum(axis=1)
     hdr_row = int(np.argmax(counts))
-    row_vals = list(df_str.iloc[hdr_row])
-    if "PARTICULARS" in row_vals:
-        part_col = row_vals.index("PARTICULARS")
-    else:
-        part_col = next((j for j, v in enumerate(row_vals) if norm_str(v)), 0)
+    row_vals = df0.iloc[hdr_row].tolist()
+    part_col = next((j for j, v in enumerate(row_vals) if norm_str(v)), 0)
     return hdr_row, part_col
 
-def get_name(df_raw, base_row, base_col, max_up=6, max_dx=2):
+def label_row_names(df_raw, base_row, max_up=6, max_dx=2):
     """
-    Find a non-empty text near (base_row, base_col) by scanning up to 'max_up' rows
-    upwards and +/- 'max_dx' columns laterally (0, -1, +1, -2, +2).
-    Handles merged headers and slight misalignments.
+    Name of every column's label cell, resolved once per sheet: for column c
+    the first non-empty text near (base_row, c), scanning up to 'max_up' rows
+    upwards and +/- 'max_dx' columns laterally (0, -1, +1, -2, +2). This
+    fills the gaps left by merged outlet/manager headers and slight
+    misalignments, and turns each block's lookup into names[col].
     """
     h, w = df_raw.shape
-    for up in range(0, max_up + 1):
-        r = base_row - up
-        if r < 0:
+    names = np.full(w, "", dtype=object)
+    rows = list(range(base_row, max(base_row - max_up, 0) - 1, -1))
+    if not w or not rows:
+        return names
+
+    # Normalize the scanned rows once: text cells through their distinct
+    # labels, the (few) numbers and dates one by one
+    flat = df_raw.iloc[rows].to_numpy(dtype=object).ravel()
+    labels = np.full(flat.shape, "", dtype=object)
+    is_text = pd.Series(flat, dtype=object).map(type).to_numpy() == str
+    if is_text.any():
+        codes, uniques = pd.factorize(flat[is_text])
+        labels[is_text] = np.array([norm_str(u) for u in uniques], dtype=object)[codes]
+    for i in np.flatnonzero(~is_text & ~pd.isna(flat)):
+        labels[i] = norm_str(flat[i])
+    labels = labels.reshape(len(rows), w)
+
+    offsets = [0]
+    for d in range(1, max_dx + 1):
+        offsets += [-d, d]
+
+    found = np.zeros(w, dtype=bool)
+    for row in labels:  # nearest row first
+        for dx in offsets:
+            shifted = np.full(w, "", dtype=object)
+            if dx >= 0:
+                shifted[:w - dx] = row[dx:]
+            else:
+                shifted[-dx:] = row[:w + dx]
+            take = ~found & (shifted != "")
+            names[take] = shifted[take]
+            found |= take
+        if found.all():
             break
-        for dx in [0, -1, 1, -2, 2]:
-            c = base_col + dx
-            if 0 <= c < w:
-                v = norm_str(df_raw.iat[r, c])
-                if v:
-                    return v
-    return ""
+    return names
+
+# ------------------------------
+# Readers: one per file format, all producing the same raw grid
+# ------------------------------
+XLSX_SIGNATURE = b"PK\x03\x04"
+XLS_SIGNATURE = b"\xD0\xCF\x11\xE0\xA1\xB1\x1A\xE1"  # OLE2 compound document
 
-def process_outlet_wise_worksheet(file_path):
+CSV_SHEET_NAME = "Sheet1"
+CSV_CHUNK_ROWS = int(os.getenv('CSV_CHUNK_ROWS', 5000))
+CSV_ENCODING = os.getenv('CSV_ENCODING', 'utf-8-sig')
+CSV_DELIMITERS = ",;\t|"
+# Accounting exports write negatives as (1,234.50) and group thousands
+CSV_NUMBER_RE = r"^\(?[-+]?(?:\d{1,3}(?:,\d{3})+|\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?\)?$"
+
+def detect_file_format(source, filename=None):
     """
-    Process the 'Outlet wise' worksheet from multi-sheet files (same format as data5.xlsx)
+    Pick a reader from the file's leading bytes; the extension only decides
+    between formats the signature cannot tell apart.
+    Returns 'xlsx', 'xls' or 'csv'.
     """
-    try:
-        print("[INFO] Processing 'Outlet wise' worksheet")
-        
-        # Read the "Outlet wise" worksheet with no header to preserve raw layout
-        # Limit to first 1000 rows for performance
-        df0 = pd.read_excel(file_path, sheet_name="Outlet wise", header=None, engine="openpyxl", nrows=1000)
-        print(f"[INFO] Raw data shape (limited to 1000 rows): {df0.shape}")
-        
-        # Detect header row/column using existing logic
-        hdr_row, part_col = detect_header(df0)
-        print(f"[INFO] Header detected at row={hdr_row}, particulars_col={part_col}")
+    if filename is None and isinstance(source, (str, Path)):
+        filename = str(source)
+    ext = Path(filename).suffix.lower().lstrip(".") if filename else ""
 
-        # Rows above header where Outlet/Manager live
-        outlet_row = max(hdr_row - 1, 0)   # often the outlet names
-        manager_row = max(hdr_row - 3, 0)  # often the managers
+    if isinstance(source, (str, Path)):
+        with open(source, "rb") as f:
+            head = f.read(8)
+    else:
+        head = source.read(8)
+        source.seek(0)
+
+    if head.startswith(XLSX_SIGNATURE):
+        return "xlsx"
+    if head.startswith(XLS_SIGNATURE):
+        return "xls"
+    if ext in ("xlsx", "xls") and head:
+        raise ValueError(f"File has a .{ext} extension but is not an Excel workbook.")
+    return "csv"
+
+def _trim_row(row):
+    """Drop trailing empty cells, as read_excel does."""
+    while row and isinstance(row[-1], float) and np.isnan(row[-1]):
+        row.pop()
+    return row
+
+class ExcelReader:
+    """xlsx through openpyxl's read-only mode, xls through xlrd."""
+
+    def __init__(self, source, engine):
+        self.engine = engine
+        self.xl = pd.ExcelFile(source, engine=engine)
+        self.sheet_names = list(self.xl.sheet_names)
+
+    def parse(self, sheet_name, nrows=None):
+        return self.xl.parse(sheet_name, header=None, nrows=nrows)
+
+    def iter_rows(self, sheet_name):
+        if self.engine != "openpyxl":
+            # xlrd loads the whole workbook up front; walk the parsed grid
+            for row in self.parse(sheet_name).itertuples(index=False):
+                yield _trim_row(list(row))
+            return
+
+        ws = self.xl.book[sheet_name]
+        # Ignore the declared dimension so formatted-but-empty rows at the
+        # bottom of the sheet are not padded out to full width
+        ws.reset_dimensions()
+        for row in ws.rows:
+            yield [_convert_cell(cell) for cell in row]
+
+    def close(self):
+        self.xl.close()
+
+XLSX_READER = os.getenv('XLSX_READER', 'openpyxl')
+
+_XLSX_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_TAG_ROW, _TAG_C, _TAG_V, _TAG_IS = (_XLSX_NS + t for t in ("row", "c", "v", "is"))
+_TAG_SI, _TAG_T, _TAG_R = (_XLSX_NS + t for t in ("si", "t", "r"))
+
+# Keyed by the column letters only, so the table is bounded by the sheet
+# width (Excel's maximum is 16,384 columns), not by every cell ever parsed
+@lru_cache(maxsize=16384)
+def _column_letters_index(letters):
+    col = 0
+    for ch in letters:
+        col = col * 26 + ord(ch) - 64
+    return col - 1
+
+def _column_index(ref):
+    """'AB12' -> 27 (0-based column of a cell reference)."""
+    return _column_letters_index(ref.rstrip("0123456789"))
+
+def _rich_text(node):
+    """Text of an <si>/<is> node: a plain <t> or the <r> runs (phonetic runs skipped)."""
+    t = node.find(_TAG_T)
+    if t is not None:
+        return t.text or ""
+    return "".join(r.findtext(_TAG_T) or "" for r in node.iter(_TAG_R))
+
+class _SharedStrings:
+    """
+    The workbook's shared-strings table, decoded only as far as the highest
+    index actually requested.
+    """
 
-        # Build headered DataFrame from hdr_row
-        df_after = df0.iloc[hdr_row:, :].copy()
+    def __init__(self, archive, path):
+        self._strings = []
+        self._events = None
+        if path in archive.namelist():
+            self._file = archive.open(path)
+            self._events = ET.iterparse(self._file, events=("end",))
+
+    def __getitem__(self, index):
+        while index >= len(self._strings) and self._events is not None:
+            for _, elem in self._events:
+                if elem.tag == _TAG_SI:
+                    self._strings.append(_rich_text(elem))
+                    elem.clear()
+                    if index < len(self._strings):
+                        break
+            else:
+                self._events = None
+                self._file.close()
+        return self._strings[index]
 
-        # Build a parallel array of original column indices
-        orig_idx_full = np.arange(df0.shape[1])
-        orig_idx_after = orig_idx_full.copy()
+class XlsxXmlReader:
+    """
+    Dependency-free xlsx reader: streams each worksheet's XML straight out of
+    the zip with iterparse and converts cells the way _convert_cell does.
+    styles.xml is never read, so date-formatted cells come back as Excel
+    serial numbers; the P&L sheets we ingest hold only text and amounts.
+    """
 
-        # Set header from the first row of df_after
-        df_after.columns = df_after.iloc[0]
-        df_after = df_after.iloc[1:].reset_index(drop=True)
+    def __init__(self, source):
+        self.archive = zipfile.ZipFile(source)
+        workbook = ET.fromstring(self.archive.read("xl/workbook.xml"))
+        rels = ET.fromstring(self.archive.read("xl/_rels/workbook.xml.rels"))
+        targets = {rel.get("Id"): rel.get("Target") for rel in rels.iter(_PKG_REL_NS + "Relationship")}
+
+        self._paths = {}
+        for sheet in workbook.iter(_XLSX_NS + "sheet"):
+            target = targets[sheet.get(_REL_NS + "id")]
+            self._paths[sheet.get("name")] = target.lstrip("/") if target.startswith("/") else "xl/" + target
+        self.sheet_names = list(self._paths)
+        self.shared_strings = _SharedStrings(self.archive, "xl/sharedStrings.xml")
+
+    def parse(self, sheet_name, nrows=None):
+        rows = []
+        for row in self.iter_rows(sheet_name):
+            if nrows is not None and len(rows) >= nrows:
+                break
+            rows.append(_trim_row(row))
+        # read_excel drops trailing empty rows
+        while rows and not rows[-1]:
+            rows.pop()
+        width = max((len(r) for r in rows), default=0)
+        return pd.DataFrame(_pad(rows, width), dtype=object).infer_objects()
+
+    def iter_rows(self, sheet_name):
+        with self.archive.open(self._paths[sheet_name]) as f:
+            next_row = 1
+            for _, elem in ET.iterparse(f, events=("end",)):
+                if elem.tag != _TAG_ROW:
+                    continue
+                index = int(elem.get("r", next_row))
+                # Rows with no <row> element are empty
+                for _ in range(index - next_row):
+                    yield []
+                next_row = index + 1
+
+                row = []
+                for c in elem.iter(_TAG_C):
+                    ref = c.get("r")
+                    col = _column_index(ref) if ref else len(row)
+                    if col > len(row):
+                        row.extend([np.nan] * (col - len(row)))
+                    row.append(self._cell_value(c))
+                elem.clear()
+                yield row
+
+    def _cell_value(self, c):
+        kind = c.get("t", "n")
+        if kind == "inlineStr":
+            node = c.find(_TAG_IS)
+            v = _rich_text(node) if node is not None else None
+        else:
+            v = c.findtext(_TAG_V)
+        if v is None or kind == "e":
+            return np.nan
+        if kind == "n":
+            if "." in v or "E" in v or "e" in v:
+                f = float(v)
+                iv = int(f) if np.isfinite(f) else None
+                return iv if iv == f else f
+            return int(v)
+        if kind == "s":
+            v = self.shared_strings[int(v)]
+        elif kind == "b":
+            return v == "1"
+        return np.nan if v in STR_NA_VALUES else v
+
+    def close(self):
+        self.archive.close()
+
+class CsvReader:
+    """
+    Single-sheet reader for CSV exports. Rows are read in chunks of
+    CSV_CHUNK_ROWS and typed column-wise: numeric text becomes int/float the
+    way Excel would have stored it, NA strings and blanks become NaN and
+    everything else stays text.
+    """
 
-        # Slice columns from 'Particulars' **by position**
-        df_after = df_after.iloc[:, part_col:].copy()
-        orig_idx_after = orig_idx_after[part_col:]  # keep the same slice for the index map
+    def __init__(self, source):
+        self.source = source
+        self.sheet_names = [CSV_SHEET_NAME]
 
-        # Rename first column to 'Particulars'
-        new_cols = list(df_after.columns)
-        new_cols[0] = "Particulars"
-        df_after.columns = new_cols
+    def _open(self):
+        if isinstance(self.source, (str, Path)):
+            return open(self.source, "r", encoding=CSV_ENCODING, errors="replace", newline="")
+        self.source.seek(0)
+        return io.TextIOWrapper(self.source, encoding=CSV_ENCODING, errors="replace", newline="")
 
-        # Compute a mask of entirely empty columns (over the data area)
-        empty_cols_mask = df_after.isna().all(axis=0).values
-        
-        # Additional check: don't remove columns that might be outlet columns (have month patterns)
-        month_re = re.compile(r"^[A-Za-z]+-\d{2}(?:\.\d+)?$")
-        pct_re = re.compile(r"^%(?:\.\d+)?$")
-        
-        for i, col in enumerate(df_after.columns):
-            if empty_cols_mask[i]:  # If column is empty
-                col_name = norm_str(col)
-                # Don't remove if it looks like a month column or % column
-                if month_re.match(col_name) or pct_re.match(col_name):
-                    empty_cols_mask[i] = False
-        
-        # Apply the same mask to BOTH df_after and the index map
-        df_after = df_after.loc[:, ~empty_cols_mask].copy()
-        orig_idx_after = orig_idx_after[~empty_cols_mask]
-
-        print(f"[INFO] After filtering empty columns: {df_after.shape}")
-
-        # Filter required metrics
-        required_rows = [
-            "Direct Income",
-            "TOTAL REVENUE",
-            "COGS",
-            "Outlet Expenses",
-            "EBIDTA",
-            "Finance Cost",
-            "01-Bank Charges",
-            "02-Interest on Borrowings",
-            "03-Interest on Vehicle Loan",
-            "04-MG",
-            "PBT",
-            "WASTAGE",
-        ]
-        
-        df_after["Particulars"] = df_after["Particulars"].astype(str).apply(norm_str)
-        df_req = df_after[df_after["Particulars"].isin(required_rows)].reset_index(drop=True)
-        
-        print(f"[INFO] Found {len(df_req)} required metric rows")
-        
-        if df_req.empty:
-            print("DEBUG — Available 'Particulars' values (first 30):")
-            available_particulars = df_after["Particulars"].dropna().unique()[:30]
-            print(available_particulars)
-            
-            # Try to find similar matches
-            print("DEBUG — Looking for similar matches...")
-            for req_row in required_rows:
-                matches = [p for p in available_particulars if req_row.lower() in str(p).lower()]
-                if matches:
-                    print(f"  '{req_row}' might match: {matches}")
-            
-            raise ValueError("None of the required rows were found under 'Particulars'.")
-
-        # Detect all outlet (Month, %) column pairs by **position** - AFTER filtering
-        cols = list(df_after.columns)  # Use df_after (after empty column filtering) instead of df_req
-        month_re = re.compile(r"^[A-Za-z]+-\d{2}(?:\.\d+)?$")
-        pct_re   = re.compile(r"^%(?:\.\d+)?$")
-
-        outlet_blocks = []
-        for i in range(1, len(cols) - 1):  # 0 is 'Particulars'
-            cname = norm_str(cols[i])
-            nname = norm_str(cols[i+1])
-            if month_re.match(cname) and (nname == "%" or pct_re.match(nname)):
-                outlet_blocks.append((i, cols[i], cols[i+1]))
-
-        print(f"[INFO] Found {len(outlet_blocks)} outlet blocks")
-
-        if not outlet_blocks:
-            print("DEBUG — Columns after 'Particulars':", cols[:20], " ... total:", len(cols))
-            print("DEBUG — Looking for month patterns...")
-            for i, col in enumerate(cols[1:6]):  # Check first 5 columns after Particulars
-                print(f"  Column {i+1}: '{col}' -> month_match: {bool(month_re.match(norm_str(col)))}")
-            raise ValueError("No Month/% pairs detected (e.g., 'June-25' followed by '%').")
-
-        # Build final rows
-        final_rows = []
-        skipped_count = 0
-
-        for (val_idx, val_col_name, pct_col_name) in outlet_blocks:
-            # Map df_after column position -> original df0 column index
-            orig_col_idx = int(orig_idx_after[val_idx])
-
-            # Outlet / Manager via robust scanning
-            outlet_name  = get_name(df0, outlet_row,  orig_col_idx, max_up=6, max_dx=2)
-            manager_name = get_name(df0, manager_row, orig_col_idx, max_up=8, max_dx=2)
-
-            # Skip consolidated summary column if it happens to be detected
-            if outlet_name.lower() == "consolidated summary" or "consolidated" in outlet_name.lower():
-                skipped_count += 1
-                continue
+    def _chunks(self, chunk_rows=CSV_CHUNK_ROWS):
+        text = self._open()
+        try:
+            sample = text.read(8 * 1024)
+            text.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=CSV_DELIMITERS)
+            except csv.Error:
+                dialect = csv.excel
+            reader = csv.reader(text, dialect)
+            while True:
+                rows = list(itertools.islice(reader, chunk_rows))
+                if not rows:
+                    break
+                yield _type_csv_chunk(rows)
+        finally:
+            # Leave a caller-owned buffer open for the next pass
+            if isinstance(text, io.TextIOWrapper) and not isinstance(self.source, (str, Path)):
+                text.detach()
+            else:
+                text.close()
+
+    def parse(self, sheet_name, nrows=None):
+        rows = []
+        for row in self.iter_rows(sheet_name, chunk_rows=min(nrows or CSV_CHUNK_ROWS, CSV_CHUNK_ROWS)):
+            if nrows is not None and len(rows) >= nrows:
+                break
+            rows.append(row)
+        width = max((len(r) for r in rows), default=0)
+        return pd.DataFrame(_pad(rows, width), dtype=object)
+
+    def iter_rows(self, sheet_name, chunk_rows=CSV_CHUNK_ROWS):
+        for chunk in self._chunks(chunk_rows):
+            for row in chunk:
+                yield _trim_row(row)
+
+    def close(self):
+        pass
+
+def _type_csv_chunk(rows):
+    """Convert one chunk of CSV text rows to typed cell values in one pass."""
+    width = max(len(r) for r in rows)
+    cells = np.array([r + [""] * (width - len(r)) for r in rows], dtype=object).ravel()
+    out = np.full(cells.shape, np.nan, dtype=object)
+
+    # Most cells of a P&L export are empty: only type the filled ones
+    filled = np.flatnonzero(cells != "")
+    text = pd.Series(cells[filled])
+    stripped = text.str.strip()
+    is_na = (stripped == "").to_numpy() | text.isin(STR_NA_VALUES).to_numpy()
+    is_num = ~is_na & stripped.str.fullmatch(CSV_NUMBER_RE).to_numpy() & stripped.str.contains(r"\d").to_numpy()
+
+    keep = ~is_na & ~is_num
+    out[filled[keep]] = cells[filled[keep]]
+    if is_num.any():
+        digits = stripped[is_num].str.replace(",", "", regex=False)
+        negative = digits.str.startswith("(").to_numpy()
+        # numpy's str -> float parse is exact (pandas' fast parser may be off by an ulp)
+        values = digits.str.strip("()").to_numpy(dtype=str).astype(float)
+        values[negative] = -values[negative]
+        typed = values.astype(object)
+        integral = np.isfinite(values) & (values == np.floor(values)) & (np.abs(values) < 2 ** 53)
+        typed[integral] = values[integral].astype(np.int64).astype(object)
+        out[filled[is_num]] = typed
+    return out.reshape(len(rows), width).tolist()
+
+class WorkbookSession:
+    """
+    Opens a workbook once and hands the same in-memory sheets to every
+    format detector and extractor.
+
+    The file format is sniffed once (see detect_file_format) and the matching
+    reader opened; for xlsx the zip and shared-strings table are parsed a
+    single time here. Each sheet is parsed at most once more (raw layout,
+    header=None) and cached. Header-based views are derived from that cached
+    raw grid instead of re-reading the file.
+    """
 
-            # Month label
-            month_label = norm_str(val_col_name)
-            month = month_label.split("-")[0] if "-" in month_label else month_label
+    def __init__(self, source, filename=None, xlsx_reader=None):
+        # source: file path, raw bytes or a seekable binary buffer;
+        # xlsx_reader: 'openpyxl' or 'native' (defaults to XLSX_READER)
+        self.source = as_binary_source(source)
+        self.file_format = detect_file_format(self.source, filename)
+        if self.file_format == "csv":
+            self.reader = CsvReader(self.source)
+        elif self.file_format == "xlsx" and (xlsx_reader or XLSX_READER) == "native":
+            self.reader = XlsxXmlReader(self.source)
+        else:
+            self.reader = ExcelReader(self.source, "openpyxl" if self.file_format == "xlsx" else "xlrd")
+        self.sheet_names = self.reader.sheet_names
+        # sheet_name -> (raw DataFrame, rows requested, complete?)
+        self._raw = {}
+
+    @classmethod
+    def ensure(cls, source):
+        """Accept either an existing session or a file path."""
+        return source if isinstance(source, cls) else cls(source)
+
+    def _resolve(self, sheet_name):
+        if sheet_name is None or isinstance(sheet_name, int):
+            return self.sheet_names[sheet_name or 0]
+        return sheet_name
+
+    def raw(self, sheet_name=None, nrows=None):
+        """
+        Raw grid of a sheet (equivalent to read_excel(header=None, nrows=nrows)).
+        A cached read is reused whenever it already covers the requested rows.
+        """
+        sheet_name = self._resolve(sheet_name)
+        cached = self._raw.get(sheet_name)
+        if cached is not None:
+            df, read_rows, complete = cached
+            if complete or (nrows is not None and read_rows is not None and nrows <= read_rows):
+                return df if nrows is None else df.iloc[:nrows]
+
+        df = self.reader.parse(sheet_name, nrows=nrows)
+        complete = nrows is None or len(df) < nrows
+        self._raw[sheet_name] = (df, nrows, complete)
+        return df
+
+    def frame(self, sheet_name=None, nrows=None):
+        """
+        Headered view of a sheet (equivalent to read_excel(header=0)), built from
+        the cached raw grid.
+        """
+        df0 = self.raw(sheet_name, nrows=None if nrows is None else nrows + 1)
+        if df0.empty:
+            return pd.DataFrame()
+
+        names = []
+        seen = {}
+        for i, v in enumerate(df0.iloc[0].tolist()):
+            name = f"Unnamed: {i}" if pd.isna(v) else v
+            if name in seen:
+                seen[name] += 1
+                name = f"{name}.{seen[name]}"
+            else:
+                seen[name] = 0
+            names.append(name)
+
+        df = df0.iloc[1:].reset_index(drop=True)
+        df.columns = names
+        return df
+
+    def iter_rows(self, sheet_name=None):
+        """
+        Stream a sheet row by row straight from the read-only workbook, with the
+        same cell conversion read_excel applies (empty/error/NA strings -> NaN,
+        integral floats -> int). Rows are lists and are not padded to a common
+        width; nothing is kept in memory between rows.
+        """
+        return self.reader.iter_rows(self._resolve(sheet_name))
+
+    def load_sheets(self, sheet_names):
+        """
+        Load several sheets as raw grids in one pass over the open workbook.
+        Each sheet is streamed until a long run of empty rows, so formatting
+        that extends to row 1,048,576 is never materialized.
+        """
+        grids = {}
+        for sheet_name in sheet_names:
+            rows = []
+            last_filled = -1
+            for row in self.iter_rows(sheet_name):
+                if any(not (isinstance(v, float) and np.isnan(v)) for v in row):
+                    last_filled = len(rows)
+                elif len(rows) - last_filled > STREAM_MAX_BLANK_ROWS:
+                    break
+                rows.append(_trim_row(row))
+            rows = rows[:last_filled + 1]
+            width = max((len(r) for r in rows), default=0)
+            grids[sheet_name] = pd.DataFrame(_pad(rows, width), dtype=object)
+        return grids
+
+    def close(self):
+        self.reader.close()
+        self._raw.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
-            row = {
-                "Outlet": outlet_name,
-                "Outlet Manager": manager_name,
-                "Month": month
-            }
+# ------------------------------
+# Streaming outlet-block extractor
+# ------------------------------
+REQUIRED_ROWS = [
+    "Direct Income",
+    "TOTAL REVENUE",
+    "COGS",
+    "Outlet Expenses",
+    "EBIDTA",
+    "Finance Cost",
+    "01-Bank Charges",
+    "02-Interest on Borrowings",
+    "03-Interest on Vehicle Loan",
+    "04-MG",
+    "PBT",
+    "WASTAGE",
+]
+
+REQUIRED_ORDER = [
+    "Outlet", "Outlet Manager", "Month", "Period",
+    "Direct Income", "TOTAL REVENUE", "COGS", "Outlet Expenses",
+    "EBIDTA", "Finance Cost",
+    "01-Bank Charges", "02-Interest on Borrowings",
+    "03-Interest on Vehicle Loan", "04-MG",
+    "PBT", "WASTAGE"
+]
+
+# Header must appear within this many rows (same window detect_header always had).
+# It is also the window every data row inside is read from, so the last
+# occurrence of a restated metric row wins (see extract_outlet_blocks)
+HEADER_SCAN_ROWS = 1000
+# Stop streaming after this many consecutive empty rows once the header is found;
+# exported sheets often carry formatting down to row 1,048,576
+STREAM_MAX_BLANK_ROWS = 10000
+
+MONTH_COL_RE = MONTH_LABEL_RE
+# Non-numeric columns of an outlet record
+ID_COLUMNS = ("Outlet", "Outlet Manager", "Month", "Period")
+PCT_COL_RE = re.compile(r"^%(?:\.\d+)?$")
+
+def _convert_cell(cell):
+    """Mirror read_excel's openpyxl cell conversion for a single cell."""
+    v = cell.value
+    if v is None or cell.data_type == "e":
+        return np.nan
+    if cell.data_type == "n" and not isinstance(v, bool):
+        iv = int(v)
+        return iv if iv == v else float(v)
+    if isinstance(v, str) and v in STR_NA_VALUES:
+        return np.nan
+    return v
+
+def _pad(rows, width):
+    return [r + [np.nan] * (width - len(r)) for r in rows]
+
+# ------------------------------
+# Layout plans (one per accounting template)
+# ------------------------------
+LAYOUT_PLAN_CACHE_ITEMS = int(os.getenv('LAYOUT_PLAN_CACHE_ITEMS', 64))
+
+class LayoutPlanCache:
+    """
+    In-memory LRU of sheet layout plans keyed by template_signature(): the
+    header row, Particulars column and (Month, %) block positions with each
+    block's outlet/manager. Every month's P&L comes from the same template,
+    so repeat uploads skip header, block and name detection.
+    """
+
+    def __init__(self, max_items):
+        self.max_items = max_items
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "rejected": 0}
+
+    def get(self, signature):
+        with self._lock:
+            plan = self._plans.get(signature)
+            if plan is None:
+                self.stats["misses"] += 1
+                return None
+            self._plans.move_to_end(signature)
+            self.stats["hits"] += 1
+            return plan
+
+    def put(self, signature, plan):
+        with self._lock:
+            self._plans[signature] = plan
+            self._plans.move_to_end(signature)
+            while len(self._plans) > self.max_items:
+                self._plans.popitem(last=False)
+
+    def reject(self, signature):
+        """Forget a plan that failed validation (counted as a miss, not a hit)."""
+        with self._lock:
+            self._plans.pop(signature, None)
+            self.stats["hits"] -= 1
+            self.stats["misses"] += 1
+            self.stats["rejected"] += 1
+
+    def report(self):
+        with self._lock:
+            return {"items": len(self._plans), "max_items": self.max_items, **self.stats}
+
+layout_plans = LayoutPlanCache(LAYOUT_PLAN_CACHE_ITEMS)
+
+def template_signature(sheet_names, sheet_name, df_head):
+    """
+    Cheap fingerprint of a sheet's template: the workbook's sheet names plus
+    the text of the rows up to the header, with month labels masked so each
+    month's export of the same template shares one signature. Outlet and
+    manager labels are part of it, so a renamed outlet gets a new plan.
+    """
+    grid = text_label_grid(df_head)
+    codes, uniques = pd.factorize(grid.ravel())
+    masked = np.array(["<MONTH>" if MONTH_COL_RE.match(u) else u for u in uniques] + [""], dtype=object)
+    rows = masked[codes].reshape(grid.shape).tolist()
+
+    digest = hashlib.sha256()
+    digest.update(json.dumps([list(sheet_names), sheet_name], default=str).encode())
+    digest.update("\x1e".join("\x1f".join(row) for row in rows).encode())
+    return digest.hexdigest()
+
+def _plan_fits(plan, head):
+    """Check a cached plan against this sheet's header row before trusting it."""
+    hdr_row, part_col = plan["hdr_row"], plan["part_col"]
+    if hdr_row >= len(head):
+        return False
+    header = head[hdr_row]
+    if part_col >= len(header) or norm_str(header[part_col]) != plan["part_label"]:
+        return False
+    for col, pct_col in zip(plan["block_cols"], plan["pct_cols"]):
+        if pct_col >= len(header):
+            return False
+        label = header[col]
+        if not (MONTH_COL_RE.match(norm_str(label)) or parse_month_label(label)):
+            return False
+        if not PCT_COL_RE.match(norm_str(header[pct_col])):
+            return False
+    return True
+
+def _detect_layout(df_head, header, hdr_row, part_col, non_empty):
+    """
+    Full block-layout detection for extract_outlet_blocks: the (Month, %)
+    column pairs after 'Particulars' and each block's outlet/manager, with
+    consolidated columns left out. Returned as a plan for layout_plans.
+    """
+    # Classify the header cells from 'Particulars' onwards in one pass over
+    # the distinct labels: month columns (with their real year/month) and
+    # % columns. Entirely empty columns are dropped unless their header
+    # looks like a month or % column.
+    cols = ["Particulars"] + list(header[part_col + 1:])
+    codes, uniques = pd.factorize(pd.Series(cols[1:], dtype=object))
+    label_u = [norm_str(u) for u in uniques]
+    period_u = [parse_month_label(u) for u in uniques]
+    is_month_u = np.array([bool(MONTH_COL_RE.match(l)) or p is not None for l, p in zip(label_u, period_u)] + [False])
+    is_pct_u = np.array([bool(PCT_COL_RE.match(l)) for l in label_u] + [False])
+    # Months as a running index (year * 12 + month), -1 when not a real month
+    ym_u = np.array([p[0] * 12 + p[1] - 1 if p else -1 for p in period_u] + [-1], dtype=np.int64)
+    codes = np.r_[0, codes]  # 'Particulars' itself (code 0 is never looked at)
+
+    is_month = is_month_u[codes]
+    is_month[0] = False
+    is_pct = is_pct_u[codes]
+    is_pct[0] = False
+    keep = non_empty[part_col:].copy() | is_month | is_pct
+    keep[0] = True
+    orig_idx_after = np.arange(part_col, len(header))[keep]
+    is_month, is_pct, kept_codes = is_month[keep], is_pct[keep], codes[keep]
+
+    print(f"[INFO] After filtering empty columns: {int(keep.sum())} columns")
+
+    # Detect all outlet (Month, %) column pairs by **position**
+    block_pos = np.flatnonzero(is_month[:-1] & is_pct[1:])
+    print(f"[INFO] Found {len(block_pos)} outlet blocks")
+
+    if not len(block_pos):
+        kept_cols = [cols[i] for i in np.flatnonzero(keep)]
+        print("DEBUG — Columns after 'Particulars':", kept_cols[:20], " ... total:", len(kept_cols))
+        print("DEBUG — Looking for month patterns...")
+        for i, col in enumerate(kept_cols[1:6]):  # Check first 5 columns after Particulars
+            print(f"  Column {i+1}: '{col}' -> month_match: {bool(MONTH_COL_RE.match(norm_str(col)))}")
+        raise ValueError("No Month/% pairs detected (e.g., 'June-25' followed by '%').")
+
+    block_cols = orig_idx_after[block_pos]
+    pct_cols = orig_idx_after[block_pos + 1]
+    block_codes = kept_codes[block_pos]
+    block_ym = ym_u[block_codes]
+
+    # Blocks of one outlet across several months (year-to-date sheets) share the
+    # outlet's merged label: a new outlet starts wherever the month does not
+    # move forward. Single-month sheets therefore get one group per block.
+    new_group = np.r_[True, (block_ym[1:] <= block_ym[:-1]) | (block_ym[1:] < 0)]
+    group_of_block = np.cumsum(new_group) - 1
+    group_cols = block_cols[new_group]
+
+    # Rows above header where Outlet/Manager live
+    outlet_row = max(hdr_row - 1, 0)   # often the outlet names
+    manager_row = max(hdr_row - 3, 0)  # often the managers
+
+    # Outlet / Manager names resolved once per label row, then looked up
+    # for the first block of each outlet group
+    group_outlets = label_row_names(df_head, outlet_row, max_up=6, max_dx=2)[group_cols]
+    group_managers = label_row_names(df_head, manager_row, max_up=8, max_dx=2)[group_cols]
+
+    # Skip consolidated summary columns if they happen to be detected
+    consolidated = np.array(["consolidated" in name.lower() for name in group_outlets], dtype=bool)
+    selected = ~consolidated[group_of_block]
+    skipped_count = int((~selected).sum())
+
+    return {
+        "hdr_row": hdr_row,
+        "part_col": part_col,
+        "part_label": norm_str(header[part_col]),
+        "block_cols": block_cols[selected],
+        "pct_cols": pct_cols[selected],
+        "outlets": group_outlets[group_of_block[selected]],
+        "managers": group_managers[group_of_block[selected]],
+        "skipped": skipped_count,
+        "total_blocks": len(block_pos),
+    }
+
+def extract_outlet_blocks(session, sheet_name=None):
+    """
+    Stream a P&L sheet laid out as (Month, %) column blocks per outlet and
+    return one row per outlet with the REQUIRED_ROWS metrics.
+
+    Rows are read one at a time: only the rows up to the header (for the
+    outlet/manager labels) and the matching metric rows are kept. The first
+    HEADER_SCAN_ROWS rows (the window the sheet was always read with) are read
+    in full, so a metric label that appears twice keeps its last row and the
+    empty-column mask covers the whole data area there; past that window,
+    reading stops as soon as every required metric has been seen. There is no
+    row cap.
+    The block layout comes from layout_plans when the sheet's template was
+    seen before, so a repeat upload only reads values.
+    """
+    rows = session.iter_rows(sheet_name)
+
+    # 1) Buffer rows until the header is found (an exact 'PARTICULARS' cell),
+    #    falling back to detect_header's B/C rules on the first HEADER_SCAN_ROWS
+    head = []
+    for row in rows:
+        head.append(row)
+        if any(isinstance(v, str) and norm_upper(v) == "PARTICULARS" for v in row):
+            break
+        if len(head) >= HEADER_SCAN_ROWS:
+            break
+
+    if not head:
+        raise ValueError("Worksheet is empty.")
+
+    width = max(len(r) for r in head)
+    df_head = pd.DataFrame(_pad(head, width), dtype=object)
+    report_progress("header_detection")
+
+    # Reuse the layout of an earlier upload of the same template when the
+    # plan still fits this sheet's header
+    signature = template_signature(session.sheet_names, sheet_name, df_head)
+    plan = layout_plans.get(signature)
+    if plan is not None and not _plan_fits(plan, head):
+        print("[INFO] Cached layout plan does not fit this sheet, running full detection")
+        layout_plans.reject(signature)
+        plan = None
+    plan_hit = plan is not None
+
+    if plan_hit:
+        hdr_row, part_col = plan["hdr_row"], plan["part_col"]
+        print(f"[INFO] Reusing layout plan: header row={hdr_row}, particulars_col={part_col}")
+    else:
+        hdr_row, part_col = detect_header(df_head)
+        print(f"[INFO] Header detected at row={hdr_row}, particulars_col={part_col}")
+
+    header = head[hdr_row]
+    # Rows already buffered past the header are data rows too
+    pending = head[hdr_row + 1:]
+    df_head = df_head.iloc[:hdr_row + 1]
+
+    report_progress("block_extraction")
+
+    # 2) Stream the data area: track which columns ever hold a value and keep
+    #    only the required metric rows
+    required = set(REQUIRED_ROWS)
+    metric_rows = []
+    found = set()
+    non_empty = np.zeros(width, dtype=bool)
+    available_particulars = []
+    blank_run = 0
+    scanned = 0
+
+    def data_rows():
+        yield from pending
+        yield from rows
+
+    for row in data_rows():
+        # Next row's index in the sheet is hdr_row + 1 + scanned
+        if len(found) == len(required) and hdr_row + 1 + scanned >= HEADER_SCAN_ROWS:
+            break
+        scanned += 1
+        if len(row) > len(non_empty):
+            non_empty = np.concatenate([non_empty, np.zeros(len(row) - len(non_empty), dtype=bool)])
+        # Cells are NaN when empty (see _convert_cell); checked in C per row
+        filled = ~pd.isna(np.array(row, dtype=object)) if row else np.zeros(0, dtype=bool)
+        if not filled.any():
+            blank_run += 1
+            if blank_run >= STREAM_MAX_BLANK_ROWS:
+                print(f"[INFO] Stopped after {blank_run} consecutive empty rows")
+                break
+            continue
+        blank_run = 0
+        non_empty[:len(row)] |= filled
+
+        label = norm_str(str(row[part_col]) if part_col < len(row) else "nan")
+        if label in required:
+            metric_rows.append((label, row))
+            found.add(label)
+        elif len(available_particulars) < 30 and label not in available_particulars:
+            available_particulars.append(label)
+
+    print(f"[INFO] Streamed {scanned} data rows, found {len(metric_rows)} required metric rows")
+
+    if not metric_rows:
+        print("DEBUG — Available 'Particulars' values (first 30):")
+        print(available_particulars)
+
+        # Try to find similar matches
+        print("DEBUG — Looking for similar matches...")
+        for req_row in REQUIRED_ROWS:
+            matches = [p for p in available_particulars if req_row.lower() in str(p).lower()]
+            if matches:
+                print(f"  '{req_row}' might match: {matches}")
+
+        raise ValueError("None of the required rows were found under 'Particulars'.")
+
+    # 3) Block layout: header positions of every (Month, %) block and its
+    #    outlet/manager, detected once per template
+    header = header + [np.nan] * (max(len(non_empty), len(header)) - len(header))
+    if not plan_hit:
+        plan = _detect_layout(df_head, header, hdr_row, part_col, non_empty)
+        layout_plans.put(signature, plan)
+
+    block_cols = plan["block_cols"]
+    outlets = plan["outlets"]
+    managers = plan["managers"]
+    skipped_count = plan["skipped"]
+
+    # Month name and period of every block from this upload's header labels;
+    # labels that only match the loose pattern keep their text before the '-'
+    labels = pd.Series([header[c] for c in block_cols], dtype=object)
+    codes, uniques = pd.factorize(labels)
+    periods = [parse_month_label(u) for u in uniques]
+    month_u = np.array([
+        (MONTH_NAMES_BY_NUMBER[p[1]] if p else (l.split("-")[0] if "-" in l else l))
+        for l, p in zip((norm_str(u) for u in uniques), periods)
+    ], dtype=object)
+    period_iso_u = np.array([f"{p[0]:04d}-{p[1]:02d}-01" if p else None for p in periods], dtype=object)
+
+    # Gather the value column of every outlet-month block for every metric in
+    # one fancy-indexing call: (metrics x columns)[:, blocks].T -> blocks x metrics.
+    # A metric label that appears twice keeps the last of its rows that were
+    # read (every row of the first HEADER_SCAN_ROWS, see the streaming loop).
+    metric_by_label = dict(metric_rows)
+    metric_names = list(metric_by_label)
+    width = max([len(r) for r in metric_by_label.values()] + [int(c) + 1 for c in block_cols])
+    metric_grid = np.empty((len(metric_names), width), dtype=object)
+    metric_grid[:] = _pad(list(metric_by_label.values()), width)
+    values = metric_grid[:, block_cols].T
+
+    columns = {
+        "Outlet": outlets,
+        "Outlet Manager": managers,
+        "Month": month_u[codes],
+        "Period": period_iso_u[codes],
+    }
+    for i, metric in enumerate(metric_names):
+        columns[metric] = values[:, i]
+    df_final = pd.DataFrame(columns)
+    print(f"[INFO] Created {len(df_final)} final outlet records")
+    print(f"[INFO] Skipped {skipped_count} consolidated outlets")
+    print(f"[INFO] Total outlet blocks processed: {plan['total_blocks']}")
+
+    # Order + numeric coercion
+    for c in REQUIRED_ORDER:
+        if c not in df_final.columns:
+            df_final[c] = np.nan
+    df_final = df_final[REQUIRED_ORDER].copy()
+
+    num_cols = [c for c in REQUIRED_ORDER if c not in ID_COLUMNS]
+    df_final[num_cols] = df_final[num_cols].apply(pd.to_numeric, errors="coerce")
+    df_final.attrs["layout_plan"] = {"hit": plan_hit, "signature": signature[:16]}
+    return df_final
+
+class ParseResult(dict):
+    """
+    A parse result (the JSON-ready dict) that also carries the final DataFrame
+    its "data" rows were made from, so columnar and Arrow responses are built
+    from the frame rather than from the rows (see result_frame).
+    """
+    frame = None
 
-            # Copy metrics by position
-            for _, req_row in df_req.iterrows():
-                metric = req_row["Particulars"]
-                value  = req_row.iat[val_idx] if val_idx < df_req.shape[1] else np.nan
-                row[metric] = value
-
-            final_rows.append(row)
-
-        df_final = pd.DataFrame(final_rows)
-        print(f"[INFO] Created {len(df_final)} final outlet records")
-        print(f"[INFO] Skipped {skipped_count} consolidated outlets")
-        print(f"[INFO] Total outlet blocks processed: {len(outlet_blocks)}")
-
-        # Order + numeric coercion
-        required_order = [
-            "Outlet", "Outlet Manager", "Month",
-            "Direct Income", "TOTAL REVENUE", "COGS", "Outlet Expenses",
-            "EBIDTA", "Finance Cost",
-            "01-Bank Charges", "02-Interest on Borrowings",
-            "03-Interest on Vehicle Loan", "04-MG",
-            "PBT", "WASTAGE"
-        ]
-        for c in required_order:
-            if c not in df_final.columns:
-                df_final[c] = np.nan
-        df_final = df_final[required_order].copy()
-
-        num_cols = [c for c in required_order if c not in ("Outlet", "Outlet Manager", "Month")]
-        df_final[num_cols] = df_final[num_cols].apply(pd.to_numeric, errors="coerce")
+def parse_result(frame, **fields):
+    """ParseResult with frame's rows (NaN as None) as "data"."""
+    result = ParseResult(success=True, data=frame.replace({np.nan: None}).to_dict('records'), **fields)
+    result.frame = frame
+    return result
+
+def process_outlet_wise_worksheet(source):
+    """
+    Process the 'Outlet wise' worksheet from multi-sheet files (same format as data5.xlsx)
+    """
+    try:
+        print("[INFO] Processing 'Outlet wise' worksheet")
+        session = WorkbookSession.ensure(source)
+
+        # Stream the "Outlet wise" worksheet, keeping only the rows we need
+        df_final = extract_outlet_blocks(session, "Outlet wise")
 
         # Convert to list of dictionaries for JSON serialization
-        df_final_clean = df_final.replace({np.nan: None})
-        result_data = df_final_clean.to_dict('records')
-        
-        return {
-            "success": True,
-            "data": result_data,
-            "outlets_count": len(df_final),
-            "message": f"Successfully processed {len(df_final)} outlet records from 'Outlet wise' worksheet"
-        }
+        report_progress("serialization")
+        return parse_result(
+            df_final,
+            outlets_count=len(df_final),
+            message=f"Successfully processed {len(df_final)} outlet records from 'Outlet wise' worksheet",
+            metadata={"layout_plan": df_final.attrs.get("layout_plan")}
+        )
 
     except Exception as e:
         return {
@@ -302,190 +1164,276 @@ def process_outlet_wise_worksheet(file_path):
             "traceback": traceback.format_exc()
         }
 
-def process_multi_worksheet_outlets(file_path, outlet_sheets):
+# Per-sheet extraction pool for multi-worksheet files ("thread" or "process")
+SHEET_POOL = os.getenv('SHEET_POOL', 'thread')
+SHEET_POOL_WORKERS = int(os.getenv('SHEET_POOL_WORKERS', min(8, os.cpu_count() or 1)))
+# Start method for process pools. Not fork: this process runs job-queue,
+# writer and request threads, and a fork can copy one of their held locks
+# into the child, which then deadlocks
+POOL_START_METHOD = os.getenv('POOL_START_METHOD', 'spawn')
+
+_shared_pools = {}
+_shared_pools_lock = threading.Lock()
+
+def shared_pool(name, kind, workers):
+    """
+    The process-wide executor registered under name: a ThreadPoolExecutor, or
+    a ProcessPoolExecutor (kind="process") started with POOL_START_METHOD.
+    Created on first use and then reused by every request, so worker start-up
+    is paid once per process.
+    """
+    with _shared_pools_lock:
+        executor = _shared_pools.get(name)
+        if executor is None:
+            if kind == "process":
+                executor = ProcessPoolExecutor(max_workers=workers,
+                                               mp_context=multiprocessing.get_context(POOL_START_METHOD))
+            else:
+                executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+            _shared_pools[name] = executor
+        return executor
+
+def bounded_map(executor, fn, *iterables, limit):
+    """
+    executor.map over a shared pool with at most limit of this call's tasks
+    in flight, so one request uses no more workers than it asked for.
+    Results come back in input order.
+    """
+    args = list(zip(*iterables))
+    results = [None] * len(args)
+    in_flight = {}
+    next_item = 0
+    while next_item < len(args) or in_flight:
+        while next_item < len(args) and len(in_flight) < limit:
+            in_flight[executor.submit(fn, *args[next_item])] = next_item
+            next_item += 1
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            results[in_flight.pop(future)] = future.result()
+    return results
+
+def _extract_outlet_sheet(sheet_name, df_raw):
+    """
+    Extract one outlet record from a single outlet worksheet.
+
+    Runs inside the sheet pool, so it only receives the already-loaded raw grid
+    and returns (outlet_record or None, report) instead of raising.
+    """
+    start = time.perf_counter()
+    report = {"sheet": sheet_name, "success": False}
+    try:
+        outlet_record, reason = _outlet_record_from_sheet(sheet_name, df_raw)
+        if outlet_record is None:
+            report["error"] = reason
+        else:
+            report["success"] = True
+    except Exception as sheet_error:
+        print(f"[ERROR] Failed to process sheet {sheet_name}: {str(sheet_error)}")
+        outlet_record = None
+        report["error"] = str(sheet_error)
+    report["seconds"] = round(time.perf_counter() - start, 4)
+    return outlet_record, report
+
+def _outlet_record_from_sheet(sheet_name, df_raw):
+    print(f"[INFO] Processing outlet sheet: {sheet_name}")
+
+    # Find the header row containing "Particulars"
+    hdr_row, part_col = detect_header(df_raw)
+    print(f"[INFO] Header found at row {hdr_row}, column {part_col} for {sheet_name}")
+    
+    # Extract outlet name and manager from the sheet
+    # Look for outlet name in the first few rows
+    outlet_name = ""
+    manager_name = ""
+    
+    # Try to find outlet name and manager in the first few rows
+    for row_idx in range(min(5, df_raw.shape[0])):
+        for col_idx in range(min(5, df_raw.shape[1])):
+            cell_value = str(df_raw.iloc[row_idx, col_idx]).strip()
+            if cell_value and cell_value != 'nan' and cell_value != 'None':
+                # Look for outlet name patterns
+                if any(keyword in cell_value.lower() for keyword in ['mg', 'nagar', 'layout', 'road', 'club', 'paakashaala', 'nagar', 'layout']):
+                    outlet_name = cell_value
+                # Look for manager name patterns (contains numbers and names)
+                elif any(char.isdigit() for char in cell_value) and any(char.isalpha() for char in cell_value):
+                    if '-' in cell_value:
+                        manager_name = cell_value.split('-', 1)[1].strip()
+                    else:
+                        manager_name = cell_value
+    
+    # If we couldn't find outlet name, use sheet name
+    if not outlet_name:
+        outlet_name = sheet_name
+    
+    # If we couldn't find manager name, use sheet name
+    if not manager_name:
+        manager_name = sheet_name
+    
+    print(f"[INFO] Extracted - Outlet: {outlet_name}, Manager: {manager_name}")
+    
+    # Process the financial data from this sheet
+    df_after = df_raw.iloc[hdr_row:, :].copy()
+    
+    # Check if we have enough rows
+    if df_after.shape[0] < 2:
+        print(f"[WARNING] Not enough data rows in sheet {sheet_name}")
+        return None, "Not enough data rows"
+    
+    # Set column names from first row
+    df_after.columns = df_after.iloc[0]
+    df_after = df_after.iloc[1:].reset_index(drop=True)
+    
+    # Check if 'Particulars' column exists
+    if 'Particulars' not in df_after.columns:
+        print(f"[WARNING] 'Particulars' column not found in sheet {sheet_name}")
+        return None, "'Particulars' column not found"
+    
+    # Filter to get only the required metrics
+    df_after["Particulars"] = df_after["Particulars"].astype(str).apply(norm_str)
+    df_metrics = df_after[df_after["Particulars"].isin(REQUIRED_ROWS)].reset_index(drop=True)
+    
+    if df_metrics.empty:
+        print(f"[WARNING] No required metrics found in sheet {sheet_name}")
+        return None, "No required metrics found"
+    
+    # Extract the financial values (usually in the first data column after Particulars)
+    # Look for the first column with numeric data
+    data_column = None
+    for col in df_metrics.columns[1:]:
+        if col != "Particulars" and col is not None:
+            # Check if this column has numeric data
+            try:
+                numeric_values = pd.to_numeric(df_metrics[col], errors='coerce')
+                if not numeric_values.isna().all() and numeric_values.sum() > 0:
+                    data_column = col
+                    break
+            except:
+                continue
+    
+    if data_column is None:
+        print(f"[WARNING] No numeric data column found in sheet {sheet_name}")
+        print(f"[DEBUG] Available columns: {list(df_metrics.columns)}")
+        return None, "No numeric data column found"
+    
+    # The month is the value column's label ("June-25", or "June" without a
+    # year and so without a Period); a header that names no month leaves Month
+    # empty (batches fill it from the file name)
+    year_month = parse_month_label(data_column)
+    label = data_column.strip() if isinstance(data_column, str) else ""
+    if year_month and not label:  # a date-typed header cell
+        label = f"{MONTH_NAMES_BY_NUMBER[year_month[1]]}-{year_month[0] % 100:02d}"
+    month = label if year_month or label.lower() in MONTH_NAMES else ""
+
+    # Create outlet record
+    outlet_record = {
+        "Outlet": outlet_name,
+        "Outlet Manager": manager_name,
+        "Month": month,
+        "Period": month_period(data_column)
+    }
+    
+    # Extract each metric value
+    for _, row in df_metrics.iterrows():
+        metric_name = row["Particulars"]
+        metric_value = pd.to_numeric(row[data_column], errors='coerce')
+        if not pd.isna(metric_value):
+            outlet_record[metric_name] = float(metric_value)
+        else:
+            outlet_record[metric_name] = 0.0
+    
+    # Ensure all required metrics are present
+    for metric in REQUIRED_ROWS:
+        if metric not in outlet_record:
+            outlet_record[metric] = 0.0
+    
+    print(f"[INFO] Successfully processed {sheet_name} - Revenue: {outlet_record.get('TOTAL REVENUE', 0)}")
+    return outlet_record, None
+
+def _extract_outlet_sheet_counted(sheet_name, df_raw):
+    """_extract_outlet_sheet as a pool task: (its result, its normalizer counts)."""
+    with counting_norm_lookups() as counts:
+        return _extract_outlet_sheet(sheet_name, df_raw), counts
+
+def process_multi_worksheet_outlets(source, outlet_sheets, pool=None, workers=None):
     """
     Process multi-worksheet outlet files where each outlet has its own sheet
+
+    All sheets are loaded in one pass over the open workbook, then extracted
+    concurrently on the shared thread or process pool (SHEET_POOL /
+    SHEET_POOL_WORKERS), at most workers (default and cap: the pool's size)
+    at a time; workers=1 extracts them inline.
     """
     try:
         print(f"[INFO] Processing {len(outlet_sheets)} outlet sheets from multi-worksheet file")
+        session = WorkbookSession.ensure(source)
+        pool = pool or SHEET_POOL
+        workers = max(1, min(workers or SHEET_POOL_WORKERS, SHEET_POOL_WORKERS, len(outlet_sheets) or 1))
         
-        all_outlet_data = []
-        processed_outlets = 0
-        failed_outlets = 0
-        
-        # Required financial metrics to extract
-        required_metrics = [
-            "Direct Income",
-            "TOTAL REVENUE", 
-            "COGS",
-            "Outlet Expenses",
-            "EBIDTA",
-            "Finance Cost",
-            "01-Bank Charges",
-            "02-Interest on Borrowings",
-            "03-Interest on Vehicle Loan",
-            "04-MG",
-            "PBT",
-            "WASTAGE"
-        ]
-        
-        for sheet_name in outlet_sheets:
-            try:
-                print(f"[INFO] Processing outlet sheet: {sheet_name}")
-                
-                # Read the sheet with no header to preserve raw layout
-                df_raw = pd.read_excel(file_path, sheet_name=sheet_name, header=None, engine='openpyxl')
-                
-                # Find the header row containing "Particulars"
-                hdr_row, part_col = detect_header(df_raw)
-                print(f"[INFO] Header found at row {hdr_row}, column {part_col} for {sheet_name}")
-                
-                # Extract outlet name and manager from the sheet
-                # Look for outlet name in the first few rows
-                outlet_name = ""
-                manager_name = ""
-                month = "June-25"  # Default month, can be extracted from sheet if needed
-                
-                # Try to find outlet name and manager in the first few rows
-                for row_idx in range(min(5, df_raw.shape[0])):
-                    for col_idx in range(min(5, df_raw.shape[1])):
-                        cell_value = str(df_raw.iloc[row_idx, col_idx]).strip()
-                        if cell_value and cell_value != 'nan' and cell_value != 'None':
-                            # Look for outlet name patterns
-                            if any(keyword in cell_value.lower() for keyword in ['mg', 'nagar', 'layout', 'road', 'club', 'paakashaala', 'nagar', 'layout']):
-                                outlet_name = cell_value
-                            # Look for manager name patterns (contains numbers and names)
-                            elif any(char.isdigit() for char in cell_value) and any(char.isalpha() for char in cell_value):
-                                if '-' in cell_value:
-                                    manager_name = cell_value.split('-', 1)[1].strip()
-                                else:
-                                    manager_name = cell_value
-                
-                # If we couldn't find outlet name, use sheet name
-                if not outlet_name:
-                    outlet_name = sheet_name
-                
-                # If we couldn't find manager name, use sheet name
-                if not manager_name:
-                    manager_name = sheet_name
-                
-                print(f"[INFO] Extracted - Outlet: {outlet_name}, Manager: {manager_name}")
-                
-                # Process the financial data from this sheet
-                df_after = df_raw.iloc[hdr_row:, :].copy()
-                
-                # Check if we have enough rows
-                if df_after.shape[0] < 2:
-                    print(f"[WARNING] Not enough data rows in sheet {sheet_name}")
-                    failed_outlets += 1
-                    continue
-                
-                # Set column names from first row
-                df_after.columns = df_after.iloc[0]
-                df_after = df_after.iloc[1:].reset_index(drop=True)
-                
-                # Check if 'Particulars' column exists
-                if 'Particulars' not in df_after.columns:
-                    print(f"[WARNING] 'Particulars' column not found in sheet {sheet_name}")
-                    failed_outlets += 1
-                    continue
-                
-                # Filter to get only the required metrics
-                df_after["Particulars"] = df_after["Particulars"].astype(str).apply(norm_str)
-                df_metrics = df_after[df_after["Particulars"].isin(required_metrics)].reset_index(drop=True)
-                
-                if df_metrics.empty:
-                    print(f"[WARNING] No required metrics found in sheet {sheet_name}")
-                    failed_outlets += 1
-                    continue
-                
-                # Extract the financial values (usually in the first data column after Particulars)
-                # Look for the first column with numeric data
-                data_column = None
-                for col in df_metrics.columns[1:]:
-                    if col != "Particulars" and col is not None:
-                        # Check if this column has numeric data
-                        try:
-                            numeric_values = pd.to_numeric(df_metrics[col], errors='coerce')
-                            if not numeric_values.isna().all() and numeric_values.sum() > 0:
-                                data_column = col
-                                break
-                        except:
-                            continue
-                
-                if data_column is None:
-                    print(f"[WARNING] No numeric data column found in sheet {sheet_name}")
-                    print(f"[DEBUG] Available columns: {list(df_metrics.columns)}")
-                    failed_outlets += 1
-                    continue
-                
-                # Create outlet record
-                outlet_record = {
-                    "Outlet": outlet_name,
-                    "Outlet Manager": manager_name,
-                    "Month": month
-                }
-                
-                # Extract each metric value
-                for _, row in df_metrics.iterrows():
-                    metric_name = row["Particulars"]
-                    metric_value = pd.to_numeric(row[data_column], errors='coerce')
-                    if not pd.isna(metric_value):
-                        outlet_record[metric_name] = float(metric_value)
-                    else:
-                        outlet_record[metric_name] = 0.0
-                
-                # Ensure all required metrics are present
-                for metric in required_metrics:
-                    if metric not in outlet_record:
-                        outlet_record[metric] = 0.0
-                
-                all_outlet_data.append(outlet_record)
-                processed_outlets += 1
-                print(f"[INFO] Successfully processed {sheet_name} - Revenue: {outlet_record.get('TOTAL REVENUE', 0)}")
-                
-            except Exception as sheet_error:
-                print(f"[ERROR] Failed to process sheet {sheet_name}: {str(sheet_error)}")
-                failed_outlets += 1
-                continue
+        report_progress("sheet_load")
+        load_start = time.perf_counter()
+        sheets = session.load_sheets(outlet_sheets)
+        load_seconds = time.perf_counter() - load_start
+        print(f"[INFO] Loaded {len(sheets)} sheets in {load_seconds:.2f}s")
+
+        # Header detection and extraction happen together inside each sheet task
+        report_progress("block_extraction")
+
+        extract_start = time.perf_counter()
+        if workers == 1:
+            results = [_extract_outlet_sheet(name, sheets[name]) for name in outlet_sheets]
+        else:
+            executor = shared_pool(f"sheets-{pool}", pool, SHEET_POOL_WORKERS)
+            outcomes = bounded_map(executor, _extract_outlet_sheet_counted, outlet_sheets,
+                                   [sheets[name] for name in outlet_sheets], limit=workers)
+            for _, counts in outcomes:
+                merge_norm_counts(counts)
+            results = [result for result, _ in outcomes]
+        extract_seconds = time.perf_counter() - extract_start
+
+        # Keep sheet order regardless of completion order
+        all_outlet_data = [record for record, _ in results if record is not None]
+        sheet_reports = [report for _, report in results]
+        processed_outlets = len(all_outlet_data)
+        failed_outlets = len(sheet_reports) - processed_outlets
         
-        print(f"[INFO] Multi-worksheet processing complete: {processed_outlets} outlets processed, {failed_outlets} failed")
+        timing = {
+            "load_seconds": round(load_seconds, 4),
+            "extract_seconds": round(extract_seconds, 4),
+            "pool": pool,
+            "workers": workers
+        }
+        print(f"[INFO] Multi-worksheet processing complete: {processed_outlets} outlets processed, {failed_outlets} failed "
+              f"({pool} pool, {workers} workers, {extract_seconds:.2f}s)")
         
         if not all_outlet_data:
-            raise ValueError("No outlet data could be extracted from any worksheet")
+            return {
+                "success": False,
+                "error": "Multi-worksheet processing failed: No outlet data could be extracted from any worksheet",
+                "sheets": sheet_reports,
+                "timing": timing
+            }
         
         # Convert to DataFrame for final processing
         df_final = pd.DataFrame(all_outlet_data)
         
-        # Ensure proper column order
-        required_order = [
-            "Outlet", "Outlet Manager", "Month",
-            "Direct Income", "TOTAL REVENUE", "COGS", "Outlet Expenses",
-            "EBIDTA", "Finance Cost",
-            "01-Bank Charges", "02-Interest on Borrowings",
-            "03-Interest on Vehicle Loan", "04-MG",
-            "PBT", "WASTAGE"
-        ]
-        
         # Add missing columns
-        for col in required_order:
+        for col in REQUIRED_ORDER:
             if col not in df_final.columns:
                 df_final[col] = 0.0
         
-        df_final = df_final[required_order].copy()
+        df_final = df_final[REQUIRED_ORDER].copy()
         
         # Convert to list of dictionaries for JSON serialization
-        df_final_clean = df_final.replace({np.nan: None})
-        result_data = df_final_clean.to_dict('records')
-        
-        return {
-            "success": True,
-            "data": result_data,
-            "outlets_count": len(df_final),
-            "processed_outlets": processed_outlets,
-            "failed_outlets": failed_outlets,
-            "message": f"Successfully processed {processed_outlets} outlets from {len(outlet_sheets)} worksheets (multi-worksheet format)"
-        }
+        report_progress("serialization")
+        return parse_result(
+            df_final,
+            outlets_count=len(df_final),
+            processed_outlets=processed_outlets,
+            failed_outlets=failed_outlets,
+            sheets=sheet_reports,
+            timing=timing,
+            message=f"Successfully processed {processed_outlets} outlets from {len(outlet_sheets)} worksheets (multi-worksheet format)"
+        )
         
     except Exception as e:
         return {
@@ -494,291 +1442,1924 @@ def process_multi_worksheet_outlets(file_path, outlet_sheets):
             "traceback": traceback.format_exc()
         }
 
-def process_financial_data(file_path):
+# ------------------------------
+# Format sniffing
+# ------------------------------
+# Rows read from the top of a sheet to classify it
+SNIFF_ROWS = 30
+CLEAN_METRIC_COLUMNS = ['TOTAL REVENUE', 'Direct Income', 'COGS', 'EBIDTA']
+
+def _sniff_sheet(df_head):
+    """Cheap layout facts about the first rows of one sheet."""
+    if df_head.empty:
+        return {"clean": False, "particulars": False, "month_columns": 0}
+    first_row = set(v for v in df_head.iloc[0].tolist() if isinstance(v, str))
+    grid = text_label_grid(df_head)
+    codes, uniques = pd.factorize(grid.ravel())
+    has_label = np.array(["PARTICULARS" in u for u in uniques], dtype=bool)
+    is_month = np.array([bool(HEADER_MONTH_RE.match(u)) for u in uniques], dtype=bool)
+    return {
+        # Same test the clean path always used on the header row
+        "clean": ("Outlet" in first_row and "Outlet Manager" in first_row
+                  and any(col in first_row for col in CLEAN_METRIC_COLUMNS)),
+        "particulars": bool(has_label[codes].any()),
+        "month_columns": int(is_month[codes].reshape(grid.shape).sum(axis=1).max()),
+    }
+
+def sniff_workbook(session):
+    """
+    Classify a workbook from its sheet names and the first SNIFF_ROWS rows of
+    its sheets, so it is parsed once by the right extractor:
+
+      outlet_wise      an "Outlet wise" sheet (Outlet PL June-25.xlsx)
+      clean            outlets as rows with metric columns (data5.xlsx)
+      raw              (Month, %) column blocks per outlet (data4.xlsx)
+      multi_worksheet  one outlet per sheet, each with its own Particulars
+                       column and a single value column
+
+    Anything else is treated as raw, whose extractor reports what is missing.
+    """
+    start = time.perf_counter()
+    sheet_names = session.sheet_names
+    outlet_sheets = []
+
+    if "Outlet wise" in sheet_names:
+        fmt = "outlet_wise"
+    else:
+        first = _sniff_sheet(session.raw(nrows=SNIFF_ROWS))
+        if first["clean"]:
+            fmt = "clean"
+        elif first["month_columns"] >= 2 or len(sheet_names) == 1:
+            fmt = "raw"
+        else:
+            for name in sheet_names:
+                facts = _sniff_sheet(session.raw(name, nrows=SNIFF_ROWS))
+                if facts["particulars"] and facts["month_columns"] <= 1:
+                    outlet_sheets.append(name)
+            fmt = "multi_worksheet" if len(outlet_sheets) >= 2 else "raw"
+
+    return {
+        "format": fmt,
+        "outlet_sheets": outlet_sheets,
+        "seconds": time.perf_counter() - start,
+    }
+
+def process_financial_data(source, filename=None):
     """
     Process financial data using the logic from data_backend.py
+
+    source may be a file path, the uploaded bytes, or a seekable binary buffer;
+    filename (optional) is only used as a hint when sniffing the file format.
     """
     try:
-        # First, check if this file has an "Outlet wise" worksheet (like Outlet PL June-25.xlsx)
-        try:
-            # Read all sheet names to check for "Outlet wise" worksheet
-            xl_file = pd.ExcelFile(file_path, engine='openpyxl')
-            sheet_names = xl_file.sheet_names
-            
-            print(f"[INFO] Found {len(sheet_names)} worksheets: {sheet_names}")
-            
-            # Check if "Outlet wise" worksheet exists
-            if "Outlet wise" in sheet_names:
-                print("[INFO] Found 'Outlet wise' worksheet, processing it directly")
-                return process_outlet_wise_worksheet(file_path)
-            
-        except Exception as multi_error:
-            print(f"[INFO] Multi-worksheet detection failed, trying single sheet: {multi_error}")
-        
-        # First, try to read as a clean outlet-based format (like data5.xlsx)
-        try:
-            df_clean = pd.read_excel(file_path, engine="openpyxl")
-            
-            # Check if this is already in the clean format (outlets as rows)
-            # Also check for financial metrics to ensure it's a complete clean format
-            has_outlet_col = 'Outlet' in df_clean.columns
-            has_manager_col = 'Outlet Manager' in df_clean.columns
-            has_financial_metrics = any(col in df_clean.columns for col in ['TOTAL REVENUE', 'Direct Income', 'COGS', 'EBIDTA'])
-            
-            print(f"[DEBUG] Clean format detection: has_outlet_col={has_outlet_col}, has_manager_col={has_manager_col}, has_financial_metrics={has_financial_metrics}")
-            print(f"[DEBUG] Available columns: {list(df_clean.columns)}")
-            
-            if has_outlet_col and has_manager_col and has_financial_metrics:
-                print("[INFO] Detected clean outlet-based format")
-                
-                # Process the clean format directly
-                df_final = df_clean.copy()
-                
-                # Ensure required columns exist
-                required_columns = [
-                    "Outlet", "Outlet Manager", "Month",
-                    "Direct Income", "TOTAL REVENUE", "COGS", "Outlet Expenses",
-                    "EBIDTA", "Finance Cost", "PBT", "WASTAGE"
-                ]
-                
-                # Add missing columns with NaN values
-                for col in required_columns:
-                    if col not in df_final.columns:
-                        df_final[col] = np.nan
-                
-                # Reorder columns
-                df_final = df_final[required_columns].copy()
-                
-                # Convert numeric columns
-                numeric_cols = [c for c in required_columns if c not in ("Outlet", "Outlet Manager", "Month")]
-                df_final[numeric_cols] = df_final[numeric_cols].apply(pd.to_numeric, errors="coerce")
-                
-                # Filter out only consolidated summary outlets (include all outlets regardless of revenue)
-                df_final_filtered = df_final[
-                    (~df_final['Outlet'].str.contains('consolidated', case=False, na=False))
-                ].copy()
-                
-                # Convert to list of dictionaries for JSON serialization
-                # Replace NaN values with None for proper JSON serialization
-                df_final_clean = df_final_filtered.replace({np.nan: None})
-                result_data = df_final_clean.to_dict('records')
-                
-                return {
-                    "success": True,
-                    "data": result_data,
-                    "outlets_count": len(df_final_filtered),
-                    "message": f"Successfully processed {len(df_final_filtered)} outlet records from clean format (includes all outlets regardless of revenue status)"
-                }
-                
-        except Exception as clean_error:
-            print(f"[INFO] Clean format failed, trying raw format: {clean_error}")
-            print(f"[DEBUG] Clean format error details: {str(clean_error)}")
-            import traceback
-            print(f"[DEBUG] Clean format traceback: {traceback.format_exc()}")
-        
-        # If clean format fails, try the original raw processing logic
-        print("[INFO] Trying raw format processing...")
-        
-        # Read workbook with NO header (keep raw layout)
-        # For large files, limit the number of rows to process
-        df0 = pd.read_excel(file_path, header=None, engine="openpyxl", nrows=1000)
-        print(f"[INFO] Raw data shape (limited to 1000 rows): {df0.shape}")
-        
-        # Detect header row/column
-        hdr_row, part_col = detect_header(df0)
-        print(f"[INFO] Header detected at row={hdr_row}, particulars_col={part_col}")
+        # Open the workbook once; every detector and extractor below shares it
+        report_progress("sheet_load")
+        with counting_norm_lookups() as counts, WorkbookSession(source, filename) as session:
+            result = _process_workbook(session)
+            file_format = session.file_format
+
+        cache_usage = norm_cache_stats(counts)
+        print(f"[INFO] Normalizer cache: {cache_usage['hits']} hits, {cache_usage['misses']} misses")
+        metadata = result.setdefault("metadata", {})
+        metadata["file_format"] = file_format
+        metadata["normalizer_cache"] = cache_usage
+        return result
 
-        # Rows above header where Outlet/Manager live (adjust if needed)
-        outlet_row  = max(hdr_row - 1, 0)   # often the outlet names
-        manager_row = max(hdr_row - 3, 0)   # often the managers
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "traceback": traceback.format_exc()
+        }
 
-        # Build headered DataFrame from hdr_row
-        df_after = df0.iloc[hdr_row:, :].copy()
+def _process_workbook(session):
+    sniff = None
+    try:
+        sheet_names = session.sheet_names
+        print(f"[INFO] Found {len(sheet_names)} worksheets: {sheet_names}")
+
+        # Classify from sheet names and the first rows, then parse exactly once
+        report_progress("header_detection")
+        sniff = sniff_workbook(session)
+        fmt = sniff["format"]
+        print(f"[INFO] Detected '{fmt}' format in {sniff['seconds']:.3f}s")
+
+        if fmt == "outlet_wise":
+            print("[INFO] Found 'Outlet wise' worksheet, processing it directly")
+            result = process_outlet_wise_worksheet(session)
+        elif fmt == "clean":
+            print("[INFO] Detected clean outlet-based format")
+            result = process_clean_format(session)
+        elif fmt == "multi_worksheet":
+            result = process_multi_worksheet_outlets(session, sniff["outlet_sheets"])
+        else:
+            print("[INFO] Trying raw format processing...")
+            result = process_raw_format(session)
+
+        result.setdefault("metadata", {}).update(_format_metadata(sniff))
+        return result
 
-        # Build a parallel array of original column indices
-        orig_idx_full = np.arange(df0.shape[1])
-        orig_idx_after = orig_idx_full.copy()
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "traceback": traceback.format_exc(),
+            "metadata": _format_metadata(sniff)
+        }
 
-        # Set header from the first row of df_after
-        df_after.columns = df_after.iloc[0]
-        df_after = df_after.iloc[1:].reset_index(drop=True)
+def _format_metadata(sniff):
+    if sniff is None:
+        return {}
+    return {"format": sniff["format"], "sniff_seconds": round(sniff["seconds"], 4)}
 
-        # Slice columns from 'Particulars' **by position**
-        df_after = df_after.iloc[:, part_col:].copy()
-        orig_idx_after = orig_idx_after[part_col:]  # keep the same slice for the index map
+def process_clean_format(source):
+    """
+    Process a clean outlet-based sheet (like data5.xlsx): one row per outlet
+    with the metrics as columns.
+    """
+    session = WorkbookSession.ensure(source)
+
+    report_progress("block_extraction")
+    df_final = session.frame().copy()
+
+    # Ensure required columns exist
+    required_columns = [
+        "Outlet", "Outlet Manager", "Month", "Period",
+        "Direct Income", "TOTAL REVENUE", "COGS", "Outlet Expenses",
+        "EBIDTA", "Finance Cost", "PBT", "WASTAGE"
+    ]
+
+    # Tag the month's real period when the Month column carries a year
+    if "Period" not in df_final.columns and "Month" in df_final.columns:
+        df_final["Period"] = df_final["Month"].map(month_period)
+
+    # Add missing columns with NaN values
+    for col in required_columns:
+        if col not in df_final.columns:
+            df_final[col] = np.nan
+
+    # Reorder columns
+    df_final = df_final[required_columns].copy()
+
+    # Convert numeric columns
+    numeric_cols = [c for c in required_columns if c not in ID_COLUMNS]
+    df_final[numeric_cols] = df_final[numeric_cols].apply(pd.to_numeric, errors="coerce")
+
+    # Filter out only consolidated summary outlets (include all outlets regardless of revenue)
+    df_final_filtered = df_final[
+        (~df_final['Outlet'].str.contains('consolidated', case=False, na=False))
+    ].copy()
+
+    # Convert to list of dictionaries for JSON serialization
+    # Replace NaN values with None for proper JSON serialization
+    report_progress("serialization")
+    return parse_result(
+        df_final_filtered,
+        outlets_count=len(df_final_filtered),
+        message=f"Successfully processed {len(df_final_filtered)} outlet records from clean format (includes all outlets regardless of revenue status)"
+    )
+
+def process_raw_format(source):
+    """
+    Process a raw P&L sheet (like data4.xlsx) laid out as (Month, %) column
+    blocks per outlet.
+    """
+    session = WorkbookSession.ensure(source)
+
+    # Stream the first worksheet with NO header (keep raw layout); only the
+    # header area and the required metric rows are held in memory
+    df_final = extract_outlet_blocks(session)
+
+    # Convert to list of dictionaries for JSON serialization
+    # Replace NaN values with None for proper JSON serialization
+    report_progress("serialization")
+    return parse_result(
+        df_final,
+        outlets_count=len(df_final),
+        message=f"Successfully processed {len(df_final)} outlet records from raw format",
+        metadata={"layout_plan": df_final.attrs.get("layout_plan")}
+    )
 
-        # Rename first column to 'Particulars'
-        new_cols = list(df_after.columns)
-        new_cols[0] = "Particulars"
-        df_after.columns = new_cols
+# ------------------------------
+# Content-addressed parse result cache
+# ------------------------------
+# Bump when the output of process_financial_data changes in a way the
+# source hash below would not catch (e.g. a dependency upgrade)
+EXTRACTION_VERSION = "1"
+PARSE_CACHE_DIR = os.getenv('PARSE_CACHE_DIR', '.parse_cache')
+PARSE_CACHE_MEMORY_ITEMS = int(os.getenv('PARSE_CACHE_MEMORY_ITEMS', 32))
+PARSE_CACHE_DISK_BYTES = int(os.getenv('PARSE_CACHE_DISK_BYTES', 256 * 1024 * 1024))
+# Names of version directories under PARSE_CACHE_DIR (see _extraction_version)
+PARSE_CACHE_VERSION_RE = re.compile(r"^[0-9a-f]{16}$")
+
+def _extraction_version():
+    """Version key: changes whenever this module or the parsing libraries change."""
+    import openpyxl
+    digest = hashlib.sha256(Path(__file__).read_bytes())
+    digest.update(f"{EXTRACTION_VERSION}|{pd.__version__}|{np.__version__}|{openpyxl.__version__}".encode())
+    return digest.hexdigest()[:16]
+
+class ParseCache:
+    """
+    Two-tier (memory + disk) LRU cache of process_financial_data results keyed
+    by the SHA-256 of the uploaded bytes. Entries live under a directory named
+    after the extraction version, so a logic change never serves stale results.
+    The directory is created on first use, and the directories of other
+    versions under the same root are removed then, so disk_bytes bounds the
+    whole cache and not just the current version.
+    """
 
-        # Compute a mask of entirely empty columns (over the data area)
-        # Be more conservative - only remove columns that are completely empty AND don't have month patterns
-        empty_cols_mask = df_after.isna().all(axis=0).values
-        
-        # Additional check: don't remove columns that might be outlet columns (have month patterns)
-        month_re = re.compile(r"^[A-Za-z]+-\d{2}(?:\.\d+)?$")
-        pct_re = re.compile(r"^%(?:\.\d+)?$")
-        
-        for i, col in enumerate(df_after.columns):
-            if empty_cols_mask[i]:  # If column is empty
-                col_name = norm_str(col)
-                # Don't remove if it looks like a month column or % column
-                if month_re.match(col_name) or pct_re.match(col_name):
-                    empty_cols_mask[i] = False
-        
-        # Apply the same mask to BOTH df_after and the index map
-        df_after = df_after.loc[:, ~empty_cols_mask].copy()
-        orig_idx_after = orig_idx_after[~empty_cols_mask]
-
-        print(f"[INFO] After filtering empty columns: {df_after.shape}")
-
-        # Filter required metrics
-        required_rows = [
-            "Direct Income",
-            "TOTAL REVENUE",
-            "COGS",
-            "Outlet Expenses",
-            "EBIDTA",
-            "Finance Cost",
-            "01-Bank Charges",
-            "02-Interest on Borrowings",
-            "03-Interest on Vehicle Loan",
-            "04-MG",
-            "PBT",
-            "WASTAGE",
-        ]
-        
-        # Additional interest-related metrics for better analysis
-        interest_metrics = [
-            "01-Bank Charges",
-            "02-Interest on Borrowings", 
-            "03-Interest on Vehicle Loan",
-            "04-MG",
-            "Finance Cost"
-        ]
-        df_after["Particulars"] = df_after["Particulars"].astype(str).apply(norm_str)
-        df_req = df_after[df_after["Particulars"].isin(required_rows)].reset_index(drop=True)
-        
-        print(f"[INFO] Found {len(df_req)} required metric rows")
-        
-        if df_req.empty:
-            print("DEBUG — Available 'Particulars' values (first 30):")
-            available_particulars = df_after["Particulars"].dropna().unique()[:30]
-            print(available_particulars)
-            
-            # Try to find similar matches
-            print("DEBUG — Looking for similar matches...")
-            for req_row in required_rows:
-                matches = [p for p in available_particulars if req_row.lower() in str(p).lower()]
-                if matches:
-                    print(f"  '{req_row}' might match: {matches}")
-            
-            raise ValueError("None of the required rows were found under 'Particulars'.")
-
-        # Detect all outlet (Month, %) column pairs by **position** - AFTER filtering
-        cols = list(df_after.columns)  # Use df_after (after empty column filtering) instead of df_req
-        month_re = re.compile(r"^[A-Za-z]+-\d{2}(?:\.\d+)?$")
-        pct_re   = re.compile(r"^%(?:\.\d+)?$")
-
-        outlet_blocks = []
-        for i in range(1, len(cols) - 1):  # 0 is 'Particulars'
-            cname = norm_str(cols[i])
-            nname = norm_str(cols[i+1])
-            if month_re.match(cname) and (nname == "%" or pct_re.match(nname)):
-                outlet_blocks.append((i, cols[i], cols[i+1]))
-
-        print(f"[INFO] Found {len(outlet_blocks)} outlet blocks")
-
-        if not outlet_blocks:
-            print("DEBUG — Columns after 'Particulars':", cols[:20], " ... total:", len(cols))
-            print("DEBUG — Looking for month patterns...")
-            for i, col in enumerate(cols[1:6]):  # Check first 5 columns after Particulars
-                print(f"  Column {i+1}: '{col}' -> month_match: {bool(month_re.match(norm_str(col)))}")
-            raise ValueError("No Month/% pairs detected (e.g., 'June-25' followed by '%').")
-
-        # Build final rows
-        final_rows = []
-        skipped_count = 0
-
-        for (val_idx, val_col_name, pct_col_name) in outlet_blocks:
-            # Map df_after column position -> original df0 column index
-            # val_idx now corresponds directly to orig_idx_after since we used df_after.columns
-            orig_col_idx = int(orig_idx_after[val_idx])
-
-            # Outlet / Manager via robust scanning
-            outlet_name  = get_name(df0, outlet_row,  orig_col_idx, max_up=6, max_dx=2)
-            manager_name = get_name(df0, manager_row, orig_col_idx, max_up=8, max_dx=2)
-
-            # Skip consolidated summary column if it happens to be detected
-            if outlet_name.lower() == "consolidated summary" or "consolidated" in outlet_name.lower():
-                skipped_count += 1
+    def __init__(self, directory, memory_items, disk_bytes, version):
+        self.version = version
+        self.root = Path(directory)
+        self.directory = self.root / version
+        self.memory_items = memory_items
+        self.disk_bytes = disk_bytes
+        self._memory = OrderedDict()  # key -> JSON text
+        self._lock = threading.Lock()
+        self._prepared = False
+        self.stats = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    def _prepare(self):
+        """Create this version's directory and drop stale versions (once, under the lock)."""
+        if self._prepared:
+            return
+        self._prepared = True
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            stale = [p for p in self.root.iterdir()
+                     if p.is_dir() and p.name != self.version and PARSE_CACHE_VERSION_RE.match(p.name)]
+        except OSError as e:
+            print(f"[WARNING] Parse cache directory {self.directory} unavailable: {e}")
+            return
+        for path in stale:
+            shutil.rmtree(path, ignore_errors=True)
+        if stale:
+            print(f"[INFO] Removed {len(stale)} stale parse cache version(s) from {self.root}")
+
+    @staticmethod
+    def key_for(source, chunk_size=1024 * 1024):
+        """SHA-256 of a path, bytes or binary buffer (buffers are rewound)."""
+        source = as_binary_source(source)
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, 'rb') as f:
+                return ParseCache.key_for(f, chunk_size)
+
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: source.read(chunk_size), b''):
+            digest.update(chunk)
+        source.seek(0)
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return self.directory / f"{key}.json"
+
+    def get(self, key):
+        with self._lock:
+            text = self._memory.get(key)
+            if text is not None:
+                self._memory.move_to_end(key)
+                self.stats["hits"] += 1
+                self.stats["memory_hits"] += 1
+                return json.loads(text)
+
+            self._prepare()
+            path = self._path(key)
+            try:
+                text = path.read_text(encoding='utf-8')
+                os.utime(path)  # mark as recently used for disk LRU
+            except OSError:
+                self.stats["misses"] += 1
+                return None
+
+            self.stats["hits"] += 1
+            self.stats["disk_hits"] += 1
+            self._remember(key, text)
+            return json.loads(text)
+
+    def put(self, key, result):
+        text = json.dumps(result)
+        with self._lock:
+            self._remember(key, text)
+            self._prepare()
+            path = self._path(key)
+            tmp_path = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+            try:
+                tmp_path.write_text(text, encoding='utf-8')
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"[WARNING] Could not write parse cache entry {key[:12]}: {e}")
+                return
+            self._evict_disk()
+
+    def _remember(self, key, text):
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _evict_disk(self):
+        entries = []
+        total = 0
+        for path in self.directory.glob("*.json"):
+            try:
+                st = path.stat()
+            except OSError:
                 continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        # Oldest access first
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= self.disk_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            self.stats["evictions"] += 1
+
+    def report(self):
+        with self._lock:
+            return {
+                **self.stats,
+                "version": self.version,
+                "memory_entries": len(self._memory),
+            }
+
+parse_cache = ParseCache(PARSE_CACHE_DIR, PARSE_CACHE_MEMORY_ITEMS, PARSE_CACHE_DISK_BYTES, _extraction_version())
+
+def process_financial_data_cached(source, filename=None):
+    """
+    process_financial_data behind the content-addressed parse cache. Only
+    successful results are stored, metadata included, so a hit has the shape
+    of a miss: format, sniff and layout-plan details are those of the parse
+    that filled the entry, the normalizer figures are this call's (none) and
+    parse_cache.hit tells the two apart.
+    """
+    report_progress("parse_cache")
+    key = ParseCache.key_for(source)
+    result = parse_cache.get(key)
+    hit = result is not None
+    if hit:
+        result.setdefault("metadata", {})["normalizer_cache"] = norm_cache_stats({"lookups": 0, "misses": 0})
+    else:
+        result = process_financial_data(source, filename)
+        if result.get("success"):
+            parse_cache.put(key, result)
+
+    result.setdefault("metadata", {})["parse_cache"] = {"hit": hit, "key": key[:16]}
+    return result
+
+# ------------------------------
+# Batch processing (many monthly workbooks per request)
+# ------------------------------
+BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', os.cpu_count() or 1))
+BATCH_MAX_FILES = int(os.getenv('BATCH_MAX_FILES', 24))
+BATCH_MAX_BYTES = int(os.getenv('BATCH_MAX_BYTES', 200 * 1024 * 1024))
+
+FILENAME_MONTH_RE = re.compile(r"(?<![A-Za-z])(" + "|".join(sorted(MONTH_NAMES, key=len, reverse=True)) + r")(?![a-z])", re.I)
+
+def month_from_filename(filename):
+    """'Outlet PL June-25.xlsx' -> 'June' (None when the name carries no month)."""
+    match = FILENAME_MONTH_RE.search(Path(filename).stem)
+    return MONTH_NAMES[match.group(1).lower()] if match else None
+
+def _process_batch_item(filename, data, capture_log=False):
+    """
+    Parse one workbook of a batch. In a pool worker process (capture_log) its
+    output is captured and returned, for the parent to print under the file's
+    name; inline it prints as usual. stdout is only swapped inside the worker
+    process, which runs one item at a time.
+    """
+    start = time.perf_counter()
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log) if capture_log else contextlib.nullcontext():
+        try:
+            result = process_financial_data_cached(data, filename)
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+    return filename, result, time.perf_counter() - start, log.getvalue()
+
+def collect_batch_files(uploads):
+    """
+    Expand a batch request into (filename, bytes) pairs: plain workbooks are
+    taken as-is, .zip archives contribute every workbook inside them.
+    """
+    items = []
+    total = 0
+
+    def check_count():
+        if len(items) >= BATCH_MAX_FILES:
+            raise ValueError(f"A batch can hold at most {BATCH_MAX_FILES} workbooks")
+
+    for upload in uploads:
+        name = secure_filename(upload.filename or "")
+        if name.lower().endswith(".zip"):
+            with zipfile.ZipFile(spool_upload(upload)) as archive:
+                for info in archive.infolist():
+                    member = Path(info.filename)
+                    if info.is_dir() or member.name.startswith(".") or "__MACOSX" in member.parts:
+                        continue
+                    if not allowed_file(member.name):
+                        continue
+                    # Checked before each member is read, not after the whole archive
+                    check_count()
+                    total += info.file_size
+                    if total > BATCH_MAX_BYTES:
+                        raise ValueError(f"Batch exceeds {BATCH_MAX_BYTES} bytes uncompressed")
+                    items.append((secure_filename(member.name), archive.read(info)))
+        elif allowed_file(name):
+            check_count()
+            data = upload.read()
+            total += len(data)
+            if total > BATCH_MAX_BYTES:
+                raise ValueError(f"Batch exceeds {BATCH_MAX_BYTES} bytes")
+            items.append((name, data))
+        else:
+            raise ValueError(f"File type not allowed: {name}")
+    return items
+
+def process_batch(items, workers=None):
+    """
+    Parse several workbooks concurrently on the shared batch process pool
+    (BATCH_WORKERS), at most workers (default and cap: the pool's size) at a
+    time, and merge their outlet records into one dataset tagged with source
+    file and month. workers=1 parses them inline.
+    """
+    workers = max(1, min(workers or BATCH_WORKERS, BATCH_WORKERS, len(items)))
+    wall_start = time.perf_counter()
+    if workers == 1:
+        outcomes = [_process_batch_item(name, data) for name, data in items]
+    else:
+        executor = shared_pool("batch", "process", BATCH_WORKERS)
+        names, datas = zip(*items)
+        outcomes = bounded_map(executor, _process_batch_item, names, datas, [True] * len(items), limit=workers)
+    wall_seconds = time.perf_counter() - wall_start
+
+    merged = []
+    files = []
+    for filename, result, seconds, log in outcomes:
+        for line in log.splitlines():
+            print(f"[{filename}] {line}")
+        file_month = month_from_filename(filename)
+        report = {
+            "filename": filename,
+            "success": bool(result.get("success")),
+            "month": file_month,
+            "seconds": round(seconds, 4),
+        }
+        if result.get("success"):
+            records = result.get("data", [])
+            for record in records:
+                record["Source File"] = filename
+                # Clean-format sheets carry no month: fall back to the file name
+                if not record.get("Month"):
+                    record["Month"] = file_month
+            merged.extend(records)
+            report["outlets_count"] = len(records)
+            report["cache_hit"] = result.get("metadata", {}).get("parse_cache", {}).get("hit", False)
+        else:
+            report["error"] = result.get("error", "Unknown error")
+        files.append(report)
+
+    succeeded = sum(1 for f in files if f["success"])
+    print(f"[INFO] Batch processed {succeeded}/{len(files)} workbooks in {wall_seconds:.2f}s with {workers} workers")
+    return {
+        "success": succeeded > 0,
+        "data": merged,
+        "outlets_count": len(merged),
+        "files": files,
+        "timing": {
+            "wall_seconds": round(wall_seconds, 4),
+            "sum_seconds": round(sum(f["seconds"] for f in files), 4),
+            "workers": workers
+        },
+        "message": f"Processed {succeeded} of {len(files)} workbooks ({len(merged)} outlet records)"
+    }
 
-            # Month label
-            month_label = norm_str(val_col_name)
-            month = month_label.split("-")[0] if "-" in month_label else month_label
+# ------------------------------
+# Async parse jobs
+# ------------------------------
+# Jobs live in this process: run a single gunicorn worker (the Procfile
+# default) or a sticky load balancer so status polls reach the same worker
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+JOB_QUEUE_LIMIT = int(os.getenv('JOB_QUEUE_LIMIT', 16))
+JOB_TTL_SECONDS = int(os.getenv('JOB_TTL_SECONDS', 3600))
 
-            row = {
-                "Outlet": outlet_name,
-                "Outlet Manager": manager_name,
-                "Month": month
+class JobQueue:
+    """
+    Bounded background pool that runs process_financial_data for uploads
+    accepted in async mode and records their stage-by-stage progress.
+    """
+
+    def __init__(self, workers, limit, ttl_seconds):
+        self.limit = limit
+        self.ttl_seconds = ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="parse-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, upload, filename):
+        """
+        Queue an upload buffer (see spool_upload); the job closes it when done.
+        Returns the job status, or None when the queue is full.
+        """
+        with self._lock:
+            self._expire()
+            pending = sum(1 for job in self._jobs.values() if job["status"] in ("queued", "running"))
+            if pending >= self.limit:
+                return None
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "filename": filename,
+                "status": "queued",
+                "stage": None,
+                "progress": 0.0,
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
             }
+        self._executor.submit(self._run, job_id, upload, filename)
+        return self.status(job_id)
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+
+    def _stage(self, job_id, stage):
+        if stage in PROGRESS_STAGES:
+            self._update(job_id, stage=stage, progress=round(PROGRESS_STAGES.index(stage) / len(PROGRESS_STAGES), 2))
+
+    def _run(self, job_id, upload, filename=None):
+        self._update(job_id, status="running", started_at=time.time())
+        token = _progress_callback.set(lambda stage: self._stage(job_id, stage))
+        try:
+            result = process_financial_data_cached(upload, filename)
+        except Exception as e:
+            result = {
+                "success": False,
+                "error": f"Processing failed: {str(e)}",
+                "traceback": traceback.format_exc()
+            }
+        finally:
+            _progress_callback.reset(token)
+            upload.close()
+
+        # A failed job keeps the stage it failed in
+        finished = {"stage": "done"} if result.get("success") else {}
+        self._update(
+            job_id,
+            status="done" if result.get("success") else "failed",
+            **finished,
+            progress=1.0,
+            finished_at=time.time(),
+            result=result
+        )
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl_seconds
+        for job_id in [j for j, job in self._jobs.items() if job["finished_at"] and job["finished_at"] < cutoff]:
+            del self._jobs[job_id]
+
+    def status(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            view = {k: v for k, v in job.items() if k != "result"}
+        if view["finished_at"] and view["started_at"]:
+            view["seconds"] = round(view["finished_at"] - view["started_at"], 4)
+        view["stages"] = PROGRESS_STAGES
+        return view
+
+    def result(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return None if job is None else job["result"]
+
+job_queue = JobQueue(JOB_WORKERS, JOB_QUEUE_LIMIT, JOB_TTL_SECONDS)
+
+# ------------------------------
+# Response formats (content negotiation for parse results)
+# ------------------------------
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow responses are optional
+    pa = None
+
+ARROW_STREAM_MIMETYPE = "application/vnd.apache.arrow.stream"
+ARROW_FILE_MIMETYPE = "application/vnd.apache.arrow.file"
+RESPONSE_FORMATS = {
+    # ?format=  ->  mimetype
+    "rows": "application/json",
+    "columns": "application/json",
+    "arrow": ARROW_STREAM_MIMETYPE,
+    "feather": ARROW_FILE_MIMETYPE,
+}
+
+def negotiate_format(req):
+    """
+    Pick the response format for a parse result: an explicit ?format= wins,
+    otherwise the Accept header chooses between row JSON (the default) and
+    Arrow IPC stream / file (Feather v2).
+    """
+    fmt = (req.args.get("format") or req.form.get("format") or "").lower()
+    if fmt:
+        if fmt not in RESPONSE_FORMATS:
+            raise ValueError(f"Unknown format '{fmt}'. Use one of: {', '.join(RESPONSE_FORMATS)}")
+        return fmt
+    best = req.accept_mimetypes.best_match(["application/json", ARROW_STREAM_MIMETYPE, ARROW_FILE_MIMETYPE],
+                                           default="application/json")
+    return {ARROW_STREAM_MIMETYPE: "arrow", ARROW_FILE_MIMETYPE: "feather"}.get(best, "rows")
+
+def result_frame(result):
+    """
+    The DataFrame behind a parse result: the extractor's own (ParseResult), or
+    one rebuilt from the rows for results read back from the parse cache.
+    """
+    frame = getattr(result, "frame", None)
+    return frame if frame is not None else pd.DataFrame.from_records(result.get("data", []))
+
+def result_columns(frame):
+    """Final frame -> (column names, {column: values}) with NaN as None."""
+    values = frame.astype(object).where(frame.notna(), None)
+    return list(frame.columns), {name: values[name].tolist() for name in frame.columns}
+
+def arrow_table(result):
+    """Parse result -> Arrow table; the envelope travels as schema metadata."""
+    table = pa.Table.from_pandas(result_frame(result), preserve_index=False)
+    for i, field in enumerate(table.schema):
+        # Period as a date, the other IDs as strings (an all-empty one arrives
+        # as NaN), and metrics as float64 even when the frame holds whole numbers
+        if field.name == "Period":
+            column = table.column(i).cast(pa.string()).cast(pa.date32())
+        elif field.name in ID_COLUMNS:
+            if pa.types.is_string(field.type):
+                continue
+            column = table.column(i).cast(pa.string())
+        elif pa.types.is_null(field.type) or pa.types.is_integer(field.type):
+            column = table.column(i).cast(pa.float64())
+        else:
+            continue
+        table = table.set_column(i, field.name, column)
+    envelope = {k: v for k, v in result.items() if k != "data"}
+    metadata = {k: json.dumps(v, default=str) for k, v in envelope.items()}
+    return table.replace_schema_metadata(metadata)
+
+def render_result(result, fmt, stream=False):
+    """
+    Serialize a parse result in the negotiated format (errors are always JSON).
+    With stream=True row JSON is sent as a chunked stream.
+    """
+    if fmt == "rows" and stream and result.get("success"):
+        return streamed_json_response(result, request)
+    if fmt == "rows" or not result.get("success"):
+        response = jsonify(result)
+    elif fmt == "columns":
+        names, columns = result_columns(result_frame(result))
+        response = jsonify({**result, "format": "columns", "columns": names, "data": columns})
+    else:
+        if pa is None:
+            response = jsonify({
+                "success": False,
+                "error": "Arrow responses need the 'pyarrow' package on the server"
+            })
+            response.status_code = 406
+            response.vary.add("Accept")
+            return response
+        table = arrow_table(result)
+        sink = pa.BufferOutputStream()
+        writer_cls = pa.ipc.new_stream if fmt == "arrow" else pa.ipc.new_file
+        with writer_cls(sink, table.schema) as writer:
+            writer.write_table(table)
+        response = app.response_class(sink.getvalue().to_pybytes(), mimetype=RESPONSE_FORMATS[fmt])
+    response.vary.add("Accept")
+    return response
 
-            # Copy metrics by position
-            for _, req_row in df_req.iterrows():
-                metric = req_row["Particulars"]
-                value  = req_row.iat[val_idx] if val_idx < df_req.shape[1] else np.nan
-                row[metric] = value
-
-            # Note: Zero revenue outlets are now correctly included in calculations
-
-            final_rows.append(row)
-
-        df_final = pd.DataFrame(final_rows)
-        print(f"[INFO] Created {len(df_final)} final outlet records")
-        print(f"[INFO] Skipped {skipped_count} consolidated outlets")
-        print(f"[INFO] Total outlet blocks processed: {len(outlet_blocks)}")
-
-        # Order + numeric coercion
-        required_order = [
-            "Outlet", "Outlet Manager", "Month",
-            "Direct Income", "TOTAL REVENUE", "COGS", "Outlet Expenses",
-            "EBIDTA", "Finance Cost",
-            "01-Bank Charges", "02-Interest on Borrowings",
-            "03-Interest on Vehicle Loan", "04-MG",
-            "PBT", "WASTAGE"
-        ]
-        for c in required_order:
-            if c not in df_final.columns:
-                df_final[c] = np.nan
-        df_final = df_final[required_order].copy()
-
-        num_cols = [c for c in required_order if c not in ("Outlet", "Outlet Manager", "Month")]
-        df_final[num_cols] = df_final[num_cols].apply(pd.to_numeric, errors="coerce")
+# ------------------------------
+# Streaming and compressed JSON responses
+# ------------------------------
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Row-JSON results with at least this many records are streamed in chunks
+STREAM_JSON_MIN_RECORDS = int(os.getenv('STREAM_JSON_MIN_RECORDS', 1000))
+STREAM_JSON_CHUNK_RECORDS = int(os.getenv('STREAM_JSON_CHUNK_RECORDS', 500))
+# Buffered API responses smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSIBLE_MIMETYPES = {"application/json", ARROW_STREAM_MIMETYPE, ARROW_FILE_MIMETYPE}
+
+def negotiate_encoding(req):
+    """'br' or 'gzip' when the client accepts it (brotli preferred), else None."""
+    accepted = req.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+def _stream_compressor(encoding):
+    """(compress, finish) pair; every compress() output is flushed so a chunk
+    reaches the client as soon as it is produced."""
+    if encoding == "br":
+        c = brotli.Compressor(quality=BROTLI_QUALITY)
+        return (lambda data: c.process(data) + c.flush()), c.finish
+    z = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip container
+    return (lambda data: z.compress(data) + z.flush(zlib.Z_SYNC_FLUSH)), z.flush
+
+def compress_bytes(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+def iter_json_result(result, chunk_records=STREAM_JSON_CHUNK_RECORDS):
+    """
+    Yield a result as JSON text: the envelope first, then the records a chunk
+    at a time. The result itself is already complete in memory (parsing
+    builds every record first); what streaming saves is the serialized copy
+    of the whole document and the wait for it before the first byte.
+    """
+    envelope = json.dumps({k: v for k, v in result.items() if k != "data"},
+                          separators=(",", ":"), default=str)
+    yield envelope[:-1] + ("," if envelope != "{}" else "") + '"data":['
+    records = result.get("data", [])
+    for start in range(0, len(records), chunk_records):
+        chunk = json.dumps(records[start:start + chunk_records], separators=(",", ":"), default=str)
+        yield ("," if start else "") + chunk[1:-1]
+    yield "]}"
+
+def wants_stream(req, result):
+    """?stream=1/0 forces the mode; otherwise large results are streamed."""
+    flag = str(req.args.get("stream", "")).lower()
+    if flag in ("1", "true", "yes"):
+        return True
+    if flag in ("0", "false", "no"):
+        return False
+    return len(result.get("data", [])) >= STREAM_JSON_MIN_RECORDS
+
+def streamed_json_response(result, req):
+    """
+    Chunked (no Content-Length) JSON response, gzip/brotli compressed on the
+    fly when the client accepts it. This improves time to first byte and
+    avoids one full-size JSON string; it does not lower the memory taken by
+    the result records themselves.
+    """
+    encoding = negotiate_encoding(req)
+
+    def generate():
+        if encoding is None:
+            for piece in iter_json_result(result):
+                yield piece.encode()
+            return
+        compress, finish = _stream_compressor(encoding)
+        for piece in iter_json_result(result):
+            out = compress(piece.encode())
+            if out:
+                yield out
+        yield finish()
+
+    response = app.response_class(generate(), mimetype="application/json")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    # Ask reverse proxies not to buffer the stream
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+@app.after_request
+def compress_response(response):
+    """gzip/brotli for buffered API responses (streamed ones compress themselves)."""
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add("Accept-Encoding")
+    data = response.get_data()
+    encoding = negotiate_encoding(request)
+    if encoding is None or len(data) < COMPRESS_MIN_BYTES:
+        return response
+    response.set_data(compress_bytes(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
 
-        # Convert to list of dictionaries for JSON serialization
-        # Replace NaN values with None for proper JSON serialization
-        df_final_clean = df_final.replace({np.nan: None})
-        result_data = df_final_clean.to_dict('records')
-        
-        return {
-            "success": True,
-            "data": result_data,
-            "outlets_count": len(df_final),
-            "message": f"Successfully processed {len(df_final)} outlet records from raw format"
+# ------------------------------
+# Interest analysis
+# ------------------------------
+INTEREST_METRICS = [
+    '01-Bank Charges',
+    '02-Interest on Borrowings',
+    '03-Interest on Vehicle Loan',
+    '04-MG',
+    'Finance Cost',
+]
+# outlets table column for each field of an extracted outlet record
+OUTLET_DB_COLUMNS = {
+    "Outlet": "outlet",
+    "Outlet Manager": "outlet_manager",
+    "Month": "month",
+    "Period": "period",
+    "Direct Income": "direct_income",
+    "TOTAL REVENUE": "total_revenue",
+    "COGS": "cogs",
+    "Outlet Expenses": "outlet_expenses",
+    "EBIDTA": "ebidta",
+    "Finance Cost": "finance_cost",
+    "01-Bank Charges": "bank_charges",
+    "02-Interest on Borrowings": "interest_on_borrowings",
+    "03-Interest on Vehicle Loan": "interest_on_vehicle_loan",
+    "04-MG": "mg",
+    "PBT": "pbt",
+    "WASTAGE": "wastage",
+}
+SUPABASE_PAGE_ROWS = 1000  # PostgREST's default max-rows per response
+ISO_MONTH_RE = re.compile(r"^(\d{4})-(\d{1,2})(?:-\d{1,2})?$")
+
+def month_bound(value):
+    """
+    "YYYY-MM-01" for a month range bound given as "2025-04", "2025-04-01" or a
+    month label such as "April-25"; None when empty. Raises ValueError otherwise.
+    """
+    if value is None or str(value).strip() == "":
+        return None
+    text = str(value).strip()
+    m = ISO_MONTH_RE.match(text)
+    if m and 1 <= int(m.group(2)) <= 12:
+        return f"{int(m.group(1)):04d}-{int(m.group(2)):02d}-01"
+    period = month_period(text)
+    if period is None:
+        raise ValueError(f"Unrecognized month: {value!r}")
+    return period
+
+def filter_period_range(frame, start=None, end=None, period_col="Period", month_col="Month"):
+    """
+    Rows whose month falls in [start, end] (inclusive "YYYY-MM-01" bounds).
+    The period column is used where set; rows without one fall back to
+    parsing their month label.
+    """
+    if start is None and end is None:
+        return frame
+    if period_col not in frame.columns and month_col not in frame.columns:
+        return frame.iloc[0:0]
+    periods = frame[period_col] if period_col in frame.columns else pd.Series(None, index=frame.index, dtype=object)
+    periods = periods.fillna("").astype(str)
+    if month_col in frame.columns:
+        missing = periods == ""
+        if missing.any():  # month_period is memoized per label
+            periods = periods.mask(missing, frame[month_col].map(month_period).fillna(""))
+    mask = periods != ""
+    if start is not None:
+        mask &= periods >= start
+    if end is not None:
+        mask &= periods <= end
+    return frame[mask.to_numpy()]
+
+def analyse_interest(frame):
+    """
+    Interest cost analysis of outlet rows. The metrics and revenue are
+    converted to one float matrix up front (missing or non-numeric -> 0); the
+    totals, per-metric breakdown, per-row interest rates and the ranking are
+    then column/row reductions over that matrix.
+    """
+    n = len(frame)
+    numeric = frame.reindex(columns=INTEREST_METRICS + ["TOTAL REVENUE"])
+    matrix = numeric.apply(pd.to_numeric, errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    values, revenue = matrix[:, :len(INTEREST_METRICS)], matrix[:, -1]
+
+    totals = values.sum(axis=0)
+    counts = (values > 0).sum(axis=0)
+    interest_breakdown = {
+        metric: {
+            'total_amount': float(totals[j]),
+            'outlet_count': int(counts[j]),
+            'average_amount': float(totals[j] / n),
         }
+        for j, metric in enumerate(INTEREST_METRICS) if totals[j] > 0
+    }
+
+    outlet_interest = values.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = np.where(revenue > 0, outlet_interest / revenue * 100, 0.0)
+    # Ranked by interest rate for efficiency analysis (stable, like list.sort)
+    order = np.argsort(rates, kind="stable")
+
+    labels = frame.reindex(columns=["Outlet", "Outlet Manager", "Month"]).iloc[order]
+    outlets = labels["Outlet"].fillna("Unknown").tolist()
+    managers = labels["Outlet Manager"].fillna("Unknown").tolist()
+    months = labels["Month"].astype(object).where(labels["Month"].notna(), None).tolist()
+    outlet_analysis = [
+        {
+            'outlet': outlet,
+            'manager': manager,
+            'month': month,
+            'total_interest': total,
+            'revenue': rev,
+            'interest_rate': rate,
+            'interest_breakdown': dict(zip(INTEREST_METRICS, row)),
+        }
+        for outlet, manager, month, total, rev, rate, row in zip(
+            outlets, managers, months, outlet_interest[order].tolist(), revenue[order].tolist(),
+            rates[order].tolist(), values[order].tolist())
+    ]
+
+    return {
+        "total_interest_costs": float(totals[totals > 0].sum()),
+        "interest_breakdown": interest_breakdown,
+        "outlet_analysis": outlet_analysis,
+        "average_interest_rate": float(rates.mean()) if n else 0,
+        "message": f"Interest analysis completed for {n} outlets",
+    }
 
-    except Exception as e:
+# ------------------------------
+# Bulk writes (upload-to-supabase)
+# ------------------------------
+try:
+    import httpx
+    from postgrest import APIError
+    from postgrest.types import ReturnMethod
+except ImportError:  # only needed once a table client exists
+    httpx = APIError = ReturnMethod = None
+
+OUTLET_TEXT_FIELDS = ["Outlet", "Outlet Manager", "Month"]
+# Stored as DATE (the first day of the month) in the outlets table
+OUTLET_DATE_FIELDS = ["Period"]
+# Natural key of an outlets row: re-sending an upload updates these rows in place.
+# period_key is the period, or the month label for rows without one (a column
+# generated by the database, see outlet_period_keys)
+OUTLET_CONFLICT_COLUMNS = "file_id,outlet,period_key"
+SUPABASE_WRITE_WORKERS = int(os.getenv('SUPABASE_WRITE_WORKERS', 4))
+# Batches start at SUPABASE_BATCH_ROWS and are resized towards the size that
+# takes SUPABASE_BATCH_SECONDS per request, within the min/max bounds
+SUPABASE_BATCH_ROWS = int(os.getenv('SUPABASE_BATCH_ROWS', 250))
+SUPABASE_BATCH_MIN_ROWS = int(os.getenv('SUPABASE_BATCH_MIN_ROWS', 50))
+SUPABASE_BATCH_MAX_ROWS = int(os.getenv('SUPABASE_BATCH_MAX_ROWS', 2000))
+SUPABASE_BATCH_SECONDS = float(os.getenv('SUPABASE_BATCH_SECONDS', 1.0))
+SUPABASE_WRITE_RETRIES = int(os.getenv('SUPABASE_WRITE_RETRIES', 3))
+SUPABASE_RETRY_BACKOFF = float(os.getenv('SUPABASE_RETRY_BACKOFF', 0.5))
+# Row ids per DELETE request (they travel in the URL)
+SUPABASE_DELETE_IDS = 200
+# SQLSTATE classes worth retrying: connection, transaction rollback
+# (serialization/deadlock), insufficient resources, operator intervention
+RETRYABLE_SQLSTATE_CLASSES = ("08", "40", "53", "57")
+
+def retryable_write_error(exc):
+    """Transient failures (network, 429/5xx, lost connection); not bad data."""
+    if httpx is not None and isinstance(exc, httpx.TransportError):
+        return True
+    if APIError is not None and isinstance(exc, APIError):
+        code = exc.code
+        if isinstance(code, int):  # non-JSON error body: the HTTP status
+            return code == 429 or code >= 500
+        code = str(code or "")
+        return code.startswith(RETRYABLE_SQLSTATE_CLASSES) or code in ("PGRST000", "PGRST001", "PGRST002", "PGRST003")
+    return False
+
+def outlet_db_frame(outlets_data):
+    """
+    Posted outlet records as outlets-table columns, converted in one pass:
+    text fields as str, metrics as float with NaN for missing or non-numeric
+    values, Period as "YYYY-MM-01" (from the record, else parsed from Month;
+    None when neither names a year). Records repeated exactly are sent once;
+    how many were dropped is in frame.attrs["duplicates_dropped"]. Different
+    records for the same (outlet, period_key) raise ValueError, since one
+    upsert cannot write a row twice and neither record can be preferred.
+    """
+    fields = list(OUTLET_DB_COLUMNS)
+    frame = pd.DataFrame.from_records(outlets_data).reindex(columns=fields)
+    metrics = [f for f in fields if f not in OUTLET_TEXT_FIELDS + OUTLET_DATE_FIELDS]
+    frame[metrics] = frame[metrics].apply(pd.to_numeric, errors="coerce").replace([np.inf, -np.inf], np.nan)
+    periods = frame["Period"].where(frame["Period"].notna(), frame["Month"].map(month_period))
+    periods = pd.to_datetime(periods, errors="coerce").dt.to_period("M").dt.to_timestamp()
+    frame["Period"] = periods.dt.strftime("%Y-%m-%d").astype(object).where(periods.notna(), None)
+    frame[OUTLET_TEXT_FIELDS] = frame[OUTLET_TEXT_FIELDS].fillna("").astype(str)
+    frame = frame.rename(columns=OUTLET_DB_COLUMNS)
+
+    unique = frame.drop_duplicates().reset_index(drop=True)
+    dropped = len(frame) - len(unique)
+    if dropped:
+        print(f"[WARNING] Dropped {dropped} repeated outlet record(s)")
+    keys = pd.DataFrame({"outlet": unique["outlet"], "period_key": outlet_period_keys(unique)})
+    clashes = keys[keys.duplicated(keep=False)].drop_duplicates()
+    if len(clashes):
+        listed = ", ".join(f"({o!r}, {k!r})" for o, k in clashes.head(10).itertuples(index=False, name=None))
+        raise ValueError(f"{len(clashes)} (outlet, period) key(s) have conflicting records: {listed}")
+    unique.attrs["duplicates_dropped"] = dropped
+    return unique
+
+def outlet_period_keys(frame):
+    """period_key of outlets-table rows: the period, else the month label."""
+    return frame["period"].where(frame["period"].notna(), frame["month"])
+
+def db_rows(frame):
+    """JSON-ready row dicts (NaN -> None)."""
+    return frame.astype(object).where(frame.notna(), None).to_dict("records")
+
+def upload_file_id(filename, frame):
+    """
+    Deterministic file id for an upload: the filename and the periods it
+    covers. A re-sent or corrected version of a report replaces that file's
+    rows instead of being counted next to them; a later month's report under
+    the same filename gets its own file.
+    """
+    periods = "|".join(sorted(set(outlet_period_keys(frame))))
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"india-sweet-house/upload/{filename}/{periods}"))
+
+def rest_select_all(table, columns, order=("id",), **equals):
+    """Every row of a PostgREST table (optionally filtered by column = value), a page at a time."""
+    def query():
+        query = rest_client.table(table).select(",".join(columns))
+        for column, value in equals.items():
+            query = query.eq(column, value)
+        return query
+    return _rest_pages(query, order)
+
+def rest_rpc_all(function, params, order):
+    """Every row a set-returning database function gives back over PostgREST, a page at a time."""
+    return _rest_pages(lambda: rest_client.rpc(function, params), order)
+
+def _rest_pages(make_query, order):
+    rows = []
+    start = 0
+    while True:
+        query = make_query()
+        for column in order:
+            query = query.order(column)
+        page = query.range(start, start + SUPABASE_PAGE_ROWS - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < SUPABASE_PAGE_ROWS:
+            return rows
+        start += SUPABASE_PAGE_ROWS
+
+class BulkWriter:
+    """
+    Upserts rows into a PostgREST table (Supabase or any compatible endpoint)
+    in batches sent concurrently over a bounded thread pool. Each batch is
+    retried with jittered exponential backoff on transient errors. The batch
+    size adapts to the measured per-row latency and is halved after a retry.
+    Upserts make a partially failed write safe to run again.
+    """
+
+    def __init__(self, client, table, on_conflict, workers=SUPABASE_WRITE_WORKERS,
+                 batch_rows=SUPABASE_BATCH_ROWS, min_rows=SUPABASE_BATCH_MIN_ROWS,
+                 max_rows=SUPABASE_BATCH_MAX_ROWS, target_seconds=SUPABASE_BATCH_SECONDS,
+                 retries=SUPABASE_WRITE_RETRIES, backoff=SUPABASE_RETRY_BACKOFF):
+        self.client = client
+        self.table = table
+        self.on_conflict = on_conflict
+        self.workers = max(1, workers)
+        self.min_rows = max(1, min_rows)
+        self.max_rows = max(self.min_rows, max_rows)
+        self.batch_rows = min(max(batch_rows, self.min_rows), self.max_rows)
+        self.target_seconds = target_seconds
+        self.retries = retries
+        self.backoff = backoff
+
+    def _send(self, batch):
+        """Upsert one batch; returns (seconds of the successful request, retries)."""
+        for attempt in range(self.retries + 1):
+            start = time.perf_counter()
+            try:
+                (self.client.table(self.table)
+                 .upsert(batch, on_conflict=self.on_conflict, returning=ReturnMethod.minimal)
+                 .execute())
+                return time.perf_counter() - start, attempt
+            except Exception as e:
+                if attempt == self.retries or not retryable_write_error(e):
+                    raise
+                delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+                print(f"[WARNING] {self.table} batch of {len(batch)} failed ({e}); retry {attempt + 1} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _adapt(self, rows, seconds, retries):
+        if retries:
+            self.batch_rows = max(self.min_rows, self.batch_rows // 2)
+            return
+        ideal = self.max_rows if seconds <= 0 else int(self.target_seconds * rows / seconds)
+        # Move halfway towards the ideal size so one noisy request cannot swing it
+        self.batch_rows = min(self.max_rows, max(self.min_rows, (self.batch_rows + ideal) // 2))
+
+    def write(self, rows):
+        """Upsert all rows; raises the first batch error that survives its retries."""
+        stats = {"rows": 0, "batches": 0, "retries": 0, "seconds": 0.0}
+        start = time.perf_counter()
+        next_row = 0
+        in_flight = {}
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"write-{self.table}")
+        try:
+            while next_row < len(rows) or in_flight:
+                while next_row < len(rows) and len(in_flight) < self.workers:
+                    batch = rows[next_row:next_row + self.batch_rows]
+                    in_flight[pool.submit(self._send, batch)] = len(batch)
+                    next_row += len(batch)
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    count = in_flight.pop(future)
+                    seconds, retries = future.result()
+                    self._adapt(count, seconds, retries)
+                    stats["rows"] += count
+                    stats["batches"] += 1
+                    stats["retries"] += retries
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        stats["seconds"] = round(time.perf_counter() - start, 3)
+        stats["final_batch_rows"] = self.batch_rows
+        return stats
+
+# ------------------------------
+# Direct Postgres ingestion (COPY)
+# ------------------------------
+try:
+    import psycopg2
+    import psycopg2.pool
+    from psycopg2 import sql as pg_sql
+    from psycopg2.extras import Json
+except ImportError:  # psycopg2 is optional; uploads then go through REST only
+    psycopg2 = None
+
+# Direct (or pooler) connection string, e.g. Supabase's Project Settings ->
+# Database URI. With UPLOAD_BACKEND=copy uploads are written over it with COPY
+DATABASE_URL = os.getenv('DATABASE_URL')
+UPLOAD_BACKEND = os.getenv('UPLOAD_BACKEND', 'rest').lower()
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', 1))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 4))
+# Rows rendered to CSV per read while COPY streams a frame
+COPY_CHUNK_ROWS = int(os.getenv('COPY_CHUNK_ROWS', 5000))
+
+_db_pool = None
+_db_pool_lock = threading.Lock()
+# ThreadedConnectionPool raises when empty; callers queue here instead
+_db_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+
+def db_pool():
+    global _db_pool
+    with _db_pool_lock:
+        if _db_pool is None:
+            _db_pool = psycopg2.pool.ThreadedConnectionPool(DB_POOL_MIN, DB_POOL_MAX, DATABASE_URL)
+        return _db_pool
+
+@contextlib.contextmanager
+def pg_transaction():
+    """
+    Cursor on a pooled connection inside one transaction: committed when the
+    block finishes, rolled back if it raises. Broken connections are dropped
+    from the pool rather than handed out again.
+    """
+    with _db_slots:
+        pool = db_pool()
+        conn = pool.getconn()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    yield cur
+        finally:
+            pool.putconn(conn, close=bool(conn.closed))
+
+class CsvChunkStream:
+    """
+    Read-only file object over a frame's CSV text for COPY FROM STDIN. Rows
+    are rendered COPY_CHUNK_ROWS at a time as COPY reads, so the payload is
+    never held as one string. NULL is written as \\N, which keeps empty text
+    distinct from missing numbers.
+    """
+
+    def __init__(self, frame, chunk_rows=COPY_CHUNK_ROWS):
+        self._chunks = (
+            frame.iloc[i:i + chunk_rows].to_csv(index=False, header=False, na_rep="\\N")
+            for i in range(0, len(frame), chunk_rows)
+        )
+        self._buffer = ""
+        self._offset = 0  # start of the unread part of _buffer
+
+    def read(self, size=-1):
+        available = len(self._buffer) - self._offset
+        if size < 0 or available < size:
+            # Only the unread tail is carried into the next buffer, so each
+            # rendered character is copied a bounded number of times
+            parts = [self._buffer[self._offset:]]
+            while size < 0 or available < size:
+                chunk = next(self._chunks, None)
+                if chunk is None:
+                    break
+                parts.append(chunk)
+                available += len(chunk)
+            self._buffer, self._offset = "".join(parts), 0
+        end = self._offset + (available if size < 0 else min(size, available))
+        out, self._offset = self._buffer[self._offset:end], end
+        return out
+
+    readline = read
+
+def write_upload_rest(file_record, frame):
+    """
+    File record and outlet rows as REST upserts (see BulkWriter). Rows the
+    file had stored but the upload no longer has (a corrected version) are
+    then deleted, and the rollups of the old and new periods rebuilt by the
+    refresh_outlet_rollups RPC. A failed step fails the upload; re-sending it
+    is safe.
+    """
+    BulkWriter(rest_client, 'uploaded_files', on_conflict='id', workers=1).write([file_record])
+    previous = rest_select_all('outlets', ['id', 'outlet', 'period_key', 'period'], file_id=file_record["id"])
+    stats = BulkWriter(rest_client, 'outlets', on_conflict=OUTLET_CONFLICT_COLUMNS).write(db_rows(frame))
+    kept = set(zip(frame["outlet"], outlet_period_keys(frame)))
+    stale = [row for row in previous if (row["outlet"], row["period_key"]) not in kept]
+    for i in range(0, len(stale), SUPABASE_DELETE_IDS):
+        ids = [row["id"] for row in stale[i:i + SUPABASE_DELETE_IDS]]
+        rest_client.table('outlets').delete().in_('id', ids).execute()
+    periods = upload_periods(frame, [row["period"] for row in stale])
+    rollups = rest_client.rpc('refresh_outlet_rollups', {"periods": periods}).execute().data if periods else 0
+    return {"backend": "rest", **stats, "deleted": len(stale), "rollups": rollups}
+
+def write_upload_copy(file_record, frame):
+    """
+    File record and outlet rows in one Postgres transaction: upsert the file
+    record, drop the file's previous rows, COPY the frame in, then rebuild the
+    rollups of every period the old and new rows cover. A re-sent upload
+    replaces its rows atomically; a failed one leaves nothing behind.
+    """
+    start = time.perf_counter()
+    record = {k: Json(v) if isinstance(v, dict) else v for k, v in file_record.items()}
+    columns = list(record)
+    upsert_file = pg_sql.SQL(
+        "INSERT INTO public.uploaded_files ({cols}) VALUES ({values}) "
+        "ON CONFLICT (id) DO UPDATE SET {updates}"
+    ).format(
+        cols=pg_sql.SQL(", ").join(map(pg_sql.Identifier, columns)),
+        values=pg_sql.SQL(", ").join(map(pg_sql.Placeholder, columns)),
+        updates=pg_sql.SQL(", ").join(
+            pg_sql.SQL("{0} = EXCLUDED.{0}").format(pg_sql.Identifier(c)) for c in columns if c != "id"),
+    )
+    copy_rows = pg_sql.SQL("COPY public.outlets ({cols}) FROM STDIN WITH (FORMAT csv, NULL '\\N')").format(
+        cols=pg_sql.SQL(", ").join(map(pg_sql.Identifier, frame.columns)))
+
+    with pg_transaction() as cur:
+        cur.execute(upsert_file, record)
+        cur.execute("DELETE FROM public.outlets WHERE file_id = %s RETURNING period", (file_record["id"],))
+        replaced = cur.rowcount
+        old_periods = {p.isoformat() for (p,) in cur.fetchall() if p is not None}
+        cur.copy_expert(copy_rows, CsvChunkStream(frame))
+        rows = cur.rowcount
+        cur.execute("SELECT public.refresh_outlet_rollups(%s::date[])", (upload_periods(frame, old_periods),))
+        rollups = cur.fetchone()[0]
+
+    return {"backend": "copy", "rows": rows, "replaced": replaced, "rollups": rollups,
+            "seconds": round(time.perf_counter() - start, 3)}
+
+# ------------------------------
+# Storage backends
+# ------------------------------
+# supabase: the hosted database (REST, or COPY with UPLOAD_BACKEND=copy);
+# sqlite: an embedded on-disk database, for running without Supabase
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'supabase').lower()
+STORAGE_SQLITE_PATH = os.getenv('STORAGE_SQLITE_PATH', os.path.join('data', 'analytics.sqlite3'))
+
+class Storage(ABC):
+    """
+    Where uploads are persisted and stored outlet rows are read from. Outlet
+    frames use the outlets-table column names on write and the extracted
+    record's field names on read (see OUTLET_DB_COLUMNS). Backends implement
+    the abstract methods; the others have working defaults.
+    """
+    name = "storage"
+    label = "storage"
+
+    def unavailable_reason(self):
+        """None when the backend can be used, else a message for the client."""
+        return None
+
+    @abstractmethod
+    def write_upload(self, file_record, frame):
+        """Upsert the file record and replace its outlet rows; returns write stats."""
+
+    @abstractmethod
+    def has_file(self, file_id):
+        """Whether an uploaded_files record with this id exists."""
+
+    @abstractmethod
+    def outlet_frame(self, file_id=None, fields=None):
+        """Stored outlet rows (all, or those of one file)."""
+
+    @abstractmethod
+    def outlet_grain(self, file_id=None):
+        """
+        Stored rows summed per (file_id, outlet, outlet_manager, month, period)
+        by the database: row_count, the metric sums and their non-null counts
+        (n_<metric>), missing labels as "". Every aggregate is re-grouped from
+        this, so only it has to come from the backend.
+        """
+
+    @abstractmethod
+    def period_rollups(self):
+        """
+        The outlet_period_rollups rows: per (period, cluster) over all uploads,
+        outlet_count, row_count, the metric sums and their non-null counts.
+        Rows without a period are not rolled up.
+        """
+
+    @abstractmethod
+    def stale_rollup_periods(self):
+        """
+        Periods ("2025-06-01", sorted) whose rollup rows no longer match the
+        outlets table: a period's row count differs, or a row was written after
+        the period was last refreshed.
+        """
+
+class SupabaseStorage(Storage):
+    name = "supabase"
+    label = "Supabase"
+
+    def unavailable_reason(self):
+        if UPLOAD_BACKEND == 'copy' and (psycopg2 is None or not DATABASE_URL):
+            return "UPLOAD_BACKEND=copy needs psycopg2 and DATABASE_URL."
+        if not rest_client:
+            return "Supabase client not initialized. Check environment variables."
+        return None
+
+    def write_upload(self, file_record, frame):
+        if UPLOAD_BACKEND == 'copy':
+            return write_upload_copy(file_record, frame)
+        return write_upload_rest(file_record, frame)
+
+    def has_file(self, file_id):
+        return bool(rest_client.table('uploaded_files').select('id').eq('id', file_id).execute().data)
+
+    def outlet_frame(self, file_id=None, fields=None):
+        """Read a page at a time over REST."""
+        fields = list(fields or OUTLET_DB_COLUMNS)
+        columns = [OUTLET_DB_COLUMNS[f] for f in fields]
+        rows = rest_select_all('outlets', columns, **({"file_id": file_id} if file_id else {}))
+        frame = pd.DataFrame.from_records(rows, columns=columns)
+        frame.columns = fields
+        return frame
+
+    def outlet_grain(self, file_id=None):
+        """Grouped by Postgres (the outlet_grain function), so only the grain rows are sent."""
+        columns = OUTLET_GRAIN_KEYS + ["row_count"] + OUTLET_METRIC_COLUMNS + [f"n_{c}" for c in OUTLET_METRIC_COLUMNS]
+        rows = rest_rpc_all('outlet_grain', {"file_id": file_id}, order=OUTLET_GRAIN_KEYS)
+        grain = pd.DataFrame.from_records(rows, columns=columns)
+        # NUMERIC sums may arrive as text over REST
+        grain[OUTLET_METRIC_COLUMNS] = grain[OUTLET_METRIC_COLUMNS].apply(pd.to_numeric, errors="coerce").astype(float)
+        return grain
+
+    def period_rollups(self):
+        columns = ROLLUP_KEYS + ROLLUP_COUNT_COLUMNS + OUTLET_METRIC_COLUMNS + [f"n_{c}" for c in OUTLET_METRIC_COLUMNS]
+        rows = rest_select_all('outlet_period_rollups', columns, order=ROLLUP_KEYS)
+        return rollup_frame(pd.DataFrame.from_records(rows, columns=columns))
+
+    def stale_rollup_periods(self):
+        return [row["period"] for row in rest_rpc_all('stale_rollup_periods', {}, order=["period"])]
+
+OUTLET_METRIC_COLUMNS = [c for f, c in OUTLET_DB_COLUMNS.items()
+                         if f not in OUTLET_TEXT_FIELDS + OUTLET_DATE_FIELDS]
+OUTLET_GRAIN_KEYS = ["file_id", "outlet", "outlet_manager", "month", "period"]
+# outlet_period_rollups: one row per (period, cluster), kept current on upload
+ROLLUP_KEYS = ["period", "cluster"]
+ROLLUP_COUNT_COLUMNS = ["outlet_count", "row_count"]
+# Leading cluster number of an outlet-manager label, e.g. "6-Prasant Mishra" -> "6"
+CLUSTER_RE = re.compile(r"^\s*(\d+)\s*[-.)]")
+
+def rollup_frame(rows):
+    """Rollup rows with numeric sums and integer counts (Postgres NUMERIC arrives as text over REST)."""
+    counts = ROLLUP_COUNT_COLUMNS + [f"n_{c}" for c in OUTLET_METRIC_COLUMNS]
+    rows[ROLLUP_KEYS] = rows[ROLLUP_KEYS].fillna("").astype(str)
+    rows[OUTLET_METRIC_COLUMNS] = rows[OUTLET_METRIC_COLUMNS].apply(pd.to_numeric, errors="coerce").astype(float)
+    rows[counts] = rows[counts].fillna(0).astype(int)
+    return rows
+
+def upload_periods(frame, *more):
+    """Distinct non-null periods of an outlets frame plus any given ones, sorted."""
+    periods = set(frame["period"].dropna()) if "period" in frame.columns else set()
+    for extra in more:
+        periods.update(p for p in extra if p)
+    return sorted(str(p) for p in periods)
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploaded_files (
+    id TEXT PRIMARY KEY,
+    file_name TEXT NOT NULL,
+    file_path TEXT,
+    file_size INTEGER,
+    uploaded_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+    processed INTEGER NOT NULL DEFAULT 0,
+    uploaded_by TEXT,
+    metadata TEXT
+);
+CREATE TABLE IF NOT EXISTS outlets (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+    file_id TEXT REFERENCES uploaded_files(id) ON DELETE CASCADE,
+    outlet TEXT NOT NULL,
+    outlet_manager TEXT,
+    month TEXT NOT NULL,
+    period TEXT,
+    period_key TEXT GENERATED ALWAYS AS (COALESCE(period, month)) VIRTUAL,
+    direct_income REAL,
+    total_revenue REAL,
+    cogs REAL,
+    outlet_expenses REAL,
+    ebidta REAL,
+    finance_cost REAL,
+    bank_charges REAL,
+    interest_on_borrowings REAL,
+    interest_on_vehicle_loan REAL,
+    mg REAL,
+    pbt REAL,
+    wastage REAL
+);
+CREATE TABLE IF NOT EXISTS outlet_period_rollups (
+    period TEXT NOT NULL,
+    cluster TEXT NOT NULL,
+    outlet_count INTEGER NOT NULL,
+    row_count INTEGER NOT NULL,
+    {rollup_columns},
+    refreshed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+    PRIMARY KEY (period, cluster)
+);
+"""
+# Created after the migration in SQLiteStorage.__init__, since they use period
+# and period_key
+SQLITE_INDEXES = """
+DROP INDEX IF EXISTS idx_outlets_file_outlet_month;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_outlets_file_outlet_period ON outlets(file_id, outlet, period_key);
+CREATE INDEX IF NOT EXISTS idx_outlets_outlet ON outlets(outlet);
+CREATE INDEX IF NOT EXISTS idx_outlets_month ON outlets(month);
+CREATE INDEX IF NOT EXISTS idx_outlets_outlet_period ON outlets(outlet, period);
+CREATE INDEX IF NOT EXISTS idx_outlets_file_period ON outlets(file_id, period);
+"""
+SQLITE_SCHEMA = SQLITE_SCHEMA.replace("{rollup_columns}", ",\n    ".join(
+    [f"{c} REAL" for c in OUTLET_METRIC_COLUMNS]
+    + [f"n_{c} INTEGER NOT NULL DEFAULT 0" for c in OUTLET_METRIC_COLUMNS]))
+# Same statement as refresh_outlet_rollups() in supabase_schema.sql; the
+# periods are bound as one JSON array
+SQLITE_REFRESH_ROLLUPS = (
+    "INSERT INTO outlet_period_rollups (period, cluster, outlet_count, row_count, "
+    + ", ".join(OUTLET_METRIC_COLUMNS + [f"n_{c}" for c in OUTLET_METRIC_COLUMNS]) + ") "
+    "SELECT period, outlet_cluster(outlet_manager), COUNT(DISTINCT outlet), COUNT(*), "
+    + ", ".join([f"SUM({c})" for c in OUTLET_METRIC_COLUMNS] + [f"COUNT({c})" for c in OUTLET_METRIC_COLUMNS])
+    + " FROM outlets WHERE period IN (SELECT value FROM json_each(?)) GROUP BY 1, 2"
+)
+
+# Same query as stale_rollup_periods() in supabase_schema.sql (outlets rows are
+# re-inserted on upload, so created_at is their last write)
+SQLITE_STALE_ROLLUP_PERIODS = """
+SELECT period FROM (
+    SELECT period, COUNT(*) AS row_count, MAX(created_at) AS written, NULL AS refreshed
+    FROM outlets WHERE period IS NOT NULL GROUP BY period
+    UNION ALL
+    SELECT period, -SUM(row_count), NULL, MIN(refreshed_at)
+    FROM outlet_period_rollups GROUP BY period
+)
+GROUP BY period
+HAVING SUM(row_count) <> 0 OR MAX(written) > MAX(refreshed)
+ORDER BY period
+"""
+
+def outlet_cluster(manager):
+    """Scalar cluster_labels, registered as outlet_cluster() in SQLite."""
+    label = "" if manager is None else str(manager)
+    m = CLUSTER_RE.match(label)
+    return m.group(1) if m else label
+
+class SQLiteStorage(Storage):
+    """
+    Embedded storage: one SQLite file holding the uploaded_files and outlets
+    tables the upload path writes. WAL mode lets readers run alongside a
+    writer; every thread gets its own connection.
+    """
+    name = "sqlite"
+    label = "the local SQLite store"
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self.connect()
+        conn.executescript(SQLITE_SCHEMA)
+        # Stores created before outlets had the period and period_key columns
+        existing = {row[1] for row in conn.execute("PRAGMA table_xinfo(outlets)")}
+        with conn:
+            if "period" not in existing:
+                conn.execute("ALTER TABLE outlets ADD COLUMN period TEXT")
+            if "period_key" not in existing:
+                conn.execute("ALTER TABLE outlets ADD COLUMN period_key TEXT "
+                             "GENERATED ALWAYS AS (COALESCE(period, month)) VIRTUAL")
+            # Rows written before the (file_id, outlet, period_key) key may
+            # repeat it: keep the latest of each so the unique index builds
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'idx_outlets_file_outlet_period'").fetchone() is None:
+                conn.execute("DELETE FROM outlets WHERE file_id IS NOT NULL AND id NOT IN "
+                             "(SELECT MAX(id) FROM outlets WHERE file_id IS NOT NULL "
+                             "GROUP BY file_id, outlet, period_key)")
+        conn.executescript(SQLITE_INDEXES)
+
+    def connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.create_function("outlet_cluster", 1, outlet_cluster, deterministic=True)
+            self._local.conn = conn
+        return conn
+
+    def write_upload(self, file_record, frame):
+        """Same semantics as the COPY path: one transaction, file's rows replaced."""
+        start = time.perf_counter()
+        record = {k: json.dumps(v) if isinstance(v, dict) else v for k, v in file_record.items()}
+        columns = list(record)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c != "id")
+        insert_rows = (f"INSERT INTO outlets ({', '.join(frame.columns)}) "
+                       f"VALUES ({', '.join('?' * len(frame.columns))})")
+        values = frame.astype(object).where(frame.notna(), None).itertuples(index=False, name=None)
+
+        conn = self.connect()
+        with conn:
+            conn.execute(f"INSERT INTO uploaded_files ({', '.join(columns)}) "
+                         f"VALUES ({', '.join('?' * len(columns))}) "
+                         f"ON CONFLICT(id) DO UPDATE SET {updates}", list(record.values()))
+            old_periods = [p for (p,) in conn.execute(
+                "SELECT DISTINCT period FROM outlets WHERE file_id = ?", (file_record["id"],))]
+            replaced = conn.execute("DELETE FROM outlets WHERE file_id = ?", (file_record["id"],)).rowcount
+            rows = conn.executemany(insert_rows, values).rowcount
+            periods = json.dumps(upload_periods(frame, old_periods))
+            conn.execute("DELETE FROM outlet_period_rollups WHERE period IN (SELECT value FROM json_each(?))",
+                         (periods,))
+            rollups = conn.execute(SQLITE_REFRESH_ROLLUPS, (periods,)).rowcount
+
+        return {"backend": "sqlite", "rows": rows, "replaced": replaced, "rollups": rollups,
+                "seconds": round(time.perf_counter() - start, 3)}
+
+    def has_file(self, file_id):
+        return self.connect().execute("SELECT 1 FROM uploaded_files WHERE id = ?", (file_id,)).fetchone() is not None
+
+    def outlet_frame(self, file_id=None, fields=None):
+        fields = list(fields or OUTLET_DB_COLUMNS)
+        query = f"SELECT {', '.join(OUTLET_DB_COLUMNS[f] for f in fields)} FROM outlets"
+        params = ()
+        if file_id:
+            query += " WHERE file_id = ?"
+            params = (file_id,)
+        frame = pd.read_sql_query(query + " ORDER BY id", self.connect(), params=params)
+        frame.columns = fields
+        return frame
+
+    def outlet_grain(self, file_id=None):
+        """The grain computed by SQLite itself (GROUP BY over the outlets table)."""
+        sums = ", ".join(f"SUM({c}) AS {c}" for c in OUTLET_METRIC_COLUMNS)
+        counts = ", ".join(f"COUNT({c}) AS n_{c}" for c in OUTLET_METRIC_COLUMNS)
+        query = ("SELECT COALESCE(file_id, '') AS file_id, COALESCE(outlet, '') AS outlet, "
+                 "COALESCE(outlet_manager, '') AS outlet_manager, "
+                 "COALESCE(month, '') AS month, COALESCE(period, '') AS period, "
+                 f"COUNT(*) AS row_count, {sums}, {counts} FROM outlets")
+        params = ()
+        if file_id:
+            query += " WHERE file_id = ?"
+            params = (file_id,)
+        grain = pd.read_sql_query(query + " GROUP BY 1, 2, 3, 4, 5", self.connect(), params=params)
+        grain[OUTLET_METRIC_COLUMNS] = grain[OUTLET_METRIC_COLUMNS].astype(float)
+        return grain
+
+    def period_rollups(self):
+        return rollup_frame(pd.read_sql_query(
+            "SELECT * FROM outlet_period_rollups ORDER BY period, cluster", self.connect()
+        ).drop(columns="refreshed_at"))
+
+    def stale_rollup_periods(self):
+        return [period for (period,) in self.connect().execute(SQLITE_STALE_ROLLUP_PERIODS)]
+
+def make_storage(backend=STORAGE_BACKEND):
+    if backend == "sqlite":
+        return SQLiteStorage(STORAGE_SQLITE_PATH)
+    if backend != "supabase":
+        raise ValueError(f"Unknown STORAGE_BACKEND: {backend!r} (use 'supabase' or 'sqlite')")
+    return SupabaseStorage()
+
+storage = make_storage()
+print(f"[INFO] Storage backend: {storage.name}")
+
+# ------------------------------
+# Aggregation (server-side dashboard totals)
+# ------------------------------
+# API dimension -> grain column
+AGGREGATE_DIMENSIONS = {"outlet": "outlet", "manager": "outlet_manager", "cluster": "cluster", "month": "month",
+                        "period": "period", "file": "file_id"}
+# Ratios of summed metrics to summed TOTAL REVENUE, in percent
+AGGREGATE_RATIOS = {
+    "cogs_pct": ["cogs"],
+    "outlet_expenses_pct": ["outlet_expenses"],
+    "ebidta_margin": ["ebidta"],
+    "pbt_margin": ["pbt"],
+    "wastage_pct": ["wastage"],
+    "interest_rate": [OUTLET_DB_COLUMNS[m] for m in INTEREST_METRICS],
+}
+AGGREGATE_PAGE_SIZE = 50
+AGGREGATE_MAX_PAGE_SIZE = 500
+# The grain is cached this long per (storage, file); uploads clear it
+AGGREGATE_CACHE_SECONDS = int(os.getenv('AGGREGATE_CACHE_SECONDS', 60))
+
+class GrainCache:
+    """Short-lived cache of storage.outlet_grain results, cleared on upload."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def get(self, file_id=None):
+        key = (storage.name, file_id or "")
+        with self._lock:
+            hit = self._items.get(key)
+            if hit and time.monotonic() - hit[0] < self.ttl:
+                return hit[1]
+        grain = storage.outlet_grain(file_id=file_id)
+        with self._lock:
+            self._items[key] = (time.monotonic(), grain)
+        return grain
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+grain_cache = GrainCache(AGGREGATE_CACHE_SECONDS)
+
+def cluster_labels(managers):
+    """Cluster of each outlet-manager label: its leading number, else the label."""
+    labels = managers.fillna("").astype(str)
+    return labels.str.extract(CLUSTER_RE, expand=False).fillna(labels)
+
+def _month_sort_key(label):
+    """Chronological key for a month label, with or without a year."""
+    period = month_period(label)
+    if period:
+        return period
+    number = MONTH_NUMBERS.get(MONTH_NAMES.get(str(label).strip().lower(), ""))
+    return f"0000-{number:02d}" if number else f"9999-{label}"
+
+def _sum_grain(grain, keys):
+    """row_count, metric sums and non-null counts per group of keys (one row when keys is empty)."""
+    counts = ["row_count"] + [f"n_{c}" for c in OUTLET_METRIC_COLUMNS]
+    if not keys:
+        return pd.concat([grain[counts].sum(), grain[OUTLET_METRIC_COLUMNS].sum(min_count=1)]).to_frame().T
+    grouped = grain.groupby(keys, sort=False)
+    return pd.concat([grouped[counts].sum(), grouped[OUTLET_METRIC_COLUMNS].sum(min_count=1)], axis=1).reset_index()
+
+def _group_records(groups, keys, metrics, names=None):
+    """JSON-ready {names..., row_count, sum, avg, ratios} dicts for summed groups
+    (names: the API dimension of each key column)."""
+    sums = groups[OUTLET_METRIC_COLUMNS].to_numpy(dtype=float)
+    counts = groups[[f"n_{c}" for c in OUTLET_METRIC_COLUMNS]].to_numpy(dtype=float)
+    revenue = sums[:, OUTLET_METRIC_COLUMNS.index("total_revenue")]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = np.where(counts > 0, sums / counts, np.nan)
+        ratios = {
+            name: np.where(revenue > 0, np.nansum(sums[:, [OUTLET_METRIC_COLUMNS.index(c) for c in cols]], axis=1)
+                           / revenue * 100, np.nan)
+            for name, cols in AGGREGATE_RATIOS.items()
+        }
+    picked = [OUTLET_METRIC_COLUMNS.index(m) for m in metrics]
+
+    def clean(values, digits):
+        return [None if np.isnan(v) else round(v, digits) for v in values]
+
+    key_values = [groups[k].tolist() for k in keys]
+    row_counts = groups["row_count"].astype(int).tolist()
+    ratio_rows = list(zip(*(clean(v, 4) for v in ratios.values()))) if len(groups) else []
+    records = []
+    for i in range(len(groups)):
+        record = {name: values[i] for name, values in zip(names or keys, key_values)}
+        record["row_count"] = row_counts[i]
+        record["sum"] = dict(zip(metrics, clean(sums[i, picked], 2)))
+        record["avg"] = dict(zip(metrics, clean(means[i, picked], 2)))
+        record["ratios"] = dict(zip(AGGREGATE_RATIOS, ratio_rows[i]))
+        records.append(record)
+    return records
+
+def aggregate_outlets(grain, group_by, metrics, filters=None, month_from=None, month_to=None,
+                      sort=None, page=1, page_size=AGGREGATE_PAGE_SIZE):
+    """
+    Totals and one page of groups over the (filtered) grain. Sums, non-null
+    counts and row counts are additive, so any grouping of the grain gives
+    exact totals and means; ratios are taken over the summed metrics. A filter
+    is one value or a list of accepted values. Like the totals, each group
+    carries the number of distinct values of every dimension it covers.
+    """
+    grain = grain.assign(cluster=cluster_labels(grain["outlet_manager"]))
+    for dimension, value in (filters or {}).items():
+        values = [value] if isinstance(value, str) else list(value)
+        grain = grain[grain[AGGREGATE_DIMENSIONS[dimension]].isin(values)]
+    grain = filter_period_range(grain, month_from, month_to, period_col="period", month_col="month")
+
+    keys = [AGGREGATE_DIMENSIONS[d] for d in group_by]
+    totals = _group_records(_sum_grain(grain, []), [], metrics)[0]
+    totals["distinct"] = {d: int(grain[c].nunique()) for d, c in AGGREGATE_DIMENSIONS.items()}
+
+    groups = _sum_grain(grain, keys)
+    if keys:
+        descending = bool(sort) and sort.startswith("-")
+        field = AGGREGATE_DIMENSIONS.get((sort or "").lstrip("-+"), (sort or "").lstrip("-+"))
+        if field not in OUTLET_METRIC_COLUMNS and field != "row_count" and field not in keys:
+            field = keys[0]
+        if field == "month":
+            sort_key = groups[field].map(_month_sort_key)
+        elif field == "period":
+            sort_key = groups[field].replace("", np.nan)  # rows without a period last
+        else:
+            sort_key = groups[field]
+        # Stable, with empty sums last in either direction
+        groups = (groups.assign(_sort=sort_key)
+                  .sort_values("_sort", ascending=not descending, kind="stable", na_position="last")
+                  .drop(columns="_sort"))
+
+    total_groups = len(groups) if keys else 0
+    start = (page - 1) * page_size
+    page_groups = groups.iloc[start:start + page_size] if keys else groups.iloc[0:0]
+    records = _group_records(page_groups, keys, metrics, names=group_by)
+    if records:
+        columns = list(AGGREGATE_DIMENSIONS.values())
+        distinct = page_groups.set_index(keys)[[]].join(grain.groupby(keys, sort=False)[columns].nunique())
+        for record, counts in zip(records, distinct.itertuples(index=False)):
+            record["distinct"] = {d: int(n) for d, n in zip(AGGREGATE_DIMENSIONS, counts)}
+    return {
+        "group_by": group_by,
+        "metrics": metrics,
+        "totals": totals,
+        "groups": records,
+        "page": page,
+        "page_size": page_size,
+        "total_groups": total_groups,
+        "pages": -(-total_groups // page_size) if total_groups else 0,
+    }
+
+def period_rollup_groups(rollups, group_by, metrics, cluster=None, month_from=None, month_to=None):
+    """
+    Rollup rows (filtered, then re-summed over group_by, a subset of period
+    and cluster) as aggregate group records in period, cluster order.
+    outlet_count is only additive within one (period, cluster), so it is
+    reported only when grouping by both.
+    """
+    if cluster:
+        rollups = rollups[rollups["cluster"] == cluster]
+    rollups = filter_period_range(rollups, month_from, month_to, period_col="period", month_col="period")
+    per_row = set(group_by) == set(ROLLUP_KEYS)
+    groups = rollups if per_row else _sum_grain(rollups, group_by)
+    if group_by:
+        groups = groups.sort_values(group_by, kind="stable")
+    records = _group_records(groups, group_by, metrics)
+    if per_row:
+        for record, outlets in zip(records, groups["outlet_count"].astype(int).tolist()):
+            record["outlet_count"] = outlets
+    return records
+
+# ------------------------------
+# Static assets (React build)
+# ------------------------------
+STATIC_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dist')
+# Files up to this size are held in memory with their compressed variants;
+# larger ones are sent from disk
+STATIC_MEMORY_MAX_BYTES = int(os.getenv('STATIC_MEMORY_MAX_BYTES', 4 * 1024 * 1024))
+# Cache lifetime for un-hashed files other than index.html (favicon, robots.txt, ...)
+STATIC_MAX_AGE = int(os.getenv('STATIC_MAX_AGE', 3600))
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Vite writes content-hashed names under assets/, e.g. assets/index-B2xkQ9aZ.js
+HASHED_ASSET_RE = re.compile(r"^assets/.+-[A-Za-z0-9_-]{8,}\.\w+$")
+STATIC_COMPRESSIBLE_MIMETYPES = {
+    "application/javascript", "application/json", "application/manifest+json",
+    "application/xml", "application/wasm", "image/svg+xml",
+}
+# build.sh writes the .br/.gz siblings; anything it missed is compressed once
+# per serving process, so use the strongest settings
+STATIC_VARIANTS = (("br", ".br"), ("gzip", ".gz"))
+STATIC_GZIP_LEVEL = 9
+STATIC_BROTLI_QUALITY = 11
+
+def static_cache_control(rel):
+    if rel == "index.html":
+        return "no-cache"  # always revalidate; the ETag makes that a 304
+    if HASHED_ASSET_RE.match(rel):
+        return IMMUTABLE_CACHE_CONTROL
+    return f"public, max-age={STATIC_MAX_AGE}"
+
+class StaticAssets:
+    """
+    Index of the built frontend, taken on the first static request: per file
+    its bytes, ETag, cache policy and brotli/gzip variants (precompressed
+    siblings such as app.js.br are used as-is, missing ones are compressed
+    here). A request is then a dict lookup plus a conditional check; the
+    filesystem is only read for files above STATIC_MEMORY_MAX_BYTES. Nothing is
+    read at import, so pool workers that never serve a page never pay for it.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._files = None
+        self._lock = threading.Lock()
+        self.seconds = 0.0
+
+    @property
+    def files(self):
+        if self._files is None:
+            with self._lock:
+                if self._files is None:
+                    self._files = self._scan()
+        return self._files
+
+    def _scan(self):
+        files = {}
+        if not os.path.isdir(self.root):
+            return files
+        start = time.perf_counter()
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                full = os.path.join(dirpath, name)
+                rel = os.path.relpath(full, self.root).replace(os.sep, "/")
+                if rel.endswith((".br", ".gz")) and os.path.isfile(full[:-3]):
+                    continue  # precompressed sibling, picked up with its source
+                files[rel] = self._entry(rel, full)
+        self.seconds = time.perf_counter() - start
+        precompressed = sum(1 for e in files.values() if e["variants"])
+        print(f"[INFO] Indexed {len(files)} static files ({precompressed} precompressed) "
+              f"in {self.seconds:.3f}s")
+        return files
+
+    def _entry(self, rel, full):
+        stat = os.stat(full)
+        mimetype = mimetypes.guess_type(rel)[0] or "application/octet-stream"
+        entry = {
+            "path": full, "mimetype": mimetype, "mtime": stat.st_mtime,
+            "cache_control": static_cache_control(rel), "body": None, "variants": {},
+        }
+        if stat.st_size > STATIC_MEMORY_MAX_BYTES:
+            entry["etag"] = f"{stat.st_size:x}-{int(stat.st_mtime):x}"
+            return entry
+
+        with open(full, "rb") as f:
+            body = f.read()
+        entry["body"] = body
+        entry["etag"] = hashlib.sha256(body).hexdigest()[:20]
+        compressible = mimetype.startswith("text/") or mimetype in STATIC_COMPRESSIBLE_MIMETYPES
+        if compressible and len(body) >= COMPRESS_MIN_BYTES:
+            for encoding, suffix in STATIC_VARIANTS:
+                data = self._variant(full + suffix, body, encoding)
+                if data is not None and len(data) < len(body):
+                    entry["variants"][encoding] = data
+        return entry
+
+    @staticmethod
+    def _variant(path, body, encoding):
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                return f.read()
+        if encoding == "br":
+            return brotli.compress(body, quality=STATIC_BROTLI_QUALITY) if brotli is not None else None
+        return gzip.compress(body, compresslevel=STATIC_GZIP_LEVEL, mtime=0)
+
+    def report(self):
         return {
-            "success": False,
-            "error": str(e),
-            "traceback": traceback.format_exc()
+            "files": len(self.files),
+            "precompressed": sum(1 for e in self.files.values() if e["variants"]),
+            "bytes": sum(len(e["body"]) for e in self.files.values() if e["body"] is not None),
+            "seconds": round(self.seconds, 3),
         }
 
+    def response(self, rel, req):
+        """Response for a dist/-relative path (304 when the client's copy is
+        current), or None when the file is not part of the build."""
+        entry = self.files.get(rel)
+        if entry is None:
+            return None
+        if entry["body"] is None:
+            response = send_file(entry["path"], mimetype=entry["mimetype"], etag=entry["etag"],
+                                 last_modified=entry["mtime"], conditional=True)
+        else:
+            encoding = next((e for e in entry["variants"] if req.accept_encodings[e]), None)
+            response = app.response_class(entry["variants"][encoding] if encoding else entry["body"],
+                                          mimetype=entry["mimetype"])
+            if encoding:
+                response.headers["Content-Encoding"] = encoding
+            if entry["variants"]:
+                response.vary.add("Accept-Encoding")
+            # Each encoding is a different representation, so it gets its own ETag
+            response.set_etag(f"{entry['etag']}-{encoding}" if encoding else entry["etag"])
+            response.last_modified = entry["mtime"]
+            response.make_conditional(req)
+        response.headers["Cache-Control"] = entry["cache_control"]
+        return response
+
+static_assets = StaticAssets(STATIC_FOLDER)
+
 @app.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({"status": "healthy", "message": "Backend API is running"})
+    return jsonify({"status": "healthy", "message": "Backend API is running", "storage": storage.name})
 
 @app.route('/process-file', methods=['POST'])
 def process_file():
@@ -804,32 +3385,41 @@ def process_file():
                 "error": "File type not allowed. Please upload Excel files (.xlsx, .xls)"
             }), 400
 
-        # Save uploaded file temporarily
         filename = secure_filename(file.filename)
-        temp_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(temp_path)
 
         try:
-            # Process the file using our backend logic
-            result = process_financial_data(temp_path)
-            
-            # Clean up temporary file
-            try:
-                os.remove(temp_path)
-            except PermissionError:
-                # File might be in use, try to delete it later
-                print(f"[WARNING] Could not delete temporary file {temp_path} - file may be in use")
-            
-            return jsonify(result)
+            response_format = negotiate_format(request)
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 400
 
-        except Exception as e:
-            # Clean up temporary file on error
-            try:
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
-            except PermissionError:
-                print(f"[WARNING] Could not delete temporary file {temp_path} - file may be in use")
-            raise e
+        # Keep the upload in memory (spilling large ones to an unnamed temp file)
+        upload = spool_upload(file)
+
+        # Async mode: queue the upload and return a job id straight away
+        if str(request.args.get('async', request.form.get('async', ''))).lower() in ('1', 'true', 'yes'):
+            job = job_queue.submit(upload, filename)
+            if job is None:
+                upload.close()
+                return jsonify({
+                    "success": False,
+                    "error": "Too many files are being processed. Please retry shortly."
+                }), 503
+            return jsonify({
+                "success": True,
+                "job": job,
+                "status_url": f"/jobs/{job['job_id']}",
+                "result_url": f"/jobs/{job['job_id']}/result"
+            }), 202
+
+        with upload:
+            # Process the file using our backend logic (re-uploads of the same
+            # bytes are served from the parse cache)
+            result = process_financial_data_cached(upload, filename)
+
+        return render_result(result, response_format, stream=wants_stream(request, result))
 
     except Exception as e:
         return jsonify({
@@ -838,16 +3428,87 @@ def process_file():
             "traceback": traceback.format_exc()
         }), 500
 
+@app.route('/process-batch', methods=['POST'])
+def process_batch_files():
+    """
+    Process several monthly workbooks (multiple 'files' fields and/or .zip
+    archives of workbooks) in parallel and return one merged dataset.
+    """
+    try:
+        uploads = request.files.getlist('files') or request.files.getlist('file')
+        if not uploads:
+            return jsonify({
+                "success": False,
+                "error": "No files provided"
+            }), 400
+
+        try:
+            items = collect_batch_files(uploads)
+        except (ValueError, zipfile.BadZipFile) as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 400
+
+        if not items:
+            return jsonify({
+                "success": False,
+                "error": "No Excel or CSV workbooks found in the upload"
+            }), 400
+
+        result = process_batch(items)
+        if wants_stream(request, result):
+            return streamed_json_response(result, request)
+        return jsonify(result)
+
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Batch processing failed: {str(e)}",
+            "traceback": traceback.format_exc()
+        }), 500
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_queue.status(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Unknown or expired job"}), 404
+    return jsonify({"success": True, "job": job})
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = job_queue.status(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Unknown or expired job"}), 404
+    if job["status"] in ("queued", "running"):
+        # Not finished yet: same body as the status endpoint
+        return jsonify({"success": True, "job": job}), 202
+    try:
+        response_format = negotiate_format(request)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    result = job_queue.result(job_id)
+    return render_result(result, response_format, stream=wants_stream(request, result))
+
+@app.route('/parse-cache', methods=['GET'])
+def parse_cache_stats():
+    return jsonify({"success": True, "cache": parse_cache.report(), "layout_plans": layout_plans.report()})
+
 @app.route('/upload-to-supabase', methods=['POST'])
 def upload_to_supabase():
     """
-    Upload processed data to Supabase database
+    Upload processed data to the configured storage (Supabase by default).
+    Rows are upserted on (file_id, outlet, period_key) under a file id derived
+    from the filename and its periods, so re-sending an upload, or a corrected
+    version of it, replaces the file's rows. A posted 'file_id' must name an
+    existing file, whose rows the upload then replaces.
     """
     try:
-        if not supabase:
+        unavailable = storage.unavailable_reason()
+        if unavailable:
             return jsonify({
                 "success": False,
-                "error": "Supabase client not initialized. Check environment variables."
+                "error": unavailable
             }), 500
 
         data = request.get_json()
@@ -867,154 +3528,108 @@ def upload_to_supabase():
                 "error": "No outlet data provided"
             }), 400
 
+        try:
+            frame = outlet_db_frame(outlets_data)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+
+        file_id = data.get('file_id')
+        if file_id is None:
+            file_id = upload_file_id(filename, frame)
+        else:
+            try:
+                file_id = str(uuid.UUID(str(file_id)))
+            except ValueError:
+                return jsonify({"success": False, "error": f"Invalid file_id: {file_id!r}"}), 400
+            if not storage.has_file(file_id):
+                return jsonify({
+                    "success": False,
+                    "error": f"Unknown file_id {file_id}; omit it to upload as a new file"
+                }), 400
+
         # Create file record in uploaded_files table (matching existing schema)
         file_record = {
+            "id": file_id,
             "file_name": filename,
             "file_path": f"uploads/{filename}",  # Virtual path since we're not using storage
             "file_size": None,  # We don't have file size from processed data
             "processed": True,  # We've already processed it
             "uploaded_by": None,  # No auth yet
             "metadata": {
-                "outlets_count": len(outlets_data),
+                "outlets_count": len(frame),
                 "processed_at": datetime.utcnow().isoformat()
             }
         }
-        
-        file_response = supabase.table('uploaded_files').insert(file_record).execute()
-        
-        if not file_response.data or len(file_response.data) == 0:
-            return jsonify({
-                "success": False,
-                "error": "Failed to create file record in Supabase"
-            }), 500
-
-        file_id = file_response.data[0]['id']
-        print(f"[INFO] Created file record with ID: {file_id}")
-
-        # Prepare outlet records
-        outlet_records = []
-        for outlet in outlets_data:
-            record = {
-                "file_id": file_id,
-                "outlet": outlet.get('Outlet', ''),
-                "outlet_manager": outlet.get('Outlet Manager', ''),
-                "month": outlet.get('Month', ''),
-                "direct_income": float(outlet.get('Direct Income', 0)) if outlet.get('Direct Income') else None,
-                "total_revenue": float(outlet.get('TOTAL REVENUE', 0)) if outlet.get('TOTAL REVENUE') else None,
-                "cogs": float(outlet.get('COGS', 0)) if outlet.get('COGS') else None,
-                "outlet_expenses": float(outlet.get('Outlet Expenses', 0)) if outlet.get('Outlet Expenses') else None,
-                "ebidta": float(outlet.get('EBIDTA', 0)) if outlet.get('EBIDTA') else None,
-                "finance_cost": float(outlet.get('Finance Cost', 0)) if outlet.get('Finance Cost') else None,
-                "bank_charges": float(outlet.get('01-Bank Charges', 0)) if outlet.get('01-Bank Charges') else None,
-                "interest_on_borrowings": float(outlet.get('02-Interest on Borrowings', 0)) if outlet.get('02-Interest on Borrowings') else None,
-                "interest_on_vehicle_loan": float(outlet.get('03-Interest on Vehicle Loan', 0)) if outlet.get('03-Interest on Vehicle Loan') else None,
-                "mg": float(outlet.get('04-MG', 0)) if outlet.get('04-MG') else None,
-                "pbt": float(outlet.get('PBT', 0)) if outlet.get('PBT') else None,
-                "wastage": float(outlet.get('WASTAGE', 0)) if outlet.get('WASTAGE') else None
-            }
-            outlet_records.append(record)
-
-        # Insert outlet records in batches (Supabase has limits)
-        batch_size = 100
-        inserted_count = 0
-        
-        for i in range(0, len(outlet_records), batch_size):
-            batch = outlet_records[i:i + batch_size]
-            outlets_response = supabase.table('outlets').insert(batch).execute()
-            
-            if outlets_response.data:
-                inserted_count += len(outlets_response.data)
-            else:
-                print(f"[WARNING] Batch {i//batch_size + 1} insert returned no data")
-
-        print(f"[INFO] Successfully inserted {inserted_count} outlet records")
+        frame.insert(0, "file_id", file_id)
+        stats = storage.write_upload(file_record, frame)
+        grain_cache.clear()
+        inserted_count = stats["rows"]
+        print(f"[INFO] Successfully wrote {inserted_count} outlet records for file {file_id} "
+              f"via {stats['backend']} in {stats['seconds']}s")
 
         return jsonify({
             "success": True,
             "file_id": file_id,
             "outlets_inserted": inserted_count,
-            "message": f"Successfully uploaded {inserted_count} outlet records to Supabase"
+            "duplicates_dropped": frame.attrs["duplicates_dropped"],
+            "write": stats,
+            "message": f"Successfully uploaded {inserted_count} outlet records to {storage.label}"
         })
 
     except Exception as e:
-        print(f"[ERROR] Supabase upload failed: {str(e)}")
+        print(f"[ERROR] Upload to {storage.label} failed: {str(e)}")
         print(traceback.format_exc())
         return jsonify({
             "success": False,
-            "error": f"Supabase upload failed: {str(e)}",
+            "error": f"Upload to {storage.label} failed: {str(e)}",
             "traceback": traceback.format_exc()
         }), 500
 
 @app.route('/interest-analysis', methods=['POST'])
-
 def interest_analysis():
     """
-    Endpoint specifically for interest cost analysis
+    Interest cost analysis. The rows come from the posted 'financial_data', or
+    from Supabase by 'file_id'; either way 'month_from'/'month_to' narrow them
+    to a month range.
     """
     try:
-        data = request.get_json()
-        if not data or 'financial_data' not in data:
+        data = request.get_json(silent=True) or {}
+        try:
+            month_from = month_bound(data.get('month_from'))
+            month_to = month_bound(data.get('month_to'))
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+
+        file_id = data.get('file_id')
+        if 'financial_data' in data:
+            frame = pd.DataFrame.from_records(data['financial_data'] or [])
+        elif file_id or month_from or month_to:
+            unavailable = storage.unavailable_reason()
+            if unavailable:
+                return jsonify({
+                    "success": False,
+                    "error": unavailable
+                }), 500
+            fields = ["Outlet", "Outlet Manager", "Month", "Period", "TOTAL REVENUE"] + INTEREST_METRICS
+            frame = storage.outlet_frame(file_id=file_id, fields=fields)
+        else:
             return jsonify({
                 "success": False,
-                "error": "No financial data provided"
+                "error": "No financial data provided. Send 'financial_data', a 'file_id' or 'month_from'/'month_to'"
             }), 400
 
-        financial_data = data['financial_data']
-        
-        # Calculate interest analysis metrics
-        interest_metrics = [
-            '01-Bank Charges',
-            '02-Interest on Borrowings', 
-            '03-Interest on Vehicle Loan',
-            '04-MG',
-            'Finance Cost'
-        ]
-        
-        # Calculate total interest costs
-        total_interest = 0
-        interest_breakdown = {}
-        
-        for metric in interest_metrics:
-            total_amount = sum(parseFloat(item.get(metric, 0)) or 0 for item in financial_data)
-            if total_amount > 0:
-                interest_breakdown[metric] = {
-                    'total_amount': total_amount,
-                    'outlet_count': len([item for item in financial_data if item.get(metric, 0) and parseFloat(item.get(metric, 0)) > 0]),
-                    'average_amount': total_amount / len(financial_data) if financial_data else 0
-                }
-                total_interest += total_amount
-        
-        # Calculate interest rates by outlet
-        outlet_analysis = []
-        for item in financial_data:
-            outlet = item.get('Outlet', 'Unknown')
-            manager = item.get('Outlet Manager', 'Unknown')
-            revenue = parseFloat(item.get('TOTAL REVENUE', 0)) or 0
-            
-            outlet_interest = sum(parseFloat(item.get(metric, 0)) or 0 for metric in interest_metrics)
-            interest_rate = (outlet_interest / revenue * 100) if revenue > 0 else 0
-            
-            outlet_analysis.append({
-                'outlet': outlet,
-                'manager': manager,
-                'total_interest': outlet_interest,
-                'revenue': revenue,
-                'interest_rate': interest_rate,
-                'interest_breakdown': {metric: parseFloat(item.get(metric, 0)) or 0 for metric in interest_metrics}
-            })
-        
-        # Sort by interest rate for efficiency analysis
-        outlet_analysis.sort(key=lambda x: x['interest_rate'])
-        
+        frame = filter_period_range(frame, month_from, month_to)
         return jsonify({
             "success": True,
-            "total_interest_costs": total_interest,
-            "interest_breakdown": interest_breakdown,
-            "outlet_analysis": outlet_analysis,
-            "average_interest_rate": sum(item['interest_rate'] for item in outlet_analysis) / len(outlet_analysis) if outlet_analysis else 0,
-            "message": f"Interest analysis completed for {len(financial_data)} outlets"
+            **analyse_interest(frame),
+            "source": {
+                "file_id": file_id,
+                "month_from": month_from,
+                "month_to": month_to,
+                "rows": len(frame),
+            },
         })
-        
+
     except Exception as e:
         return jsonify({
             "success": False,
@@ -1022,24 +3637,140 @@ def interest_analysis():
             "traceback": traceback.format_exc()
         }), 500
 
+@app.route('/aggregates', methods=['GET'])
+def aggregates():
+    """
+    Totals, means and revenue ratios over the stored outlet history, grouped by
+    any of outlet, manager, cluster, month and period and paginated.
+
+    Query parameters: group_by (comma separated), metrics (comma separated,
+    default all), outlet / manager / cluster / month / period / file
+    (exact-match filters; repeat one to accept several values), file_id,
+    month_from, month_to, sort (a dimension, metric or row_count; prefix '-'
+    for descending), page, page_size.
+    """
+    try:
+        args = request.args
+        group_by = list(dict.fromkeys(d.strip() for d in args.get('group_by', '').split(',') if d.strip()))
+        metrics = list(dict.fromkeys(m.strip() for m in args.get('metrics', '').split(',') if m.strip())) \
+            or OUTLET_METRIC_COLUMNS
+        unknown = [d for d in group_by if d not in AGGREGATE_DIMENSIONS] + \
+                  [m for m in metrics if m not in OUTLET_METRIC_COLUMNS]
+        if unknown:
+            return jsonify({
+                "success": False,
+                "error": f"Unknown dimension or metric: {', '.join(unknown)}",
+                "dimensions": list(AGGREGATE_DIMENSIONS),
+                "metrics": OUTLET_METRIC_COLUMNS
+            }), 400
+        try:
+            month_from = month_bound(args.get('month_from'))
+            month_to = month_bound(args.get('month_to'))
+            page = max(1, int(args.get('page', 1)))
+            page_size = min(AGGREGATE_MAX_PAGE_SIZE, max(1, int(args.get('page_size', AGGREGATE_PAGE_SIZE))))
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+
+        unavailable = storage.unavailable_reason()
+        if unavailable:
+            return jsonify({
+                "success": False,
+                "error": unavailable
+            }), 500
+
+        filters = {d: args.getlist(d) for d in AGGREGATE_DIMENSIONS if args.get(d)}
+        result = aggregate_outlets(grain_cache.get(args.get('file_id')), group_by, metrics, filters=filters,
+                                   month_from=month_from, month_to=month_to, sort=args.get('sort'),
+                                   page=page, page_size=page_size)
+        return jsonify({"success": True, **result})
+
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Aggregation failed: {str(e)}",
+            "traceback": traceback.format_exc()
+        }), 500
+
+@app.route('/rollups', methods=['GET'])
+def rollups():
+    """
+    Pre-aggregated totals from outlet_period_rollups: per period and cluster
+    over every upload, without reading the outlet rows. stale_periods lists the
+    periods in range whose rollups lag the outlet rows; while it is non-empty
+    ("stale": true) clients should use /aggregates instead.
+
+    Query parameters: group_by (comma separated subset of period, cluster;
+    default both), metrics (comma separated, default all), cluster,
+    month_from, month_to.
+    """
+    try:
+        args = request.args
+        group_by = list(dict.fromkeys(d.strip() for d in args.get('group_by', ','.join(ROLLUP_KEYS)).split(',')
+                                      if d.strip()))
+        metrics = list(dict.fromkeys(m.strip() for m in args.get('metrics', '').split(',') if m.strip())) \
+            or OUTLET_METRIC_COLUMNS
+        unknown = [d for d in group_by if d not in ROLLUP_KEYS] + \
+                  [m for m in metrics if m not in OUTLET_METRIC_COLUMNS]
+        if unknown:
+            return jsonify({
+                "success": False,
+                "error": f"Unknown dimension or metric: {', '.join(unknown)}",
+                "dimensions": ROLLUP_KEYS,
+                "metrics": OUTLET_METRIC_COLUMNS
+            }), 400
+        try:
+            month_from = month_bound(args.get('month_from'))
+            month_to = month_bound(args.get('month_to'))
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+
+        unavailable = storage.unavailable_reason()
+        if unavailable:
+            return jsonify({
+                "success": False,
+                "error": unavailable
+            }), 500
+
+        groups = period_rollup_groups(storage.period_rollups(), group_by, metrics, cluster=args.get('cluster'),
+                                      month_from=month_from, month_to=month_to)
+        stale = filter_period_range(pd.DataFrame({"period": storage.stale_rollup_periods()}, dtype=object),
+                                    month_from, month_to, period_col="period", month_col="period")
+        stale_periods = [str(p) for p in stale["period"]]
+        return jsonify({"success": True, "group_by": group_by, "metrics": metrics, "groups": groups,
+                        "stale": bool(stale_periods), "stale_periods": stale_periods})
+
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Rollup query failed: {str(e)}",
+            "traceback": traceback.format_exc()
+        }), 500
+
 # Static file serving (must be AFTER all API routes to avoid conflicts)
+API_PREFIXES = ('health', 'process-file', 'process-batch', 'jobs', 'parse-cache',
+                'upload-to-supabase', 'interest-analysis', 'aggregates', 'rollups')
+
 @app.route('/')
 def serve_react_app():
-    return send_from_directory(app.static_folder, 'index.html')
+    response = static_assets.response('index.html', request)
+    if response is None:
+        abort(404)
+    return response
 
 @app.route('/\u003cpath:path\u003e')
 def serve_static(path):
-    # Check if it's an API route first
-    if path.startswith(('health', 'process-file', 'upload-to-supabase', 'interest-analysis')):
-        # Let Flask handle the 404
-        return None
-    
-    # Serve static files
-    if path != "" and os.path.exists(os.path.join(app.static_folder, path)):
-        return send_from_directory(app.static_folder, path)
-    else:
-        # Fallback to index.html for client-side routing
-        return send_from_directory(app.static_folder, 'index.html')
+    # Unknown API paths are a plain 404, not the app shell
+    if path.startswith(API_PREFIXES):
+        abort(404)
+
+    response = static_assets.response(path, request)
+    # Fallback to index.html for client-side routing; a missing hashed asset
+    # (stale tab after a deploy) stays a 404 rather than HTML served as JS
+    if response is None and not path.startswith('assets/'):
+        response = static_assets.response('index.html', request)
+    if response is None:
+        abort(404)
+    return response
 
 if __name__ == '__main__':
     # Use PORT from environment variable (Render provides this)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: publishing a month through the REST batch path (BulkWriter upserts
+via Supabase / POSTGREST_URL) vs direct Postgres COPY (DATABASE_URL), on the
+bundled workbook's outlets replicated to the requested row counts.
+
+Both paths write the same rows under throwaway file ids and delete them
+afterwards (outlets cascade from uploaded_files), then rebuild the rollups
+of the periods they touched.
+
+Usage: python benchmark_ingest.py [rows ...] [--repeats N]
+"""
+import contextlib
+import io
+import sys
+import time
+import uuid
+
+with contextlib.redirect_stdout(io.StringIO()):
+    from backend_api import (DATABASE_URL, outlet_db_frame, pg_transaction, process_financial_data,
+                             psycopg2, rest_client, upload_periods, write_upload_copy, write_upload_rest)
+
+WORKBOOK = "Outlet PL June-25.xlsx"
+ROW_COUNTS = [500, 5000, 20000]
+
+
+def upload_frame(records, rows):
+    """rows outlet records: the workbook's outlets renamed per copy."""
+    copies = -(-rows // len(records))
+    replicated = [dict(r, Outlet=f"{r['Outlet']} #{i}") for i in range(copies) for r in records]
+    return outlet_db_frame(replicated[:rows])
+
+
+def file_record(file_id, rows):
+    return {
+        "id": file_id,
+        "file_name": "benchmark_ingest.xlsx",
+        "file_path": "uploads/benchmark_ingest.xlsx",
+        "file_size": None,
+        "processed": True,
+        "uploaded_by": None,
+        "metadata": {"outlets_count": rows, "benchmark": True},
+    }
+
+
+def cleanup(file_id, frame):
+    periods = upload_periods(frame)
+    if DATABASE_URL and psycopg2 is not None:
+        with pg_transaction() as cur:
+            cur.execute("DELETE FROM public.uploaded_files WHERE id = %s", (file_id,))
+            cur.execute("SELECT public.refresh_outlet_rollups(%s::date[])", (periods,))
+    else:
+        rest_client.table('uploaded_files').delete().eq('id', file_id).execute()
+        rest_client.rpc('refresh_outlet_rollups', {"periods": periods}).execute()
+
+
+def timed(write, frame):
+    file_id = str(uuid.uuid4())
+    batch = frame.copy()
+    batch.insert(0, "file_id", file_id)
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            write(file_record(file_id, len(batch)), batch)
+        return time.perf_counter() - start
+    finally:
+        cleanup(file_id, frame)
+
+
+def main():
+    args = sys.argv[1:]
+    repeats = 3
+    if "--repeats" in args:
+        i = args.index("--repeats")
+        repeats = int(args[i + 1])
+        del args[i:i + 2]
+    row_counts = [int(a) for a in args] or ROW_COUNTS
+
+    backends = []
+    if rest_client:
+        backends.append(("rest", write_upload_rest))
+    if DATABASE_URL and psycopg2 is not None:
+        backends.append(("copy", write_upload_copy))
+    if not backends:
+        print("Configure Supabase / POSTGREST_URL and/or DATABASE_URL (with psycopg2) first")
+        sys.exit(1)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        records = process_financial_data(WORKBOOK)["data"]
+
+    names = [name for name, _ in backends]
+    print(f"{'rows':>8} " + " ".join(f"{name + ' ms':>10} {name + ' rows/s':>12}" for name in names)
+          + (f" {'speedup':>8}" if len(backends) == 2 else ""))
+    print("-" * (9 + 24 * len(backends) + (9 if len(backends) == 2 else 0)))
+
+    for rows in row_counts:
+        frame = upload_frame(records, rows)
+        best = {name: min(timed(write, frame) for _ in range(repeats)) for name, write in backends}
+        line = f"{len(frame):8d} " + " ".join(f"{best[n] * 1000:10.1f} {len(frame) / best[n]:12,.0f}" for n in names)
+        if len(backends) == 2:
+            line += f" {best['rest'] / best['copy']:7.1f}x"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
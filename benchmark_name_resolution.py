@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Check and benchmark: label_row_names (one vectorized pass per label row) vs the
+previous per-block get_name scan, on every sheet of the bundled workbooks.
+
+Every column of every candidate label row is compared, for both windows the
+extractor uses (outlet row: 6 rows up, manager row: 8 rows up).
+
+Usage: python benchmark_name_resolution.py [repeats]
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+with contextlib.redirect_stdout(io.StringIO()):
+    from backend_api import HEADER_SCAN_ROWS, WorkbookSession, detect_header, label_row_names, norm_str
+
+WORKBOOKS = [
+    "Outlet PL June-25.xlsx",
+    "data4.xlsx",
+    "data5.xlsx",
+    "test_outlet.xlsx",
+    "Store Format.xlsx",
+]
+WINDOWS = [6, 8]
+
+
+def get_name_legacy(df_raw, base_row, base_col, max_up=6, max_dx=2):
+    """The per-cell scan label_row_names replaced."""
+    h, w = df_raw.shape
+    for up in range(0, max_up + 1):
+        r = base_row - up
+        if r < 0:
+            break
+        for dx in [0, -1, 1, -2, 2]:
+            c = base_col + dx
+            if 0 <= c < w:
+                v = norm_str(df_raw.iat[r, c])
+                if v:
+                    return v
+    return ""
+
+
+def best_of(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return result, min(timings)
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    print(f"{'workbook / sheet':45} {'rows x cols':>12} {'legacy ms':>10} {'vector ms':>10} {'speedup':>8}  result")
+    print("-" * 100)
+    mismatches = 0
+
+    for filename in WORKBOOKS:
+        if not os.path.exists(filename):
+            print(f"{filename}: not found, skipped")
+            continue
+
+        with WorkbookSession(filename) as session:
+            for sheet in session.sheet_names:
+                df0 = session.raw(sheet, nrows=HEADER_SCAN_ROWS)
+                if df0.empty:
+                    continue
+                with contextlib.redirect_stdout(io.StringIO()):
+                    hdr_row, _ = detect_header(df0)
+                df_head = df0.iloc[:hdr_row + 1]
+                w = df_head.shape[1]
+
+                def legacy():
+                    return [[[get_name_legacy(df_head, r, c, max_up=up) for c in range(w)]
+                             for r in range(hdr_row + 1)] for up in WINDOWS]
+
+                def vector():
+                    return [[label_row_names(df_head, r, max_up=up).tolist()
+                             for r in range(hdr_row + 1)] for up in WINDOWS]
+
+                old, t_old = best_of(legacy, repeats)
+                new, t_new = best_of(vector, repeats)
+                bad = sum(a != b for x, y in zip(old, new) for ra, rb in zip(x, y) for a, b in zip(ra, rb))
+                mismatches += bad
+                status = "same" if not bad else f"{bad} DIFFERENT cells"
+                print(f"{(filename + ' / ' + sheet)[:45]:45} {f'{hdr_row + 1}x{w}':>12} {t_old * 1000:10.1f} "
+                      f"{t_new * 1000:10.1f} {t_old / t_new:7.1f}x  {status}")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark: native zipfile/iterparse xlsx reader vs the openpyxl reader, end to
+end through process_financial_data on the bundled workbooks.
+
+Usage: python benchmark_xlsx_reader.py [repeats]
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+with contextlib.redirect_stdout(io.StringIO()):
+    from backend_api import WorkbookSession, _process_workbook
+
+WORKBOOKS = [
+    "Outlet PL June-25.xlsx",
+    "data4.xlsx",
+    "data5.xlsx",
+]
+READERS = ["openpyxl", "native"]
+
+
+def run(data, reader):
+    with contextlib.redirect_stdout(io.StringIO()):
+        with WorkbookSession(data, xlsx_reader=reader) as session:
+            return _process_workbook(session)
+
+
+def best_of(data, reader, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = run(data, reader)
+        timings.append(time.perf_counter() - start)
+    return result, min(timings)
+
+
+def peak_memory(data, reader):
+    tracemalloc.start()
+    run(data, reader)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'workbook':28} {'openpyxl ms':>12} {'native ms':>10} {'speedup':>8} "
+          f"{'openpyxl MB':>12} {'native MB':>10}  result")
+    print("-" * 100)
+
+    for filename in WORKBOOKS:
+        if not os.path.exists(filename):
+            print(f"{filename}: not found, skipped")
+            continue
+
+        with open(filename, "rb") as f:
+            data = f.read()
+
+        # Warm-up both readers once so imports/regex compilation are not timed
+        for reader in READERS:
+            run(data, reader)
+
+        results = {reader: best_of(data, reader, repeats) for reader in READERS}
+        memory = {reader: peak_memory(data, reader) / 2 ** 20 for reader in READERS}
+        (old, t_old), (new, t_new) = results["openpyxl"], results["native"]
+        status = "same" if old.get("data") == new.get("data") else "DIFFERENT"
+        print(f"{filename:28} {t_old * 1000:12.1f} {t_new * 1000:10.1f} {t_old / t_new:7.1f}x "
+              f"{memory['openpyxl']:12.1f} {memory['native']:10.1f}  {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,5 +11,31 @@ npm install
 echo "=== Building React frontend ==="
 npm run build
 
+echo "=== Precompressing frontend assets ==="
+# The server serves dist/*.br and *.gz as-is instead of compressing at startup
+python - <<'PY'
+import gzip, os
+try:
+    import brotli
+except ImportError:
+    brotli = None
+for dirpath, _, filenames in os.walk("dist"):
+    for name in filenames:
+        path = os.path.join(dirpath, name)
+        if not name.endswith((".js", ".css", ".html", ".svg", ".json", ".txt", ".xml", ".webmanifest", ".wasm")):
+            continue
+        with open(path, "rb") as f:
+            body = f.read()
+        if len(body) < 1024:
+            continue
+        variants = {".gz": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants[".br"] = brotli.compress(body, quality=11)
+        for suffix, data in variants.items():
+            if len(data) < len(body):
+                with open(path + suffix, "wb") as f:
+                    f.write(data)
+PY
+
 echo "=== Build complete! ==="
 ls -la dist/
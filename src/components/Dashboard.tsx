@@ -5,9 +5,10 @@ import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@
 import { Badge } from '@/components/ui/badge';
 import { Filter, X } from 'lucide-react';
 import { TrendingUp, DollarSign, ShoppingCart, Clock, Users, Crown } from 'lucide-react';
+import { useAggregates, useDimensionValues } from '@/hooks/useAggregates';
+import { useRollupTotals } from '@/hooks/useRollups';
 
 interface DashboardProps {
-  data: any[];
   className?: string;
 }
 
@@ -41,7 +42,47 @@ const MetricCard: React.FC<MetricCardProps> = ({ title, value, icon, trend, colo
   </Card>
 );
 
-export const Dashboard: React.FC<DashboardProps> = memo(({ data, className = '' }) => {
+// "2025-06-01" -> "Jun 2025"
+const formatPeriod = (period?: string) =>
+  period ? new Date(period).toLocaleString('en-US', { month: 'short', year: 'numeric', timeZone: 'UTC' }) : '-';
+
+const formatAmount = (value: number | null | undefined) => `₹${Math.round(value || 0).toLocaleString()}`;
+
+interface TotalsTableProps {
+  title: string;
+  heading: string;
+  rows: { label: string; total_revenue?: number | null; ebidta?: number | null; pbt?: number | null }[];
+}
+
+const TotalsTable: React.FC<TotalsTableProps> = ({ title, heading, rows }) => (
+  <Card className="p-6">
+    <h3 className="text-lg font-semibold text-foreground mb-4">{title}</h3>
+    <div className="max-h-80 overflow-y-auto">
+      <table className="w-full text-sm">
+        <thead>
+          <tr className="text-left text-muted-foreground border-b">
+            <th className="py-2 font-medium">{heading}</th>
+            <th className="py-2 font-medium text-right">Revenue</th>
+            <th className="py-2 font-medium text-right">EBITDA</th>
+            <th className="py-2 font-medium text-right">PBT</th>
+          </tr>
+        </thead>
+        <tbody>
+          {rows.map(row => (
+            <tr key={row.label} className="border-b border-border/50">
+              <td className="py-2 text-foreground">{row.label}</td>
+              <td className="py-2 text-right">{formatAmount(row.total_revenue)}</td>
+              <td className="py-2 text-right">{formatAmount(row.ebidta)}</td>
+              <td className="py-2 text-right">{formatAmount(row.pbt)}</td>
+            </tr>
+          ))}
+        </tbody>
+      </table>
+    </div>
+  </Card>
+);
+
+export const Dashboard: React.FC<DashboardProps> = memo(({ className = '' }) => {
   // Filter states
   const [filters, setFilters] = useState({
     outlet: 'all',
@@ -49,184 +90,67 @@ export const Dashboard: React.FC<DashboardProps> = memo(({ data, className = ''
     month: 'all'
   });
 
-  // Get unique filter options from data
-  const filterOptions = useMemo(() => {
-    if (!data || data.length === 0) return { outlets: [], clusterManagers: [], months: [] };
-
-    console.log('Dashboard - Sample data item:', data[0]);
-    console.log('Dashboard - All data length:', data.length);
-
-    const outlets = [...new Set(data.map(item => 
-      item['Outlet'] || item['Outlet Name'] || item['Branch'] || item['Store Name']
-    ).filter(Boolean))];
-    
-    console.log('Dashboard - Found outlets:', outlets);
-    
-    const clusterManagers = [...new Set(data.map(item => 
-      item['Outlet Manager'] || item['Cluster Manager'] || item['Cashier'] || item['Cashier Name']
-    ).filter(Boolean))];
-    
-    const months = [...new Set(data.map(item => 
-      item['Month'] || item['Date']?.substring(0, 7) // Extract YYYY-MM from date
-    ).filter(Boolean))];
-
-    return {
-      outlets: outlets.sort(),
-      clusterManagers: clusterManagers.sort(),
-      months: months.sort()
-    };
-  }, [data]);
-
-  // Apply filters to data
-  const filteredData = useMemo(() => {
-    if (!data || data.length === 0) return [];
-    
-    console.log('Dashboard - Current filters:', filters);
-    console.log('Dashboard - Available outlets:', filterOptions.outlets);
-    
-    const filtered = data.filter(item => {
-      if (filters.outlet !== 'all') {
-        const outlet = item['Outlet'] || item['Outlet Name'] || item['Branch'] || item['Store Name'];
-        console.log(`Dashboard - Checking outlet: "${outlet}" against filter: "${filters.outlet}"`);
-        if (outlet !== filters.outlet) return false;
-      }
-      
-      if (filters.clusterManager !== 'all') {
-        const manager = item['Outlet Manager'] || item['Cluster Manager'] || item['Cashier'] || item['Cashier Name'];
-        if (manager !== filters.clusterManager) return false;
-      }
-      
-      if (filters.month !== 'all') {
-        const month = item['Month'] || item['Date']?.substring(0, 7);
-        if (month !== filters.month) return false;
-      }
-      
-      return true;
-    });
-    
-    console.log('Dashboard - Filtered data count:', filtered.length);
-    return filtered;
-  }, [data, filters, filterOptions.outlets]);
-
-  // Limit data processing to prevent performance issues
-  const limitedData = useMemo(() => {
-    return filteredData.slice(0, 1000); // Process only first 1000 records
-  }, [filteredData]);
-
-  const calculateMetrics = useMemo(() => {
-    if (!limitedData || limitedData.length === 0) {
-    return {
-      directIncome: 0,
-      totalRevenue: 0,
-      cogs: 0,
-      outletExpenses: 0,
-      ebitda: 0,
-      pbt: 0,
-      wastage: 0,
-      activeClusterManagers: 0,
-      topClusterManager: 'N/A',
-      averageOutletIncome: 0
-    };
-    }
-
-    // Check if this is outlet-based data (has Outlet column)
-    const hasOutletData = limitedData.some(item => item['Outlet']);
-
-    let directIncome, totalRevenue, cogs, outletExpenses, ebitda, pbt, wastage, clusterData, activeClusterManagers, topClusterManager;
-
-    if (hasOutletData) {
-      // For outlet-based data, sum the financial metrics directly from columns
-      directIncome = limitedData.reduce((sum, item) => sum + (parseFloat(item['Direct Income']) || 0), 0);
-      totalRevenue = limitedData.reduce((sum, item) => sum + (parseFloat(item['TOTAL REVENUE']) || 0), 0);
-      cogs = limitedData.reduce((sum, item) => sum + (parseFloat(item['COGS']) || 0), 0);
-      outletExpenses = limitedData.reduce((sum, item) => sum + (parseFloat(item['Outlet Expenses']) || 0), 0);
-      ebitda = limitedData.reduce((sum, item) => sum + (parseFloat(item['EBIDTA']) || 0), 0);
-      pbt = limitedData.reduce((sum, item) => sum + (parseFloat(item['PBT']) || 0), 0);
-      wastage = limitedData.reduce((sum, item) => sum + (parseFloat(item['WASTAGE']) || 0), 0);
-
-      // Outlet Manager analytics
-      clusterData = limitedData.reduce((acc, item) => {
-        const cluster = item['Outlet Manager'] || item['Cluster Manager'] || item['Cashier'] || 'Unknown';
-        const amount = parseFloat(item['TOTAL REVENUE']) || 0;
-        
-        if (!acc[cluster]) {
-          acc[cluster] = { revenue: 0 };
-        }
-        acc[cluster].revenue += amount;
-        return acc;
-      }, {} as Record<string, { revenue: number }>);
-    } else {
-      // For transaction-based data, use the original logic
-      directIncome = limitedData
-        .filter(item => item['Product Name']?.toLowerCase().includes('direct income'))
-        .reduce((sum, item) => sum + (parseFloat(item['Total Amount (₹)']) || 0), 0);
-
-      totalRevenue = limitedData
-        .filter(item => item['Product Name']?.toLowerCase().includes('total revenue'))
-        .reduce((sum, item) => sum + (parseFloat(item['Total Amount (₹)']) || 0), 0);
-
-      cogs = limitedData
-        .filter(item => item['Product Name']?.toLowerCase().includes('cogs'))
-        .reduce((sum, item) => sum + (parseFloat(item['Total Amount (₹)']) || 0), 0);
-
-      outletExpenses = limitedData
-        .filter(item => item['Product Name']?.toLowerCase().includes('outlet expenses'))
-        .reduce((sum, item) => sum + (parseFloat(item['Total Amount (₹)']) || 0), 0);
-
-      ebitda = limitedData
-        .filter(item => item['Product Name']?.toLowerCase().includes('ebitda') || item['Product Name']?.toLowerCase().includes('ebidta'))
-        .reduce((sum, item) => sum + (parseFloat(item['Total Amount (₹)']) || 0), 0);
+  // Filter options: the distinct outlets, managers and months the backend holds
+  const { values: outlets } = useDimensionValues('outlet');
+  const { values: clusterManagers } = useDimensionValues('manager');
+  const { values: months } = useDimensionValues('month');
+  const filterOptions = { outlets, clusterManagers, months };
 
-      pbt = limitedData
-        .filter(item => item['Product Name']?.toLowerCase().includes('pbt'))
-        .reduce((sum, item) => sum + (parseFloat(item['Total Amount (₹)']) || 0), 0);
+  const aggregateFilters = {
+    outlet: filters.outlet !== 'all' ? filters.outlet : undefined,
+    manager: filters.clusterManager !== 'all' ? filters.clusterManager : undefined,
+    month: filters.month !== 'all' ? filters.month : undefined,
+  };
 
-      wastage = limitedData
-        .filter(item => item['Product Name']?.toLowerCase().includes('wastage'))
-        .reduce((sum, item) => sum + (parseFloat(item['Total Amount (₹)']) || 0), 0);
+  // Totals over the full stored history, computed by the backend; the top
+  // manager comes back as the first group sorted by revenue
+  const { aggregates } = useAggregates({
+    groupBy: ['manager'],
+    sort: '-total_revenue',
+    pageSize: 1,
+    filters: aggregateFilters,
+  });
 
-      // Cluster Manager analytics
-      clusterData = limitedData.reduce((acc, item) => {
-        const cluster = item['Cluster Manager'] || item['Cashier'] || item['Cashier Name'] || 'Unknown';
-        const amount = parseFloat(item['Total Amount (₹)']) || 0;
-        
-        if (!acc[cluster]) {
-          acc[cluster] = { revenue: 0 };
-        }
-        acc[cluster].revenue += amount;
-        return acc;
-      }, {} as Record<string, { revenue: number }>);
+  // Month and cluster totals from the upload-maintained rollups (the outlet rows
+  // are regrouped instead while those are stale or a filter is set)
+  const totalsQuery = { metrics: ['total_revenue', 'ebidta', 'pbt'], filters: aggregateFilters };
+  const { groups: periodTotals } = useRollupTotals('period', totalsQuery);
+  const { groups: clusterTotals } = useRollupTotals('cluster', totalsQuery);
+
+  const hasData = !!aggregates && aggregates.totals.row_count > 0;
+
+  const metrics = useMemo(() => {
+    if (!hasData) {
+      return {
+        directIncome: 0,
+        totalRevenue: 0,
+        cogs: 0,
+        outletExpenses: 0,
+        ebitda: 0,
+        pbt: 0,
+        wastage: 0,
+        activeClusterManagers: 0,
+        topClusterManager: 'N/A',
+        averageOutletIncome: 0
+      };
     }
 
-
-    activeClusterManagers = Object.keys(clusterData).length;
-    topClusterManager = Object.entries(clusterData).reduce(
-      (max, [cluster, stats]) => (stats as any).revenue > max.revenue ? { cluster, revenue: (stats as any).revenue } : max,
-      { cluster: 'N/A', revenue: 0 }
-    ).cluster;
-
-    // Calculate average outlet income
-    const uniqueOutlets = [...new Set(limitedData.map(item => 
-      item['Outlet'] || item['Outlet Name'] || item['Branch'] || item['Store Name']
-    ).filter(Boolean))];
-    
-    const averageOutletIncome = uniqueOutlets.length > 0 ? totalRevenue / uniqueOutlets.length : 0;
-
+    const sum = aggregates.totals.sum;
+    const totalRevenue = sum.total_revenue || 0;
+    const outletCount = aggregates.totals.distinct.outlet;
     return {
-      directIncome: Math.round(directIncome),
+      directIncome: Math.round(sum.direct_income || 0),
       totalRevenue: Math.round(totalRevenue),
-      cogs: Math.round(cogs),
-      outletExpenses: Math.round(outletExpenses),
-      ebitda: Math.round(ebitda),
-      pbt: Math.round(pbt),
-      wastage: Math.round(wastage),
-      activeClusterManagers,
-      topClusterManager,
-      averageOutletIncome: Math.round(averageOutletIncome)
+      cogs: Math.round(sum.cogs || 0),
+      outletExpenses: Math.round(sum.outlet_expenses || 0),
+      ebitda: Math.round(sum.ebidta || 0),
+      pbt: Math.round(sum.pbt || 0),
+      wastage: Math.round(sum.wastage || 0),
+      activeClusterManagers: aggregates.totals.distinct.manager,
+      topClusterManager: aggregates.groups[0]?.manager || 'N/A',
+      averageOutletIncome: Math.round(outletCount > 0 ? totalRevenue / outletCount : 0)
     };
-  }, [limitedData]);
-
-  const metrics = calculateMetrics;
+  }, [aggregates, hasData]);
 
   const clearAllFilters = () => {
     setFilters({
@@ -397,7 +321,22 @@ export const Dashboard: React.FC<DashboardProps> = memo(({ data, className = ''
         />
       </div>
 
-      {limitedData.length === 0 && (
+      {hasData && (periodTotals.length > 0 || clusterTotals.length > 0) && (
+        <div className="grid grid-cols-1 lg:grid-cols-2 gap-6">
+          <TotalsTable
+            title="Totals by Month"
+            heading="Month"
+            rows={periodTotals.map(group => ({ label: formatPeriod(group.period), ...group.sum }))}
+          />
+          <TotalsTable
+            title="Totals by Cluster"
+            heading="Cluster"
+            rows={clusterTotals.map(group => ({ label: group.cluster || 'Unassigned', ...group.sum }))}
+          />
+        </div>
+      )}
+
+      {!hasData && (
         <Card className="card-elevated p-12 text-center">
           <div className="space-y-4">
             <div className="p-4 bg-gradient-primary rounded-2xl inline-block">
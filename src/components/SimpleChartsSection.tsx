@@ -9,6 +9,7 @@ import { Badge } from '@/components/ui/badge';
 import { Tabs, TabsContent, TabsList, TabsTrigger } from '@/components/ui/tabs';
 import { BarChart3, TrendingUp, Filter, X, FileText, GitCompare, Users } from 'lucide-react';
 import { useStoreContext } from '../contexts/StoreContext';
+import { AGGREGATE_MAX_PAGE_SIZE, type AggregateQuery, useAggregates, useDimensionValues } from '@/hooks/useAggregates';
 import {
   BarChart,
   Bar,
@@ -30,11 +31,12 @@ import {
 } from 'recharts';
 
 interface SimpleChartsSectionProps {
-  data: any[];
-  dataByFile?: Record<string, any[]>;
   className?: string;
 }
 
+// How an uploaded file is labelled in the comparison cards and charts
+const fileLabel = (fileId: string) => `File ID: ${fileId}`;
+
 // Vibrant Sweets-Inspired Color Palette
 const COLORS = [
   'hsl(15, 85%, 55%)',     // Sweet Red (Jalebi)
@@ -59,7 +61,7 @@ const GRADIENT_COLORS = [
   'linear-gradient(135deg, hsl(300, 60%, 50%), hsl(280, 70%, 55%))' // Adjusted from gold to magenta
 ];
 
-export const SimpleChartsSection: React.FC<SimpleChartsSectionProps> = memo(({ data, dataByFile = {}, className = '' }) => {
+export const SimpleChartsSection: React.FC<SimpleChartsSectionProps> = memo(({ className = '' }) => {
   const { getCategories, getStoresByCategory } = useStoreContext();
   
   // Comparison state
@@ -75,391 +77,127 @@ export const SimpleChartsSection: React.FC<SimpleChartsSectionProps> = memo(({ d
   });
   
 
-  // Get available sheets for comparison
-  const availableSheets = Object.keys(dataByFile);
+  // Uploaded files available for comparison (unfiltered)
+  const { values: availableSheets, isLoading: sheetsLoading } = useDimensionValues('file');
   const hasMultipleSheets = availableSheets.length > 1;
 
-  // Get unique filter options from all data
-  const filterOptions = useMemo(() => {
-    const allData = Object.values(dataByFile).flat();
-    if (!allData || allData.length === 0) return { outlets: [], clusterManagers: [], months: [], files: [], categories: [] };
-
-    console.log('SimpleChartsSection - Sample data item:', allData[0]);
-    console.log('SimpleChartsSection - All data length:', allData.length);
-
-    const outlets = [...new Set(allData.map(item => 
-      item['Outlet'] || item['Outlet Name'] || item['Branch'] || item['Store Name']
-    ).filter(Boolean))];
-    
-    console.log('SimpleChartsSection - Found outlets:', outlets);
-    
-    const clusterManagers = [...new Set(allData.map(item => 
-      item['Outlet Manager'] || item['Cluster Manager'] || item['Cashier'] || item['Cashier Name']
-    ).filter(Boolean))];
-    
-    const months = [...new Set(allData.map(item => 
-      item['Month'] || item['Date']?.substring(0, 7)
-    ).filter(Boolean))];
-
-    // Use store categories from context
-    const categories = getCategories();
-
-
-    // Sort months in chronological order
-    const sortedMonths = months.sort((a, b) => {
-      // Convert month strings to sortable format
-      const getSortableDate = (monthStr: string) => {
-        if (monthStr.includes('-')) {
-          // Format: YYYY-MM -> YYYYMM
-          return monthStr.replace('-', '');
-        } else if (monthStr.includes('/')) {
-          // Format: MM/YYYY -> YYYYMM
-          const parts = monthStr.split('/');
-          if (parts.length === 2) {
-            return parts[1] + parts[0].padStart(2, '0');
-          }
-        } else if (monthStr.length === 6) {
-          // Format: YYYYMM -> already correct
-          return monthStr;
-        } else if (monthStr.length === 4) {
-          // Format: YYYY -> YYYY01 (treat as January)
-          return monthStr + '01';
-        }
-        return monthStr;
-      };
-
-      const dateA = getSortableDate(a);
-      const dateB = getSortableDate(b);
-      
-      // Simple string comparison for YYYYMM format
-      return dateA.localeCompare(dateB);
-    });
-
-    return {
-      outlets: outlets.sort(),
-      clusterManagers: clusterManagers.sort(),
-      months: sortedMonths,
-      files: availableSheets.sort(),
-      categories: categories.sort()
-    };
-  }, [dataByFile, availableSheets, getCategories]);
-
-  // Apply filters to data
-  const filteredDataByFile = useMemo(() => {
-    const filtered: Record<string, any[]> = {};
-    
-    console.log('SimpleChartsSection - Current filters:', filters);
-    console.log('SimpleChartsSection - Available outlets:', filterOptions.outlets);
-    
-    Object.entries(dataByFile).forEach(([filename, fileData]) => {
-      if (filters.file !== 'all' && filename !== filters.file) return;
-      
-      const fileFilteredData = fileData.filter(item => {
-        if (filters.outlet !== 'all') {
-          const outlet = item['Outlet'] || item['Outlet Name'] || item['Branch'] || item['Store Name'];
-          console.log(`SimpleChartsSection - Checking outlet: "${outlet}" against filter: "${filters.outlet}"`);
-          if (outlet !== filters.outlet) return false;
-        }
-        
-        if (filters.clusterManager !== 'all') {
-          const manager = item['Outlet Manager'] || item['Cluster Manager'] || item['Cashier'] || item['Cashier Name'];
-          if (manager !== filters.clusterManager) return false;
-        }
-        
-        if (filters.month !== 'all') {
-          const month = item['Month'] || item['Date']?.substring(0, 7);
-          if (month !== filters.month) return false;
-        }
-        
-        // Filter by store category - check if the outlet belongs to the selected category
-        if (filters.category !== 'all') {
-          const outlet = item['Outlet'] || item['Outlet Name'] || item['Branch'] || item['Store Name'];
-          const storesInCategory = getStoresByCategory(filters.category);
-          const outletInCategory = storesInCategory.some(store => store.Outlet === outlet);
-          if (!outletInCategory) return false;
-        }
-        
-        return true;
-      });
-      
-      if (fileFilteredData.length > 0) {
-        filtered[filename] = fileFilteredData;
-        console.log(`SimpleChartsSection - File ${filename}: ${fileFilteredData.length} items after filtering`);
-      }
-    });
-    
-    console.log('SimpleChartsSection - Filtered data by file:', Object.keys(filtered));
-    return filtered;
-  }, [dataByFile, filters, filterOptions.outlets, getStoresByCategory]);
-
-  // Use filtered data for comparison
-  const limitedData = useMemo(() => {
-    // Combine all filtered data from different files
-    const allFilteredData = Object.values(filteredDataByFile).flat();
-    return allFilteredData.length > 0 ? allFilteredData : data;
-  }, [filteredDataByFile, data]);
-
-  // Debug logging
-  console.log('SimpleChartsSection - data length:', data?.length);
-  console.log('SimpleChartsSection - dataByFile keys:', Object.keys(dataByFile));
-  console.log('SimpleChartsSection - availableSheets:', availableSheets);
-
-  if (!data || data.length === 0) {
-    return (
-      <div className={`space-y-8 ${className}`}>
-        <Card className="card-elevated p-12 text-center">
-          <div className="space-y-4">
-            <div className="p-4 bg-gradient-primary rounded-2xl inline-block">
-              <BarChart3 className="h-12 w-12 text-white" />
-            </div>
-            <h3 className="text-xl font-semibold text-foreground font-display">Analytics Awaiting Data</h3>
-            <p className="text-muted-foreground text-lg max-w-md mx-auto">
-              Upload your sales data to unlock powerful visualizations and business insights
-            </p>
-          </div>
-        </Card>
-      </div>
-    );
-  }
-
-
-
-  // Comparison data processing - focused on overview metrics
+  // Filter options: the distinct values the backend holds, months in calendar order
+  const { values: outlets } = useDimensionValues('outlet');
+  const { values: clusterManagers } = useDimensionValues('manager');
+  const { values: months } = useDimensionValues('month');
+  const filterOptions = useMemo(() => ({
+    outlets,
+    clusterManagers,
+    months,
+    files: availableSheets,
+    categories: getCategories().sort()
+  }), [outlets, clusterManagers, months, availableSheets, getCategories]);
+
+  // The outlets the outlet and category filters accept (undefined: any)
+  const outletFilter = useMemo(() => {
+    if (filters.category === 'all') {
+      return filters.outlet !== 'all' ? [filters.outlet] : undefined;
+    }
+    const storesInCategory = getStoresByCategory(filters.category).map(store => store.Outlet);
+    return filters.outlet !== 'all'
+      ? storesInCategory.filter(outlet => outlet === filters.outlet)
+      : storesInCategory;
+  }, [filters.outlet, filters.category, getStoresByCategory]);
+
+  // An outlet outside the chosen category (or an empty category) matches nothing
+  const matchesNothing = !!outletFilter && outletFilter.length === 0;
+
+  // Every chart below is computed by the backend over the filtered outlet rows
+  const query: AggregateQuery = {
+    filters: {
+      outlet: outletFilter,
+      manager: filters.clusterManager !== 'all' ? filters.clusterManager : undefined,
+      month: filters.month !== 'all' ? filters.month : undefined,
+      file: filters.file !== 'all' ? filters.file : undefined,
+    },
+    pageSize: AGGREGATE_MAX_PAGE_SIZE,
+  };
+  const { aggregates: byFile } = useAggregates({ ...query, groupBy: ['file'], sort: 'file' }, !matchesNothing);
+  const { aggregates: byFileManager } = useAggregates(
+    { ...query, groupBy: ['file', 'manager'], metrics: ['total_revenue'], sort: '-total_revenue' }, !matchesNothing);
+  const { aggregates: byManager } = useAggregates(
+    { ...query, groupBy: ['manager'], metrics: ['total_revenue'], sort: '-total_revenue' }, !matchesNothing);
+  const { aggregates: byOutlet } = useAggregates(
+    { ...query, groupBy: ['outlet', 'manager'], metrics: ['total_revenue'], sort: '-total_revenue' }, !matchesNothing);
+  const { aggregates: topOutlets } = useAggregates({
+    ...query,
+    groupBy: ['file', 'outlet', 'manager'],
+    metrics: ['total_revenue', 'cogs', 'outlet_expenses', 'ebidta', 'pbt'],
+    sort: '-total_revenue',
+    pageSize: 10,
+  }, !matchesNothing);
+
+  // Comparison data processing - focused on overview metrics, one entry per file
   const comparisonData = useMemo(() => {
-    console.log('Processing comparison data - filteredDataByFile keys:', Object.keys(filteredDataByFile));
-    console.log('Current filters:', filters);
-    if (Object.keys(filteredDataByFile).length === 0) {
-      console.log('No filtered data available, returning null');
+    const groups = byFile?.groups || [];
+    if (matchesNothing || groups.length === 0) {
       return null;
     }
 
-    const processedSheets = Object.keys(filteredDataByFile).map(filename => {
-      const sheetData = filteredDataByFile[filename] || [];
-      console.log(`Processing sheet ${filename} with ${sheetData.length} records`);
-      
-      // Check if this is outlet-based data
-      const hasOutletData = sheetData.some(item => item['Outlet']);
-      console.log(`Sheet ${filename} has outlet data:`, hasOutletData);
-      
-      let directIncome, totalRevenue, cogs, outletExpenses, ebitda, pbt, wastage;
-      
-      if (hasOutletData) {
-        // For outlet data, sum the financial metrics directly from columns
-        directIncome = sheetData.reduce((sum, item) => sum + (parseFloat(item['Direct Income']) || 0), 0);
-        totalRevenue = sheetData.reduce((sum, item) => sum + (parseFloat(item['TOTAL REVENUE']) || 0), 0);
-        cogs = sheetData.reduce((sum, item) => sum + (parseFloat(item['COGS']) || 0), 0);
-        outletExpenses = sheetData.reduce((sum, item) => sum + (parseFloat(item['Outlet Expenses']) || 0), 0);
-        ebitda = sheetData.reduce((sum, item) => sum + (parseFloat(item['EBIDTA']) || 0), 0);
-        pbt = sheetData.reduce((sum, item) => sum + (parseFloat(item['PBT']) || 0), 0);
-        wastage = sheetData.reduce((sum, item) => sum + (parseFloat(item['WASTAGE']) || 0), 0);
-      } else {
-        // For transaction data, use the original logic
-        directIncome = sheetData
-          .filter(item => {
-            const productName = (item['Product Name'] || '').toLowerCase();
-            return productName.includes('direct income') || productName.includes('direct');
-          })
-          .reduce((sum, item) => sum + (parseFloat(item['Total Amount (₹)']) || 0), 0);
-
-        totalRevenue = sheetData
-          .filter(item => {
-            const productName = (item['Product Name'] || '').toLowerCase();
-            return productName.includes('total revenue') || productName.includes('revenue');
-          })
-          .reduce((sum, item) => sum + (parseFloat(item['Total Amount (₹)']) || 0), 0);
-
-        cogs = sheetData
-          .filter(item => {
-            const productName = (item['Product Name'] || '').toLowerCase();
-            return productName.includes('cogs') || productName.includes('cost of goods');
-          })
-          .reduce((sum, item) => sum + (parseFloat(item['Total Amount (₹)']) || 0), 0);
-
-        outletExpenses = sheetData
-          .filter(item => {
-            const productName = (item['Product Name'] || '').toLowerCase();
-            return productName.includes('outlet expenses') || productName.includes('expenses');
-          })
-          .reduce((sum, item) => sum + (parseFloat(item['Total Amount (₹)']) || 0), 0);
-
-        ebitda = sheetData
-          .filter(item => {
-            const productName = (item['Product Name'] || '').toLowerCase();
-            return productName.includes('ebitda') || productName.includes('ebidta');
-          })
-          .reduce((sum, item) => sum + (parseFloat(item['Total Amount (₹)']) || 0), 0);
-
-        pbt = sheetData
-          .filter(item => {
-            const productName = (item['Product Name'] || '').toLowerCase();
-            return productName.includes('pbt') || productName.includes('profit before tax');
-          })
-          .reduce((sum, item) => sum + (parseFloat(item['Total Amount (₹)']) || 0), 0);
-
-        wastage = sheetData
-          .filter(item => {
-            const productName = (item['Product Name'] || '').toLowerCase();
-            return productName.includes('wastage') || productName.includes('waste');
-          })
-          .reduce((sum, item) => sum + (parseFloat(item['Total Amount (₹)']) || 0), 0);
+    // Groups come sorted by revenue, so a file's first one is its top manager
+    const topManagers: Record<string, string> = {};
+    (byFileManager?.groups || []).forEach(group => {
+      if (!(group.file! in topManagers)) {
+        topManagers[group.file!] = group.manager || 'Unknown';
       }
+    });
 
-
-      // Cluster Manager analysis for overview
-      let clusterData, activeClusterManagers, topClusterManager;
-      
-      if (hasOutletData) {
-        // For outlet data, use outlet managers
-        clusterData = sheetData.reduce((acc, item) => {
-          const cluster = item['Outlet Manager'] || item['Cluster Manager'] || item['Cashier'] || 'Unknown';
-          const amount = parseFloat(item['TOTAL REVENUE']) || 0;
-          
-          if (!acc[cluster]) {
-            acc[cluster] = { revenue: 0, transactions: 0 };
-          }
-          acc[cluster].revenue += amount;
-          acc[cluster].transactions += 1;
-          return acc;
-        }, {} as Record<string, { revenue: number; transactions: number }>);
-      } else {
-        // For transaction data, use cluster managers
-        clusterData = sheetData.reduce((acc, item) => {
-          const cluster = item['Cluster Manager'] || item['Cashier'] || item['Cashier Name'] || 'Unknown';
-          const amount = parseFloat(item['Total Amount (₹)']) || 0;
-          
-          if (!acc[cluster]) {
-            acc[cluster] = { revenue: 0, transactions: 0 };
-          }
-          acc[cluster].revenue += amount;
-          acc[cluster].transactions += 1;
-          return acc;
-        }, {} as Record<string, { revenue: number; transactions: number }>);
-      }
-
-      activeClusterManagers = Object.keys(clusterData).length;
-      topClusterManager = Object.entries(clusterData).reduce(
-        (max, [cluster, stats]) => (stats as any).revenue > max.revenue ? { cluster, revenue: (stats as any).revenue } : max,
-        { cluster: 'N/A', revenue: 0 }
-      ).cluster;
-
-      // Calculate average outlet income
-      const uniqueOutlets = [...new Set(sheetData.map(item => 
-        item['Outlet'] || item['Outlet Name'] || item['Branch'] || item['Store Name']
-      ).filter(Boolean))];
-      
-      const averageOutletIncome = uniqueOutlets.length > 0 ? totalRevenue / uniqueOutlets.length : 0;
-
+    return groups.map(group => {
+      const sum = group.sum;
+      const totalRevenue = sum.total_revenue || 0;
+      const outletCount = group.distinct?.outlet || 0;
       return {
-        filename,
-        directIncome,
+        filename: fileLabel(group.file!),
+        directIncome: sum.direct_income || 0,
         totalRevenue,
-        cogs,
-        outletExpenses,
-        ebitda,
-        pbt,
-        wastage,
-        activeClusterManagers,
-        topClusterManager,
-        averageOutletIncome,
-        outletCount: uniqueOutlets.length
+        cogs: sum.cogs || 0,
+        outletExpenses: sum.outlet_expenses || 0,
+        ebitda: sum.ebidta || 0,
+        pbt: sum.pbt || 0,
+        wastage: sum.wastage || 0,
+        activeClusterManagers: group.distinct?.manager || 0,
+        topClusterManager: topManagers[group.file!] || 'N/A',
+        averageOutletIncome: outletCount > 0 ? totalRevenue / outletCount : 0,
+        outletCount
       };
     });
+  }, [byFile, byFileManager, matchesNothing]);
 
-    // Sort the processed sheets by filename for consistent ordering
-    const sortedSheets = processedSheets.sort((a, b) => a.filename.localeCompare(b.filename));
-    console.log('SimpleChartsSection - Sorted comparison data:', sortedSheets.map(s => s.filename));
-    return sortedSheets;
-  }, [filteredDataByFile]);
-
-  // Top/Bottom performers data
+  // Top/Bottom performers data, sorted by revenue
   const performersData = useMemo(() => {
-    if (!filteredDataByFile || Object.keys(filteredDataByFile).length === 0) {
+    if (matchesNothing) {
       return { clusterManagers: [], outlets: [] };
     }
 
-    // Collect all data for analysis
-    const allData = Object.values(filteredDataByFile).flat();
-    const hasOutletData = allData.some(item => item['Outlet']);
-
-    // Cluster Manager Performance Analysis
-    const clusterManagerData: Record<string, { revenue: number; transactions: number; outletCount: number }> = {};
-    
-    allData.forEach(item => {
-      const manager = item['Outlet Manager'] || item['Cluster Manager'] || item['Cashier'] || item['Cashier Name'] || 'Unknown';
-      const outlet = item['Outlet'] || item['Outlet Name'] || item['Branch'] || item['Store Name'] || 'Unknown';
-      const amount = hasOutletData ? 
-        (parseFloat(item['TOTAL REVENUE']) || 0) : 
-        (parseFloat(item['Total Amount (₹)']) || 0);
-      
-      if (!clusterManagerData[manager]) {
-        clusterManagerData[manager] = { revenue: 0, transactions: 0, outletCount: 0 };
-      }
-      
-      clusterManagerData[manager].revenue += amount;
-      clusterManagerData[manager].transactions += 1;
-      
-      // Count unique outlets per manager
-      if (!clusterManagerData[manager].outletCount) {
-        clusterManagerData[manager].outletCount = 0;
-      }
-    });
-
-    // Count unique outlets per manager
-    const managerOutlets: Record<string, Set<string>> = {};
-    allData.forEach(item => {
-      const manager = item['Outlet Manager'] || item['Cluster Manager'] || item['Cashier'] || item['Cashier Name'] || 'Unknown';
-      const outlet = item['Outlet'] || item['Outlet Name'] || item['Branch'] || item['Store Name'] || 'Unknown';
-      
-      if (!managerOutlets[manager]) {
-        managerOutlets[manager] = new Set();
-      }
-      managerOutlets[manager].add(outlet);
-    });
+    const clusterManagers = (byManager?.groups || []).map(group => ({
+      name: group.manager || 'Unknown',
+      revenue: group.sum.total_revenue || 0,
+      transactions: group.row_count,
+      outletCount: group.distinct?.outlet || 0
+    }));
 
-    // Update outlet counts
-    Object.keys(clusterManagerData).forEach(manager => {
-      clusterManagerData[manager].outletCount = managerOutlets[manager]?.size || 0;
-    });
-
-    // Sort cluster managers by revenue
-    const sortedManagers = Object.entries(clusterManagerData)
-      .map(([name, data]) => ({ name, ...data }))
-      .sort((a, b) => b.revenue - a.revenue);
-
-    // Outlet Performance Analysis
-    const outletData: Record<string, { revenue: number; transactions: number; manager: string }> = {};
-    
-    allData.forEach(item => {
-      const outlet = item['Outlet'] || item['Outlet Name'] || item['Branch'] || item['Store Name'] || 'Unknown';
-      const manager = item['Outlet Manager'] || item['Cluster Manager'] || item['Cashier'] || item['Cashier Name'] || 'Unknown';
-      const amount = hasOutletData ? 
-        (parseFloat(item['TOTAL REVENUE']) || 0) : 
-        (parseFloat(item['Total Amount (₹)']) || 0);
-      
-      if (!outletData[outlet]) {
-        outletData[outlet] = { revenue: 0, transactions: 0, manager: manager };
-      }
-      
-      outletData[outlet].revenue += amount;
-      outletData[outlet].transactions += 1;
-    });
-
-    // Sort outlets by revenue
-    const sortedOutlets = Object.entries(outletData)
-      .map(([name, data]) => ({ name, ...data }))
-      .sort((a, b) => b.revenue - a.revenue);
+    const outlets = (byOutlet?.groups || []).map(group => ({
+      name: group.outlet || 'Unknown',
+      revenue: group.sum.total_revenue || 0,
+      transactions: group.row_count,
+      manager: group.manager || 'Unknown'
+    }));
 
     return {
-      clusterManagers: sortedManagers,
-      outlets: sortedOutlets
+      clusterManagers,
+      outlets
     };
-  }, [filteredDataByFile]);
+  }, [byManager, byOutlet, matchesNothing]);
 
   // Revenue funnel data for funnel chart
   const funnelData = useMemo(() => {
     if (!comparisonData || comparisonData.length === 0) {
-      console.log('SimpleChartsSection: No comparison data available for funnel chart');
-      // Return sample data for testing if no real data is available
+      // Empty stages while there is no data
       return [
         { name: 'Total Revenue', value: 0, fill: '#10b981', percentage: 100 },
         { name: 'After COGS', value: 0, fill: '#f59e0b', percentage: 0 },
@@ -484,7 +222,7 @@ export const SimpleChartsSection: React.FC<SimpleChartsSectionProps> = memo(({ d
     const ebitda = Math.max(0, totalData.ebitda);
     const pbt = Math.max(0, totalData.pbt);
 
-    const result = [
+    return [
       { 
         name: 'Total Revenue', 
         value: totalRevenue, 
@@ -521,156 +259,78 @@ export const SimpleChartsSection: React.FC<SimpleChartsSectionProps> = memo(({ d
         width: totalRevenue > 0 ? (pbt / totalRevenue) * 100 : 0
       }
     ];
-
-    console.log('SimpleChartsSection: Funnel data:', result);
-    console.log('SimpleChartsSection: Total data:', totalData);
-    return result;
   }, [comparisonData]);
 
   // Cost Structure data - grouped by file
   const monthlyCostStructureData = useMemo(() => {
-    if (!filteredDataByFile || Object.keys(filteredDataByFile).length === 0) return [];
-    
-    console.log('Calculating cost structure data by file');
-    
-    // Calculate cost structure for each file
-    const fileCosts = Object.entries(filteredDataByFile).map(([filename, fileData]) => {
-      const hasOutletData = fileData.some(item => item['Outlet']);
-      
-      let cogs = 0, outletExpenses = 0, wastage = 0, pbt = 0;
-      
-      if (hasOutletData) {
-        // For outlet data, sum the financial metrics directly from columns
-        cogs = fileData.reduce((sum, item) => sum + (parseFloat(item['COGS']) || 0), 0);
-        outletExpenses = fileData.reduce((sum, item) => sum + (parseFloat(item['Outlet Expenses']) || 0), 0);
-        wastage = fileData.reduce((sum, item) => sum + (parseFloat(item['WASTAGE']) || 0), 0);
-        pbt = fileData.reduce((sum, item) => sum + (parseFloat(item['PBT']) || 0), 0);
-      } else {
-        // For transaction data, use the original logic
-        cogs = fileData
-          .filter(item => {
-            const productName = (item['Product Name'] || '').toLowerCase();
-            return productName.includes('cogs') || productName.includes('cost of goods');
-          })
-          .reduce((sum, item) => sum + (parseFloat(item['Total Amount (₹)']) || 0), 0);
-
-        outletExpenses = fileData
-          .filter(item => {
-            const productName = (item['Product Name'] || '').toLowerCase();
-            return productName.includes('outlet expenses') || productName.includes('expenses');
-          })
-          .reduce((sum, item) => sum + (parseFloat(item['Total Amount (₹)']) || 0), 0);
-
-        pbt = fileData
-          .filter(item => {
-            const productName = (item['Product Name'] || '').toLowerCase();
-            return productName.includes('pbt') || productName.includes('profit before tax');
-          })
-          .reduce((sum, item) => sum + (parseFloat(item['Total Amount (₹)']) || 0), 0);
-
-        wastage = fileData
-          .filter(item => {
-            const productName = (item['Product Name'] || '').toLowerCase();
-            return productName.includes('wastage') || productName.includes('waste');
-          })
-          .reduce((sum, item) => sum + (parseFloat(item['Total Amount (₹)']) || 0), 0);
-      }
-      
-      return {
-        filename,
-        data: [
-          { 
-            name: 'COGS', 
-            value: cogs,
-            fill: 'hsl(25, 95%, 53%)'  // Orange
-          },
-          { 
-            name: 'Outlet Expenses', 
-            value: outletExpenses,
-            fill: 'hsl(220, 70%, 30%)'  // Navy Blue
-          },
-          { 
-            name: 'Wastage', 
-            value: wastage,
-            fill: 'hsl(0, 84%, 60%)'    // Red
-          },
-          { 
-            name: 'Net Profit', 
-            value: pbt,
-            fill: 'hsl(142, 76%, 36%)'  // Green
-          }
-        ],
-        totals: { cogs, outletExpenses, wastage, pbt }
-      };
-    }).sort((a, b) => a.filename.localeCompare(b.filename));
-    
-    console.log('File cost structure data:', fileCosts);
-    return fileCosts;
-  }, [filteredDataByFile]);
+    if (!comparisonData) return [];
+
+    return comparisonData.map(({ filename, cogs, outletExpenses, wastage, pbt }) => ({
+      filename,
+      data: [
+        { 
+          name: 'COGS', 
+          value: cogs,
+          fill: 'hsl(25, 95%, 53%)'  // Orange
+        },
+        { 
+          name: 'Outlet Expenses', 
+          value: outletExpenses,
+          fill: 'hsl(220, 70%, 30%)'  // Navy Blue
+        },
+        { 
+          name: 'Wastage', 
+          value: wastage,
+          fill: 'hsl(0, 84%, 60%)'    // Red
+        },
+        { 
+          name: 'Net Profit', 
+          value: pbt,
+          fill: 'hsl(142, 76%, 36%)'  // Green
+        }
+      ],
+      totals: { cogs, outletExpenses, wastage, pbt }
+    }));
+  }, [comparisonData]);
 
-  // Line chart data for outlet performance trends
+  // Line chart data: the top 10 outlets of any file by revenue
   const lineChartData = useMemo(() => {
-    if (!comparisonData || comparisonData.length === 0) {
-      console.log('SimpleChartsSection: No comparison data available for line chart');
-      return [];
-    }
+    if (matchesNothing) return [];
 
-    // Create performance metrics for each outlet
-    const outletPerformance = [];
-    
-    comparisonData.forEach(sheet => {
-      const sheetData = filteredDataByFile[sheet.filename] || [];
-      const hasOutletData = sheetData.some(item => item['Outlet']);
-      
-      console.log('SimpleChartsSection: Processing sheet:', sheet.filename, 'hasOutletData:', hasOutletData);
-      
-      if (hasOutletData) {
-        // Group by outlet and calculate metrics
-        const outletMetrics = sheetData.reduce((acc, item) => {
-          const outlet = item['Outlet'];
-          if (!acc[outlet]) {
-            acc[outlet] = {
-              outlet: outlet,
-              manager: item['Outlet Manager'],
-              revenue: 0,
-              cogs: 0,
-              expenses: 0,
-              ebitda: 0,
-              pbt: 0
-            };
-          }
-          acc[outlet].revenue += parseFloat(item['TOTAL REVENUE']) || 0;
-          acc[outlet].cogs += parseFloat(item['COGS']) || 0;
-          acc[outlet].expenses += parseFloat(item['Outlet Expenses']) || 0;
-          acc[outlet].ebitda += parseFloat(item['EBIDTA']) || 0;
-          acc[outlet].pbt += parseFloat(item['PBT']) || 0;
-          return acc;
-        }, {});
-
-        // Convert to array and sort by revenue
-        outletPerformance.push(...Object.values(outletMetrics));
-      }
-    });
-
-    // Sort by revenue and take top 10 outlets
-    const result = outletPerformance
-      .sort((a, b) => b.revenue - a.revenue)
-      .slice(0, 10)
-      .map((outlet, index) => ({
-        outlet: outlet.outlet,
-        manager: outlet.manager,
-        revenue: outlet.revenue,
-        cogs: outlet.cogs,
-        expenses: outlet.expenses,
-        ebitda: outlet.ebitda,
-        pbt: outlet.pbt,
-        margin: outlet.revenue > 0 ? ((outlet.revenue - outlet.cogs) / outlet.revenue * 100) : 0,
+    return (topOutlets?.groups || []).map((group, index) => {
+      const revenue = group.sum.total_revenue || 0;
+      const cogs = group.sum.cogs || 0;
+      return {
+        outlet: group.outlet,
+        manager: group.manager,
+        revenue,
+        cogs,
+        expenses: group.sum.outlet_expenses || 0,
+        ebitda: group.sum.ebidta || 0,
+        pbt: group.sum.pbt || 0,
+        margin: revenue > 0 ? ((revenue - cogs) / revenue * 100) : 0,
         rank: index + 1
-      }));
+      };
+    });
+  }, [topOutlets, matchesNothing]);
 
-    console.log('SimpleChartsSection: Line chart data:', result);
-    return result;
-  }, [comparisonData, dataByFile]);
+  if (!sheetsLoading && availableSheets.length === 0) {
+    return (
+      <div className={`space-y-8 ${className}`}>
+        <Card className="card-elevated p-12 text-center">
+          <div className="space-y-4">
+            <div className="p-4 bg-gradient-primary rounded-2xl inline-block">
+              <BarChart3 className="h-12 w-12 text-white" />
+            </div>
+            <h3 className="text-xl font-semibold text-foreground font-display">Analytics Awaiting Data</h3>
+            <p className="text-muted-foreground text-lg max-w-md mx-auto">
+              Upload your sales data to unlock powerful visualizations and business insights
+            </p>
+          </div>
+        </Card>
+      </div>
+    );
+  }
 
 
 
@@ -765,7 +425,7 @@ export const SimpleChartsSection: React.FC<SimpleChartsSectionProps> = memo(({ d
               <SelectContent>
                 <SelectItem value="all">All Files</SelectItem>
                 {filterOptions.files.map(file => (
-                  <SelectItem key={file} value={file}>{file.split('.')[0]}</SelectItem>
+                  <SelectItem key={file} value={file}>{fileLabel(file)}</SelectItem>
                 ))}
               </SelectContent>
             </Select>
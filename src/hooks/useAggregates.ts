@@ -0,0 +1,116 @@
+import { useMemo } from 'react';
+import { useQuery } from '@tanstack/react-query';
+
+// Use empty string in production (same origin), localhost in dev
+const BACKEND_URL = import.meta.env.DEV ? 'http://localhost:5000' : '';
+
+// Largest page the backend returns (AGGREGATE_MAX_PAGE_SIZE)
+export const AGGREGATE_MAX_PAGE_SIZE = 500;
+
+export type AggregateDimension = 'outlet' | 'manager' | 'cluster' | 'month' | 'period' | 'file';
+
+export type AggregateValues = Record<string, number | null>;
+
+export interface AggregateGroup {
+    outlet?: string;
+    manager?: string;
+    cluster?: string;
+    month?: string;
+    period?: string;
+    file?: string;
+    row_count: number;
+    sum: AggregateValues;
+    avg: AggregateValues;
+    ratios: AggregateValues;
+    distinct?: Record<AggregateDimension, number>;
+}
+
+export interface AggregateResponse {
+    group_by: AggregateDimension[];
+    metrics: string[];
+    totals: AggregateGroup & { distinct: Record<AggregateDimension, number> };
+    groups: AggregateGroup[];
+    page: number;
+    page_size: number;
+    total_groups: number;
+    pages: number;
+}
+
+export interface AggregateQuery {
+    groupBy?: AggregateDimension[];
+    metrics?: string[];
+    // One value, or a list of accepted values
+    filters?: Partial<Record<AggregateDimension, string | string[]>>;
+    fileId?: string;
+    monthFrom?: string;
+    monthTo?: string;
+    sort?: string;
+    page?: number;
+    pageSize?: number;
+}
+
+const toParams = (query: AggregateQuery) => {
+    const params = new URLSearchParams();
+    if (query.groupBy?.length) params.set('group_by', query.groupBy.join(','));
+    if (query.metrics?.length) params.set('metrics', query.metrics.join(','));
+    Object.entries(query.filters || {}).forEach(([dimension, value]) => {
+        (Array.isArray(value) ? value : [value]).forEach(v => {
+            if (v) params.append(dimension, v);
+        });
+    });
+    if (query.fileId) params.set('file_id', query.fileId);
+    if (query.monthFrom) params.set('month_from', query.monthFrom);
+    if (query.monthTo) params.set('month_to', query.monthTo);
+    if (query.sort) params.set('sort', query.sort);
+    if (query.page) params.set('page', String(query.page));
+    if (query.pageSize) params.set('page_size', String(query.pageSize));
+    return params.toString();
+};
+
+// Totals and grouped aggregates computed by the backend over the full outlet history
+export const useAggregates = (query: AggregateQuery = {}, enabled = true) => {
+    const params = toParams(query);
+
+    const { data: aggregates, isLoading, error } = useQuery({
+        queryKey: ['aggregates', params],
+        queryFn: async () => {
+            const response = await fetch(`${BACKEND_URL}/aggregates?${params}`);
+            const result = await response.json();
+
+            if (!response.ok || !result.success) {
+                throw new Error(result.error || `Aggregation failed: ${response.statusText}`);
+            }
+
+            return result as AggregateResponse;
+        },
+        enabled,
+    });
+
+    return {
+        aggregates,
+        isLoading,
+        error,
+    };
+};
+
+// The values of one dimension present in the stored rows (under the query's
+// filters), in the backend's order for that dimension; filter dropdowns use it
+export const useDimensionValues = (dimension: AggregateDimension, query: AggregateQuery = {}, enabled = true) => {
+    const { aggregates, isLoading, error } = useAggregates({
+        ...query,
+        groupBy: [dimension],
+        metrics: ['total_revenue'],
+        sort: dimension,
+        pageSize: AGGREGATE_MAX_PAGE_SIZE,
+    }, enabled);
+
+    const values = useMemo(() => (aggregates?.groups || [])
+        .map(group => group[dimension])
+        .filter((value): value is string => !!value), [aggregates, dimension]);
+
+    return {
+        values,
+        isLoading,
+        error,
+    };
+};
@@ -66,6 +66,8 @@ export const useFileUpload = () => {
             // Invalidate queries to refetch data
             queryClient.invalidateQueries({ queryKey: ['outlets'] });
             queryClient.invalidateQueries({ queryKey: ['uploaded_files'] });
+            queryClient.invalidateQueries({ queryKey: ['aggregates'] });
+            queryClient.invalidateQueries({ queryKey: ['rollups'] });
 
             toast({
                 title: 'File uploaded successfully!',
@@ -2,7 +2,18 @@ import { useQuery, useQueryClient } from '@tanstack/react-query';
 import { supabase } from '@/integrations/supabase';
 import type { OutletRecord } from '@/integrations/supabase';
 
-export const useOutlets = () => {
+// Only the columns the dashboard tabs read; one string literal, so the typed
+// client infers the row type from it
+export const OUTLET_COLUMNS = 'file_id, outlet, outlet_manager, month, direct_income, total_revenue, cogs, outlet_expenses, ebidta, finance_cost, bank_charges, interest_on_borrowings, interest_on_vehicle_loan, mg, pbt, wastage';
+
+export type OutletRow = Pick<OutletRecord,
+    'file_id' | 'outlet' | 'outlet_manager' | 'month' | 'direct_income' | 'total_revenue' |
+    'cogs' | 'outlet_expenses' | 'ebidta' | 'finance_cost' | 'bank_charges' | 'interest_on_borrowings' |
+    'interest_on_vehicle_loan' | 'mg' | 'pbt' | 'wastage'>;
+
+// Every stored row; only for views that list them (the dashboard and charts use
+// useAggregates), so callers pass enabled=false until such a view is open
+export const useOutlets = (enabled = true) => {
     const queryClient = useQueryClient();
 
     const { data: outlets = [], isLoading, error, refetch } = useQuery({
@@ -10,7 +21,7 @@ export const useOutlets = () => {
         queryFn: async () => {
             const { data, error } = await supabase
                 .from('outlets')
-                .select('*')
+                .select(OUTLET_COLUMNS)
                 .order('created_at', { ascending: false });
 
             if (error) {
@@ -18,8 +29,9 @@ export const useOutlets = () => {
                 throw error;
             }
 
-            return data as OutletRecord[];
+            return data as OutletRow[];
         },
+        enabled,
     });
 
     const invalidateOutlets = () => {
@@ -35,30 +47,34 @@ export const useOutlets = () => {
     };
 };
 
-export const useOutletsByFile = (fileId?: string) => {
-    const { data: outlets = [], isLoading, error } = useQuery({
-        queryKey: ['outlets', fileId],
+// One page (1-based) of a file's rows, with the file's total row count
+export const useOutletsByFile = (fileId?: string, page = 1, pageSize = 100) => {
+    const { data, isLoading, error } = useQuery({
+        queryKey: ['outlets', fileId, page, pageSize],
         queryFn: async () => {
-            if (!fileId) return [];
-
-            const { data, error } = await supabase
+            const from = (page - 1) * pageSize;
+            const { data, error, count } = await supabase
                 .from('outlets')
-                .select('*')
+                .select(OUTLET_COLUMNS, { count: 'exact' })
                 .eq('file_id', fileId)
-                .order('created_at', { ascending: false });
+                .order('created_at', { ascending: false })
+                .order('id')
+                .range(from, from + pageSize - 1);
 
             if (error) {
                 console.error('Error fetching outlets by file:', error);
                 throw error;
             }
 
-            return data as OutletRecord[];
+            return { outlets: data as OutletRow[], total: count ?? 0 };
         },
         enabled: !!fileId,
     });
 
     return {
-        outlets,
+        outlets: data?.outlets ?? [],
+        total: data?.total ?? 0,
+        pages: Math.ceil((data?.total ?? 0) / pageSize),
         isLoading,
         error,
     };
@@ -0,0 +1,96 @@
+import { useMemo } from 'react';
+import { useQuery } from '@tanstack/react-query';
+import { AGGREGATE_MAX_PAGE_SIZE, useAggregates, type AggregateGroup, type AggregateQuery } from '@/hooks/useAggregates';
+
+// Use empty string in production (same origin), localhost in dev
+const BACKEND_URL = import.meta.env.DEV ? 'http://localhost:5000' : '';
+
+export type RollupDimension = 'period' | 'cluster';
+
+export interface RollupResponse {
+    group_by: RollupDimension[];
+    metrics: string[];
+    groups: (AggregateGroup & { outlet_count?: number })[];
+    // Periods whose rollups lag the outlet rows; use /aggregates while any are listed
+    stale: boolean;
+    stale_periods: string[];
+}
+
+export interface RollupQuery {
+    groupBy?: RollupDimension[];
+    metrics?: string[];
+    cluster?: string;
+    monthFrom?: string;
+    monthTo?: string;
+}
+
+const toParams = (query: RollupQuery) => {
+    const params = new URLSearchParams();
+    if (query.groupBy?.length) params.set('group_by', query.groupBy.join(','));
+    if (query.metrics?.length) params.set('metrics', query.metrics.join(','));
+    if (query.cluster) params.set('cluster', query.cluster);
+    if (query.monthFrom) params.set('month_from', query.monthFrom);
+    if (query.monthTo) params.set('month_to', query.monthTo);
+    return params.toString();
+};
+
+// Per-period, per-cluster totals maintained on upload (outlet_period_rollups)
+export const useRollups = (query: RollupQuery = {}, enabled = true) => {
+    const params = toParams(query);
+
+    const { data: rollups, isLoading, error } = useQuery({
+        queryKey: ['rollups', params],
+        queryFn: async () => {
+            const response = await fetch(`${BACKEND_URL}/rollups?${params}`);
+            const result = await response.json();
+
+            if (!response.ok || !result.success) {
+                throw new Error(result.error || `Rollup query failed: ${response.statusText}`);
+            }
+
+            return result as RollupResponse;
+        },
+        enabled,
+    });
+
+    return {
+        rollups,
+        isLoading,
+        error,
+    };
+};
+
+// Totals per period or per cluster: read from the rollups, or regrouped from the
+// outlet rows by /aggregates when the rollups are stale or unavailable, or when
+// filters the rollups cannot apply (outlet, manager, month label) are set. The
+// rollups hold no rows without a period, so neither does the period fallback.
+export const useRollupTotals = (dimension: RollupDimension, query: AggregateQuery = {}) => {
+    const filtered = Object.values(query.filters || {}).some(value => value && value.length > 0);
+    const { rollups, isLoading: rollupsLoading, error: rollupsError } = useRollups({
+        groupBy: [dimension],
+        metrics: query.metrics,
+        monthFrom: query.monthFrom,
+        monthTo: query.monthTo,
+    }, !filtered);
+
+    const fromRollups = !filtered && !!rollups && !rollups.stale;
+    const needsAggregates = filtered || !!rollupsError || (!!rollups && rollups.stale);
+    const { aggregates, isLoading: aggregatesLoading, error } = useAggregates({
+        ...query,
+        groupBy: [dimension],
+        sort: dimension,
+        pageSize: AGGREGATE_MAX_PAGE_SIZE,
+    }, needsAggregates);
+
+    const groups = useMemo(() => fromRollups
+        ? rollups.groups
+        : (aggregates?.groups || []).filter(group => dimension !== 'period' || !!group.period),
+        [fromRollups, rollups, aggregates, dimension]);
+
+    return {
+        groups,
+        source: fromRollups ? 'rollups' as const : 'aggregates' as const,
+        isLoading: rollupsLoading || aggregatesLoading,
+        error: needsAggregates ? error : rollupsError,
+    };
+};
@@ -3,14 +3,33 @@ export interface Database {
         Tables: {
             outlets: {
                 Row: OutletRecord;
-                Insert: Omit<OutletRecord, 'id' | 'created_at' | 'updated_at'>;
-                Update: Partial<Omit<OutletRecord, 'id' | 'created_at' | 'updated_at'>>;
+                Insert: Omit<OutletRecord, 'id' | 'created_at' | 'updated_at' | 'period_key'>;
+                Update: Partial<Omit<OutletRecord, 'id' | 'created_at' | 'updated_at' | 'period_key'>>;
             };
             uploaded_files: {
                 Row: UploadedFileRecord;
                 Insert: Omit<UploadedFileRecord, 'id' | 'uploaded_at'>;
                 Update: Partial<Omit<UploadedFileRecord, 'id' | 'uploaded_at'>>;
             };
+            outlet_period_rollups: {
+                Row: OutletPeriodRollupRecord;
+                Insert: never;
+                Update: never;
+            };
+        };
+        Functions: {
+            refresh_outlet_rollups: {
+                Args: { periods: string[] };
+                Returns: number;
+            };
+            stale_rollup_periods: {
+                Args: Record<string, never>;
+                Returns: { period: string }[];
+            };
+            outlet_grain: {
+                Args: { file_id?: string | null };
+                Returns: OutletGrainRecord[];
+            };
         };
     };
 }
@@ -23,6 +42,29 @@ export interface OutletRecord {
     outlet: string;
     outlet_manager: string | null;
     month: string | null;
+    period: string | null; // first day of the month, e.g. "2025-06-01"
+    period_key: string; // generated: period, else month (the upsert key with file_id, outlet)
+    direct_income: number | null;
+    total_revenue: number | null;
+    cogs: number | null;
+    outlet_expenses: number | null;
+    ebidta: number | null;
+    finance_cost: number | null;
+    bank_charges: number | null;
+    interest_on_borrowings: number | null;
+    interest_on_vehicle_loan: number | null;
+    mg: number | null;
+    pbt: number | null;
+    wastage: number | null;
+}
+
+// Per-period, per-cluster totals over all uploads (maintained by refresh_outlet_rollups);
+// n_<metric> is the number of non-null values behind each sum
+export interface OutletPeriodRollupRecord {
+    period: string;
+    cluster: string;
+    outlet_count: number;
+    row_count: number;
     direct_income: number | null;
     total_revenue: number | null;
     cogs: number | null;
@@ -35,6 +77,28 @@ export interface OutletRecord {
     mg: number | null;
     pbt: number | null;
     wastage: number | null;
+    n_direct_income: number;
+    n_total_revenue: number;
+    n_cogs: number;
+    n_outlet_expenses: number;
+    n_ebidta: number;
+    n_finance_cost: number;
+    n_bank_charges: number;
+    n_interest_on_borrowings: number;
+    n_interest_on_vehicle_loan: number;
+    n_mg: number;
+    n_pbt: number;
+    n_wastage: number;
+    refreshed_at: string;
+}
+
+// Outlet rows summed per (file_id, outlet, outlet_manager, month, period) by
+// the outlet_grain function; missing labels are ''
+export interface OutletGrainRecord extends Omit<OutletPeriodRollupRecord, 'cluster' | 'outlet_count' | 'refreshed_at'> {
+    file_id: string;
+    outlet: string;
+    outlet_manager: string;
+    month: string;
 }
 
 export interface UploadedFileRecord {
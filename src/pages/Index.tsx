@@ -12,11 +12,16 @@ import { useFileUpload } from '@/hooks/useFileUpload';
 const Index = () => {
   const [activeTab, setActiveTab] = useState('overview');
   const { toast } = useToast();
-  const { outlets, isLoading } = useOutlets();
+  // The overview and analytics tabs read server-side aggregates; outlet rows are
+  // only fetched for the tabs that list or re-analyse them
+  const needsRows = activeTab === 'interest' || activeTab === 'table';
+  const needsFileGroups = activeTab === 'table';
+  const { outlets, isLoading } = useOutlets(needsRows);
   const { uploadFile, isUploading } = useFileUpload();
 
   // Transform Supabase data to match the expected format
   const salesData = useMemo(() => {
+    if (!needsRows) return [];
     return outlets.map(outlet => ({
       'Outlet': outlet.outlet,
       'Outlet Manager': outlet.outlet_manager,
@@ -44,11 +49,12 @@ const Index = () => {
       'Total Sales': outlet.total_revenue || 0,
       'Upload Filename': `File ID: ${outlet.file_id}`
     }));
-  }, [outlets]);
+  }, [outlets, needsRows]);
 
   // Group data by file_id for file-based filtering
   const dataByFile = useMemo(() => {
     const grouped: Record<string, any[]> = {};
+    if (!needsFileGroups) return grouped;
     outlets.forEach(outlet => {
       const fileKey = `File ID: ${outlet.file_id}`;
       if (!grouped[fileKey]) {
@@ -67,7 +73,7 @@ const Index = () => {
       });
     });
     return grouped;
-  }, [outlets]);
+  }, [outlets, needsFileGroups]);
 
   const handleFileUpload = async (data: any[], filename: string) => {
     // This callback is called by FileUpload component after backend processes the file
@@ -79,10 +85,9 @@ const Index = () => {
   const renderActiveTab = () => {
     switch (activeTab) {
       case 'overview':
-        return <Dashboard data={salesData} />;
+        return <Dashboard />;
       case 'analytics':
-        console.log('Index: Rendering analytics with data:', salesData.length, 'files:', Object.keys(dataByFile));
-        return <SimpleChartsSection data={salesData} dataByFile={dataByFile} />;
+        return <SimpleChartsSection />;
       case 'interest':
         return <InterestAnalysis data={salesData} />;
       case 'table':
@@ -90,7 +95,7 @@ const Index = () => {
       case 'admin':
         return <AdminConsole />;
       default:
-        return <Dashboard data={salesData} />;
+        return <Dashboard />;
     }
   };
 
@@ -1,20 +1,41 @@
--- Create the files table to track uploaded files
-CREATE TABLE IF NOT EXISTS public.files (
+-- Schema for the analytics backend. Safe to re-run: it creates what is missing
+-- and migrates databases created from the earlier revision of this file. Outlet
+-- rows that repeat a (file_id, outlet, period_key) key are deleted, keeping the
+-- most recently written one, before that key's unique index is built.
+
+-- Create the uploaded_files table to track uploaded files
+-- (the table the backend and frontend use; earlier revisions of this file
+-- defined it as "files", see the migration below)
+CREATE TABLE IF NOT EXISTS public.uploaded_files (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-    filename TEXT NOT NULL,
-    upload_date TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-    outlets_count INTEGER NOT NULL DEFAULT 0
+    file_name TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    file_size BIGINT,
+    uploaded_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    processed BOOLEAN NOT NULL DEFAULT false,
+    uploaded_by UUID REFERENCES auth.users(id) ON DELETE SET NULL,
+    metadata JSONB
 );
 
+-- Key of an outlet row within its file: the period ("2025-06-01"), or the month
+-- label when the label names no year. Mirrors outlet_period_keys() in
+-- backend_api.py; immutable, as the generated period_key column requires.
+CREATE OR REPLACE FUNCTION public.outlet_period_key(period DATE, month TEXT)
+RETURNS TEXT LANGUAGE sql IMMUTABLE AS $$
+    SELECT COALESCE(to_char(period, 'YYYY-MM-DD'), month)
+$$;
+
 -- Create the outlets table to store financial data
 CREATE TABLE IF NOT EXISTS public.outlets (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-    file_id UUID REFERENCES public.files(id) ON DELETE CASCADE,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    file_id UUID REFERENCES public.uploaded_files(id) ON DELETE CASCADE,
     outlet TEXT NOT NULL,
     outlet_manager TEXT,
     month TEXT NOT NULL,
+    period DATE,
+    period_key TEXT GENERATED ALWAYS AS (public.outlet_period_key(period, month)) STORED,
     direct_income NUMERIC,
     total_revenue NUMERIC,
     cogs NUMERIC,
@@ -29,38 +50,272 @@ CREATE TABLE IF NOT EXISTS public.outlets (
     wastage NUMERIC
 );
 
+-- Migrate from the earlier revision: outlets gain updated_at, period and
+-- period_key, file rows move from files to uploaded_files and the foreign key
+-- follows them.
+-- The old files table is left in place; drop it once the copy is verified.
+ALTER TABLE public.outlets ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW();
+ALTER TABLE public.outlets ADD COLUMN IF NOT EXISTS period DATE;
+ALTER TABLE public.outlets ADD COLUMN IF NOT EXISTS period_key TEXT
+    GENERATED ALWAYS AS (public.outlet_period_key(period, month)) STORED;
+
+DO $$
+BEGIN
+    IF to_regclass('public.files') IS NOT NULL THEN
+        INSERT INTO public.uploaded_files (id, file_name, file_path, uploaded_at, processed, metadata)
+        SELECT id, filename, 'uploads/' || filename, upload_date, true,
+               jsonb_build_object('outlets_count', outlets_count)
+        FROM public.files
+        ON CONFLICT (id) DO NOTHING;
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM pg_constraint
+        WHERE conname = 'outlets_file_id_fkey'
+          AND confrelid <> 'public.uploaded_files'::regclass
+    ) THEN
+        ALTER TABLE public.outlets DROP CONSTRAINT outlets_file_id_fkey;
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'outlets_file_id_fkey') THEN
+        ALTER TABLE public.outlets ADD CONSTRAINT outlets_file_id_fkey
+            FOREIGN KEY (file_id) REFERENCES public.uploaded_files(id) ON DELETE CASCADE;
+    END IF;
+END $$;
+
+-- Backfill period where the month label carries its year ("June-25", "Jun 2025");
+-- year-less labels ("June") get theirs when the file is uploaded again. Only
+-- labels that start with a month name are parsed: to_date() raises on others
+-- such as "Total-25", which would abort the whole script.
+UPDATE public.outlets
+SET period = to_date(initcap(substring(month from '^([A-Za-z]{3})')) || ' ' ||
+                     CASE WHEN length(substring(month from '(\d{2,4})$')) = 2
+                          THEN '20' || substring(month from '(\d{2})$')
+                          ELSE substring(month from '(\d{4})$') END,
+                     'Mon YYYY')
+WHERE period IS NULL
+  AND month ~ '^[A-Za-z]+\s*[-''’ ]\s*(\d{2}|\d{4})$'
+  AND month ~* '^(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)';
+
+-- Keep updated_at current on every update (including upserts)
+CREATE OR REPLACE FUNCTION public.set_updated_at()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END $$;
+
+DROP TRIGGER IF EXISTS outlets_set_updated_at ON public.outlets;
+CREATE TRIGGER outlets_set_updated_at
+    BEFORE UPDATE ON public.outlets
+    FOR EACH ROW EXECUTE FUNCTION public.set_updated_at();
+
 -- Create indexes for better query performance
 CREATE INDEX IF NOT EXISTS idx_outlets_file_id ON public.outlets(file_id);
 CREATE INDEX IF NOT EXISTS idx_outlets_outlet ON public.outlets(outlet);
 CREATE INDEX IF NOT EXISTS idx_outlets_month ON public.outlets(month);
-CREATE INDEX IF NOT EXISTS idx_files_filename ON public.files(filename);
+CREATE INDEX IF NOT EXISTS idx_uploaded_files_file_name ON public.uploaded_files(file_name);
+
+-- Trend queries: one outlet over time, and one upload's months
+CREATE INDEX IF NOT EXISTS idx_outlets_outlet_period ON public.outlets(outlet, period);
+CREATE INDEX IF NOT EXISTS idx_outlets_file_period ON public.outlets(file_id, period);
+
+-- Natural key of an outlet row: uploads upsert on (file_id, outlet, period_key)
+-- so a re-sent upload updates its rows instead of duplicating them, and one
+-- file can hold the same month name for different years. Rows written before
+-- the key existed may repeat it; only the latest of each is kept.
+DROP INDEX IF EXISTS public.idx_outlets_file_outlet_month;
+DELETE FROM public.outlets o
+USING (
+    SELECT id, row_number() OVER (
+        PARTITION BY file_id, outlet, period_key
+        ORDER BY updated_at DESC, created_at DESC, id DESC
+    ) AS position
+    FROM public.outlets
+    WHERE file_id IS NOT NULL
+) ranked
+WHERE o.id = ranked.id AND ranked.position > 1;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_outlets_file_outlet_period ON public.outlets(file_id, outlet, period_key);
+
+-- Per-period, per-cluster totals over all uploads, so dashboards read a few
+-- pre-aggregated rows instead of scanning outlets. Rebuilt for the periods an
+-- upload touches by refresh_outlet_rollups(); n_<metric> counts the non-null
+-- values behind each sum, so means stay exact.
+CREATE TABLE IF NOT EXISTS public.outlet_period_rollups (
+    period DATE NOT NULL,
+    cluster TEXT NOT NULL,
+    outlet_count INTEGER NOT NULL,
+    row_count INTEGER NOT NULL,
+    direct_income NUMERIC,
+    total_revenue NUMERIC,
+    cogs NUMERIC,
+    outlet_expenses NUMERIC,
+    ebidta NUMERIC,
+    finance_cost NUMERIC,
+    bank_charges NUMERIC,
+    interest_on_borrowings NUMERIC,
+    interest_on_vehicle_loan NUMERIC,
+    mg NUMERIC,
+    pbt NUMERIC,
+    wastage NUMERIC,
+    n_direct_income INTEGER NOT NULL DEFAULT 0,
+    n_total_revenue INTEGER NOT NULL DEFAULT 0,
+    n_cogs INTEGER NOT NULL DEFAULT 0,
+    n_outlet_expenses INTEGER NOT NULL DEFAULT 0,
+    n_ebidta INTEGER NOT NULL DEFAULT 0,
+    n_finance_cost INTEGER NOT NULL DEFAULT 0,
+    n_bank_charges INTEGER NOT NULL DEFAULT 0,
+    n_interest_on_borrowings INTEGER NOT NULL DEFAULT 0,
+    n_interest_on_vehicle_loan INTEGER NOT NULL DEFAULT 0,
+    n_mg INTEGER NOT NULL DEFAULT 0,
+    n_pbt INTEGER NOT NULL DEFAULT 0,
+    n_wastage INTEGER NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (period, cluster)
+);
+
+CREATE INDEX IF NOT EXISTS idx_outlet_period_rollups_cluster_period
+    ON public.outlet_period_rollups(cluster, period);
+
+-- Cluster of an outlet-manager label: its leading number ("6-Prasant Mishra"
+-- -> "6"), else the label itself. Mirrors cluster_labels() in backend_api.py.
+CREATE OR REPLACE FUNCTION public.outlet_cluster(manager TEXT)
+RETURNS TEXT LANGUAGE sql IMMUTABLE AS $$
+    SELECT COALESCE(substring(manager from '^\s*(\d+)\s*[-.)]'), COALESCE(manager, ''))
+$$;
+
+-- Rebuild the rollup rows of the given periods from outlets. Runs with the
+-- owner's rights so uploads with the public key can maintain the table.
+CREATE OR REPLACE FUNCTION public.refresh_outlet_rollups(periods DATE[])
+RETURNS INTEGER LANGUAGE plpgsql SECURITY DEFINER SET search_path = public AS $$
+DECLARE
+    refreshed INTEGER;
+BEGIN
+    DELETE FROM public.outlet_period_rollups WHERE period = ANY(periods);
+
+    INSERT INTO public.outlet_period_rollups (
+        period, cluster, outlet_count, row_count,
+        direct_income, total_revenue, cogs, outlet_expenses, ebidta, finance_cost,
+        bank_charges, interest_on_borrowings, interest_on_vehicle_loan, mg, pbt, wastage,
+        n_direct_income, n_total_revenue, n_cogs, n_outlet_expenses, n_ebidta, n_finance_cost,
+        n_bank_charges, n_interest_on_borrowings, n_interest_on_vehicle_loan, n_mg, n_pbt, n_wastage
+    )
+    SELECT period, public.outlet_cluster(outlet_manager), COUNT(DISTINCT outlet), COUNT(*),
+           SUM(direct_income), SUM(total_revenue), SUM(cogs), SUM(outlet_expenses), SUM(ebidta),
+           SUM(finance_cost), SUM(bank_charges), SUM(interest_on_borrowings),
+           SUM(interest_on_vehicle_loan), SUM(mg), SUM(pbt), SUM(wastage),
+           COUNT(direct_income), COUNT(total_revenue), COUNT(cogs), COUNT(outlet_expenses),
+           COUNT(ebidta), COUNT(finance_cost), COUNT(bank_charges), COUNT(interest_on_borrowings),
+           COUNT(interest_on_vehicle_loan), COUNT(mg), COUNT(pbt), COUNT(wastage)
+    FROM public.outlets
+    WHERE period = ANY(periods)
+    GROUP BY 1, 2;
+
+    GET DIAGNOSTICS refreshed = ROW_COUNT;
+    RETURN refreshed;
+END $$;
+
+-- Stored outlet rows summed per (file_id, outlet, outlet_manager, month,
+-- period), over all uploads or one file's: row_count, the metric sums and their
+-- non-null counts. The backend re-groups every /aggregates answer from these
+-- rows, so only they cross the wire. Mirrors SQLiteStorage.outlet_grain in
+-- backend_api.py. Dropped first so a changed column list can be re-created.
+DROP FUNCTION IF EXISTS public.outlet_grain(UUID);
+CREATE FUNCTION public.outlet_grain(file_id UUID DEFAULT NULL)
+RETURNS TABLE (
+    file_id TEXT, outlet TEXT, outlet_manager TEXT, month TEXT, period TEXT, row_count BIGINT,
+    direct_income NUMERIC, total_revenue NUMERIC, cogs NUMERIC, outlet_expenses NUMERIC,
+    ebidta NUMERIC, finance_cost NUMERIC, bank_charges NUMERIC, interest_on_borrowings NUMERIC,
+    interest_on_vehicle_loan NUMERIC, mg NUMERIC, pbt NUMERIC, wastage NUMERIC,
+    n_direct_income BIGINT, n_total_revenue BIGINT, n_cogs BIGINT, n_outlet_expenses BIGINT,
+    n_ebidta BIGINT, n_finance_cost BIGINT, n_bank_charges BIGINT, n_interest_on_borrowings BIGINT,
+    n_interest_on_vehicle_loan BIGINT, n_mg BIGINT, n_pbt BIGINT, n_wastage BIGINT
+) LANGUAGE sql STABLE AS $$
+    SELECT COALESCE(o.file_id::text, ''), COALESCE(o.outlet, ''), COALESCE(o.outlet_manager, ''),
+           COALESCE(o.month, ''),
+           COALESCE(to_char(o.period, 'YYYY-MM-DD'), ''), COUNT(*),
+           SUM(o.direct_income), SUM(o.total_revenue), SUM(o.cogs), SUM(o.outlet_expenses),
+           SUM(o.ebidta), SUM(o.finance_cost), SUM(o.bank_charges), SUM(o.interest_on_borrowings),
+           SUM(o.interest_on_vehicle_loan), SUM(o.mg), SUM(o.pbt), SUM(o.wastage),
+           COUNT(o.direct_income), COUNT(o.total_revenue), COUNT(o.cogs), COUNT(o.outlet_expenses),
+           COUNT(o.ebidta), COUNT(o.finance_cost), COUNT(o.bank_charges), COUNT(o.interest_on_borrowings),
+           COUNT(o.interest_on_vehicle_loan), COUNT(o.mg), COUNT(o.pbt), COUNT(o.wastage)
+    FROM public.outlets o
+    WHERE outlet_grain.file_id IS NULL OR o.file_id = outlet_grain.file_id
+    GROUP BY 1, 2, 3, 4, 5
+$$;
+
+-- Periods whose rollup rows no longer match outlets: rows were written or
+-- removed after the last refresh (outside the upload path, or by an upload whose
+-- refresh failed). Readers fall back to the outlet rows for these.
+CREATE OR REPLACE FUNCTION public.stale_rollup_periods()
+RETURNS TABLE (period DATE) LANGUAGE sql STABLE AS $$
+    SELECT counts.period FROM (
+        SELECT o.period, COUNT(*) AS row_count, MAX(o.updated_at) AS written, NULL::timestamptz AS refreshed
+        FROM public.outlets o WHERE o.period IS NOT NULL GROUP BY o.period
+        UNION ALL
+        SELECT r.period, -SUM(r.row_count), NULL, MIN(r.refreshed_at)
+        FROM public.outlet_period_rollups r GROUP BY r.period
+    ) counts
+    GROUP BY counts.period
+    HAVING SUM(counts.row_count) <> 0 OR MAX(counts.written) > MAX(counts.refreshed)
+    ORDER BY counts.period
+$$;
+
+-- Build rollups for everything already stored
+SELECT public.refresh_outlet_rollups(ARRAY(SELECT DISTINCT period FROM public.outlets WHERE period IS NOT NULL));
 
 -- Enable Row Level Security (RLS)
-ALTER TABLE public.files ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.uploaded_files ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.outlets ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.outlet_period_rollups ENABLE ROW LEVEL SECURITY;
 
 -- Create policies to allow public read/write access
 -- Note: In production, you should restrict these policies based on authentication
-CREATE POLICY "Allow public read access to files" 
-    ON public.files FOR SELECT 
+DROP POLICY IF EXISTS "Allow public read access to uploaded_files" ON public.uploaded_files;
+CREATE POLICY "Allow public read access to uploaded_files"
+    ON public.uploaded_files FOR SELECT
     USING (true);
 
-CREATE POLICY "Allow public insert access to files" 
-    ON public.files FOR INSERT 
+DROP POLICY IF EXISTS "Allow public insert access to uploaded_files" ON public.uploaded_files;
+CREATE POLICY "Allow public insert access to uploaded_files"
+    ON public.uploaded_files FOR INSERT
+    WITH CHECK (true);
+
+DROP POLICY IF EXISTS "Allow public update access to uploaded_files" ON public.uploaded_files;
+CREATE POLICY "Allow public update access to uploaded_files"
+    ON public.uploaded_files FOR UPDATE
+    USING (true)
     WITH CHECK (true);
 
-CREATE POLICY "Allow public delete access to files" 
-    ON public.files FOR DELETE 
+DROP POLICY IF EXISTS "Allow public delete access to uploaded_files" ON public.uploaded_files;
+CREATE POLICY "Allow public delete access to uploaded_files"
+    ON public.uploaded_files FOR DELETE
     USING (true);
 
-CREATE POLICY "Allow public read access to outlets" 
-    ON public.outlets FOR SELECT 
+DROP POLICY IF EXISTS "Allow public read access to outlets" ON public.outlets;
+CREATE POLICY "Allow public read access to outlets"
+    ON public.outlets FOR SELECT
     USING (true);
 
-CREATE POLICY "Allow public insert access to outlets" 
-    ON public.outlets FOR INSERT 
+DROP POLICY IF EXISTS "Allow public insert access to outlets" ON public.outlets;
+CREATE POLICY "Allow public insert access to outlets"
+    ON public.outlets FOR INSERT
     WITH CHECK (true);
 
-CREATE POLICY "Allow public delete access to outlets" 
-    ON public.outlets FOR DELETE 
+DROP POLICY IF EXISTS "Allow public update access to outlets" ON public.outlets;
+CREATE POLICY "Allow public update access to outlets"
+    ON public.outlets FOR UPDATE
+    USING (true)
+    WITH CHECK (true);
+
+DROP POLICY IF EXISTS "Allow public delete access to outlets" ON public.outlets;
+CREATE POLICY "Allow public delete access to outlets"
+    ON public.outlets FOR DELETE
+    USING (true);
+
+-- Rollups are read-only for clients; refresh_outlet_rollups() writes them
+DROP POLICY IF EXISTS "Allow public read access to outlet_period_rollups" ON public.outlet_period_rollups;
+CREATE POLICY "Allow public read access to outlet_period_rollups"
+    ON public.outlet_period_rollups FOR SELECT
     USING (true);
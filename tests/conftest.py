@@ -0,0 +1,42 @@
+"""
+Shared setup for the backend tests: backend_api is imported once with its
+caches and the SQLite store pointed at a throwaway directory and Supabase
+disabled, so the tests never touch the working tree or the network. Postgres
+is used only when TEST_DATABASE_URL names a database with supabase_schema.sql
+applied.
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRATCH = tempfile.mkdtemp(prefix="backend-tests-")
+
+os.environ["VITE_SUPABASE_URL"] = ""
+os.environ["VITE_SUPABASE_PUBLISHABLE_KEY"] = ""
+os.environ.pop("POSTGREST_URL", None)
+# The COPY path is only tested against a database set aside for it
+os.environ["DATABASE_URL"] = os.environ.get("TEST_DATABASE_URL", "")
+os.environ["STORAGE_BACKEND"] = "sqlite"
+os.environ["STORAGE_SQLITE_PATH"] = os.path.join(SCRATCH, "analytics.sqlite3")
+os.environ["PARSE_CACHE_DIR"] = os.path.join(SCRATCH, "parse_cache")
+sys.path.insert(0, ROOT)
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import backend_api
+
+
+@pytest.fixture(scope="session")
+def backend():
+    return backend_api
+
+
+@pytest.fixture
+def quiet():
+    """Silence the extractor's progress prints inside a test."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
@@ -0,0 +1,48 @@
+"""/aggregates (grouping by upload, multi-value filters, distinct counts) and /rollups staleness."""
+from test_upload_keys import record, upload
+
+
+def aggregates_of(backend, url):
+    response = backend.app.test_client().get(url)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def aggregates(backend, query):
+    return aggregates_of(backend, "/aggregates?" + query)
+
+
+def test_groups_by_file_with_distinct_counts(backend, quiet):
+    _, may = upload(backend, [record("Outlet A", month="May-25"), record("Outlet B", month="May-25", revenue=50.0),
+                              record("Outlet C", month="May-25", manager="2-Beta Manager")], filename="agg-may.xlsx")
+    _, june = upload(backend, [record("Outlet A", month="June-25", revenue=300.0)], filename="agg-june.xlsx")
+    files = f"file={may['file_id']}&file={june['file_id']}"
+
+    result = aggregates(backend, f"group_by=file&sort=-total_revenue&{files}")
+    assert [g["file"] for g in result["groups"]] == [june["file_id"], may["file_id"]]
+    assert result["groups"][1]["sum"]["total_revenue"] == 250.0
+    assert result["groups"][1]["distinct"]["outlet"] == 3 and result["groups"][1]["distinct"]["manager"] == 2
+    assert result["totals"]["distinct"]["file"] == 2
+
+    result = aggregates(backend, f"group_by=outlet&{files}&outlet=Outlet A&outlet=Outlet B")
+    assert [g["outlet"] for g in result["groups"]] == ["Outlet A", "Outlet B"]
+    assert result["totals"]["sum"]["total_revenue"] == 450.0
+
+
+def test_rollups_report_periods_changed_since_their_refresh(backend, quiet):
+    status, body = upload(backend, [record("Outlet A", month="March-24"), record("Outlet B", month="March-24")],
+                          filename="agg-march.xlsx")
+    assert status == 200
+    rollups = aggregates_of(backend, "/rollups?month_from=2024-03&month_to=2024-03")
+    assert rollups["stale"] is False and rollups["groups"]
+
+    # A row removed outside the upload path leaves the period's rollups behind
+    conn = backend.storage.connect()
+    with conn:
+        conn.execute("DELETE FROM outlets WHERE file_id = ? AND outlet = 'Outlet B'", (body["file_id"],))
+    rollups = aggregates_of(backend, "/rollups?month_from=2024-03&month_to=2024-03")
+    assert rollups["stale"] is True and rollups["stale_periods"] == ["2024-03-01"]
+    assert aggregates_of(backend, "/rollups?month_from=2024-04")["stale"] is False
+
+    upload(backend, [record("Outlet A", month="March-24")], filename="agg-march.xlsx")
+    assert aggregates_of(backend, "/rollups?month_from=2024-03&month_to=2024-03")["stale"] is False
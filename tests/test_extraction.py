@@ -0,0 +1,78 @@
+"""Outlet-block extraction from a raw P&L sheet."""
+import io
+
+import openpyxl
+
+METRIC_VALUES = {name: i + 1 for i, name in enumerate([
+    "Direct Income", "TOTAL REVENUE", "COGS", "Outlet Expenses", "EBIDTA", "Finance Cost",
+    "01-Bank Charges", "02-Interest on Borrowings", "03-Interest on Vehicle Loan", "04-MG",
+    "PBT", "WASTAGE",
+])}
+
+
+def pl_workbook(extra_rows=(), blank_rows_before_extra=0, month="June-25"):
+    """Two outlets (values v and 10v per metric) in the (Month, %) block layout."""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "P&L"
+    ws.append([None, None, "1-Alpha Manager", None, "2-Beta Manager", None])
+    ws.append([None, None, "Outlet A", None, "Outlet B", None])
+    ws.append([None, "Particulars", month, "%", month, "%"])
+    for name, value in METRIC_VALUES.items():
+        ws.append([None, name, value, None, value * 10, None])
+    for _ in range(blank_rows_before_extra):
+        ws.append([])
+    for row in extra_rows:
+        ws.append(row)
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def extract(backend, data):
+    result = backend.process_financial_data(data, "report.xlsx")
+    assert result["success"], result
+    return {r["Outlet"]: r for r in result["data"]}
+
+
+def test_values_and_period(backend, quiet):
+    rows = extract(backend, pl_workbook())
+    assert set(rows) == {"Outlet A", "Outlet B"}
+    assert rows["Outlet A"]["COGS"] == 3 and rows["Outlet B"]["COGS"] == 30
+    assert rows["Outlet A"]["Outlet Manager"] == "1-Alpha Manager"
+    assert rows["Outlet A"]["Period"] == "2025-06-01"
+
+
+def test_restated_metric_row_keeps_the_last_occurrence(backend, quiet):
+    data = pl_workbook(extra_rows=[[None, "COGS", 999, None, 9990, None]])
+    rows = extract(backend, data)
+    assert rows["Outlet A"]["COGS"] == 999
+    assert rows["Outlet B"]["COGS"] == 9990
+
+
+def test_restated_metric_row_past_blank_rows_in_window(backend, quiet):
+    data = pl_workbook(extra_rows=[[None, "COGS", 999, None, 9990, None]], blank_rows_before_extra=500)
+    rows = extract(backend, data)
+    assert rows["Outlet A"]["COGS"] == 999
+
+
+def test_normalizer_counts_are_per_upload(backend, quiet):
+    first = backend.process_financial_data(pl_workbook(month="March-25"), "report.xlsx")
+    second = backend.process_financial_data(pl_workbook(month="March-25"), "report.xlsx")
+    first, second = first["metadata"]["normalizer_cache"], second["metadata"]["normalizer_cache"]
+    # Per upload, not cumulative: the second (which also reuses the layout plan)
+    # looks up no more labels than the first and finds them all memoized
+    assert 0 < second["hits"] + second["misses"] <= first["hits"] + first["misses"]
+    assert second["misses"] == 0
+
+
+def test_text_column_survives_columnar_and_arrow_payloads(backend):
+    frame = backend.pd.DataFrame({"Outlet": ["Outlet A", "Outlet B"], "Month": [None, None],
+                                  "TOTAL REVENUE": [100, 250], "Remarks": ["ok", None]})
+    result = backend.parse_result(frame, outlets_count=2)
+    names, columns = backend.result_columns(backend.result_frame(result))
+    assert names == list(frame.columns) and columns["Remarks"] == ["ok", None]
+    schema = backend.arrow_table(result).schema
+    assert str(schema.field("Month").type) == "string"
+    assert str(schema.field("TOTAL REVENUE").type) == "double"
+    assert str(schema.field("Remarks").type) == "string"
@@ -0,0 +1,86 @@
+"""Content-addressed parse cache: keys, version invalidation, disk layout and cached jobs."""
+import io
+
+from test_extraction import pl_workbook
+
+
+def make_cache(backend, root, version, disk_bytes=1024 * 1024):
+    return backend.ParseCache(root, memory_items=4, disk_bytes=disk_bytes, version=version)
+
+
+def test_nothing_is_created_until_first_use(backend, tmp_path):
+    root = tmp_path / "cache"
+    make_cache(backend, root, "0" * 16)
+    assert not root.exists()
+
+
+def test_disk_entries_survive_a_restart_of_the_same_version(backend, tmp_path):
+    cache = make_cache(backend, tmp_path, "a" * 16)
+    cache.put("k1", {"success": True, "data": [1]})
+
+    restarted = make_cache(backend, tmp_path, "a" * 16)
+    assert restarted.get("k1") == {"success": True, "data": [1]}
+    assert restarted.stats["disk_hits"] == 1
+
+
+def test_new_version_misses_and_removes_stale_versions(backend, tmp_path):
+    old = make_cache(backend, tmp_path, "a" * 16)
+    old.put("k1", {"success": True})
+    (tmp_path / "not-a-version").mkdir()
+
+    new = make_cache(backend, tmp_path, "b" * 16)
+    assert new.get("k1") is None
+    assert new.stats["misses"] == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["b" * 16, "not-a-version"]
+
+
+def test_disk_limit_evicts_oldest_entries(backend, tmp_path):
+    cache = make_cache(backend, tmp_path, "c" * 16, disk_bytes=300)
+    for i in range(5):
+        cache.put(f"k{i}", {"payload": "x" * 100})
+    assert sum(p.stat().st_size for p in cache.directory.glob("*.json")) <= 300
+    assert (cache.directory / "k4.json").exists()
+
+
+def test_cached_processing_is_keyed_by_content(backend, quiet):
+    data = pl_workbook()
+    first = backend.process_financial_data_cached(data, "report.xlsx")
+    second = backend.process_financial_data_cached(data, "report.xlsx")
+    changed = backend.process_financial_data_cached(pl_workbook(month="July-25"), "report.xlsx")
+
+    assert first["metadata"]["parse_cache"]["hit"] is False
+    assert second["metadata"]["parse_cache"]["hit"] is True
+    assert second["data"] == first["data"]
+    assert changed["metadata"]["parse_cache"]["hit"] is False
+    assert changed["data"][0]["Period"] == "2025-07-01"
+
+
+def test_cache_hit_keeps_the_metadata_shape(backend, quiet):
+    data = pl_workbook(month="August-25")
+    miss = backend.process_financial_data_cached(data, "report.xlsx")["metadata"]
+    hit = backend.process_financial_data_cached(data, "report.xlsx")["metadata"]
+
+    assert set(hit) == set(miss)
+    assert hit["file_format"] == miss["file_format"] and hit["layout_plan"] == miss["layout_plan"]
+    assert hit["normalizer_cache"]["hits"] == hit["normalizer_cache"]["misses"] == 0
+
+
+def test_job_on_a_cache_hit_reports_its_stages(backend, quiet):
+    class RecordingQueue(backend.JobQueue):
+        def _stage(self, job_id, stage):
+            self.seen.setdefault(job_id, []).append(stage)
+            super()._stage(job_id, stage)
+
+    queue = RecordingQueue(1, 4, 60)
+    queue.seen = {}
+    data = pl_workbook(month="September-25")
+    jobs = []
+    for _ in range(2):
+        job = queue.submit(io.BytesIO(data), "report.xlsx")
+        queue._executor.submit(lambda: None).result()  # one worker: the job has run
+        jobs.append(job["job_id"])
+
+    miss, hit = jobs
+    assert queue.seen[miss][0] == "parse_cache" and "sheet_load" in queue.seen[miss]
+    assert queue.seen[hit] == ["parse_cache"]
+    assert queue.status(hit)["stage"] == queue.status(miss)["stage"] == "done"
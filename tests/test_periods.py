@@ -0,0 +1,53 @@
+"""Period derivation: from the value column's month label, never from a default month."""
+import datetime
+import io
+
+import openpyxl
+import pytest
+
+from test_extraction import METRIC_VALUES
+
+
+def outlet_sheets_workbook(value_header, outlets=2):
+    """One sheet per outlet: name, manager, then Particulars beside a single value column."""
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for k in range(outlets):
+        ws = wb.create_sheet(f"Outlet{k}")
+        ws.append([f"HSR Layout {k}"])
+        ws.append([f"{k + 1}-Manager {k}"])
+        ws.append(["Particulars", value_header])
+        for name, value in METRIC_VALUES.items():
+            ws.append([name, value * (k + 1)])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def months_and_periods(backend, value_header):
+    result = backend.process_financial_data(outlet_sheets_workbook(value_header), "outlets.xlsx")
+    assert result["success"], result
+    return {(r["Month"], r["Period"]) for r in result["data"]}
+
+
+@pytest.mark.parametrize("value_header, expected", [
+    ("June-25", ("June-25", "2025-06-01")),
+    ("July'25", ("July'25", "2025-07-01")),
+    (datetime.datetime(2025, 8, 1), ("August-25", "2025-08-01")),
+    ("June", ("June", None)),
+    ("Amount", ("", None)),
+])
+def test_outlet_sheet_period_comes_from_the_value_column(backend, quiet, value_header, expected):
+    assert months_and_periods(backend, value_header) == {expected}
+
+
+def test_upload_period_falls_back_to_the_month_label_only(backend, quiet):
+    records = [
+        {"Outlet": "A", "Month": "July-25", "Period": None},
+        {"Outlet": "B", "Month": "July-25", "Period": "2025-06-01"},
+        {"Outlet": "C", "Month": "", "Period": None},
+        {"Outlet": "D", "Month": "June", "Period": None},
+    ]
+    frame = backend.outlet_db_frame(records)
+    assert list(frame["period"]) == ["2025-07-01", "2025-06-01", None, None]
+    assert list(backend.outlet_period_keys(frame)) == ["2025-07-01", "2025-06-01", "", "June"]
@@ -0,0 +1,86 @@
+"""Storage backends: re-sending an upload leaves the stored rows unchanged."""
+import uuid
+
+import pytest
+
+from test_upload_keys import record
+
+
+def upload_frame(backend, file_id):
+    records = [record("Outlet A", month="May-25"), record("Outlet B", month="May-25", manager="2-Beta Manager"),
+               record("Outlet A", month="June-25", revenue=200.0)]
+    frame = backend.outlet_db_frame(records)
+    frame.insert(0, "file_id", file_id)
+    return frame
+
+
+def file_record(file_id):
+    return {"id": file_id, "file_name": "storage-test.xlsx", "file_path": "uploads/storage-test.xlsx",
+            "file_size": None, "processed": True, "uploaded_by": None, "metadata": {"outlets_count": 3}}
+
+
+def test_storage_base_class_is_abstract(backend):
+    with pytest.raises(TypeError):
+        backend.Storage()
+
+
+def test_sqlite_upload_is_idempotent(backend, quiet):
+    store = backend.storage
+    assert store.name == "sqlite"
+    file_id = str(uuid.uuid4())
+    first = store.write_upload(file_record(file_id), upload_frame(backend, file_id))
+    rows = store.outlet_frame(file_id=file_id)
+    rollups = store.period_rollups()
+
+    second = store.write_upload(file_record(file_id), upload_frame(backend, file_id))
+    assert first["rows"] == second["rows"] == 3 and second["replaced"] == 3
+    assert store.outlet_frame(file_id=file_id).equals(rows)
+    assert store.period_rollups().equals(rollups)
+    files = store.connect().execute("SELECT COUNT(*) FROM uploaded_files WHERE id = ?", (file_id,)).fetchone()[0]
+    assert files == 1
+
+
+def test_copy_upload_is_idempotent(backend, quiet):
+    if backend.psycopg2 is None or not backend.DATABASE_URL:
+        pytest.skip("set TEST_DATABASE_URL (and install psycopg2) to test the COPY path")
+    file_id = str(uuid.uuid4())
+
+    def stored():
+        with backend.pg_transaction() as cur:
+            cur.execute("SELECT outlet, period_key, total_revenue FROM public.outlets "
+                        "WHERE file_id = %s ORDER BY outlet, period_key", (file_id,))
+            rows = cur.fetchall()
+            cur.execute("SELECT COUNT(*) FROM public.uploaded_files WHERE id = %s", (file_id,))
+            return rows, cur.fetchone()[0]
+
+    try:
+        backend.write_upload_copy(file_record(file_id), upload_frame(backend, file_id))
+        first = stored()
+        stats = backend.write_upload_copy(file_record(file_id), upload_frame(backend, file_id))
+        assert stats["rows"] == stats["replaced"] == 3
+        assert stored() == first and first[1] == 1 and len(first[0]) == 3
+    finally:
+        with backend.pg_transaction() as cur:
+            cur.execute("DELETE FROM public.uploaded_files WHERE id = %s", (file_id,))
+            cur.execute("SELECT public.refresh_outlet_rollups(ARRAY['2025-05-01', '2025-06-01']::date[])")
+
+
+def test_sqlite_migration_keeps_the_latest_row_per_key(backend, quiet, tmp_path):
+    path = str(tmp_path / "old.sqlite3")
+    conn = backend.sqlite3.connect(path)
+    # A store from before period_key: unique on (file_id, outlet, month) only
+    conn.executescript("""
+        CREATE TABLE uploaded_files (id TEXT PRIMARY KEY, file_name TEXT NOT NULL);
+        CREATE TABLE outlets (id INTEGER PRIMARY KEY, file_id TEXT, outlet TEXT NOT NULL,
+                              outlet_manager TEXT, month TEXT NOT NULL, period TEXT, total_revenue REAL);
+        CREATE UNIQUE INDEX idx_outlets_file_outlet_month ON outlets(file_id, outlet, month);
+        INSERT INTO uploaded_files VALUES ('f', 'old.xlsx');
+        INSERT INTO outlets (file_id, outlet, month, period, total_revenue) VALUES
+            ('f', 'A', 'June-25', '2025-06-01', 1), ('f', 'A', 'Jun 2025', '2025-06-01', 2),
+            ('f', 'B', 'June-25', '2025-06-01', 3);
+    """)
+    conn.close()
+
+    store = backend.SQLiteStorage(path)
+    rows = store.connect().execute("SELECT outlet, period_key, total_revenue FROM outlets ORDER BY outlet").fetchall()
+    assert rows == [("A", "2025-06-01", 2.0), ("B", "2025-06-01", 3.0)]
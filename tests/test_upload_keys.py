@@ -0,0 +1,78 @@
+"""Outlet-row keys of an upload: duplicate handling and the (file_id, outlet, period_key) upsert key."""
+import uuid
+
+import pytest
+
+
+def record(outlet, month="June-25", revenue=100.0, manager="1-Alpha Manager", period=None):
+    return {"Outlet": outlet, "Outlet Manager": manager, "Month": month, "Period": period,
+            "TOTAL REVENUE": revenue, "COGS": revenue / 2}
+
+
+def upload(backend, outlets, filename="report.xlsx", **extra):
+    response = backend.app.test_client().post(
+        "/upload-to-supabase", json={"outlets": outlets, "filename": filename, **extra})
+    return response.status_code, response.get_json()
+
+
+def stored(backend, file_id):
+    return backend.storage.outlet_frame(file_id=file_id, fields=["Outlet", "Month", "Period", "TOTAL REVENUE"])
+
+
+def test_only_identical_records_are_dropped(backend, quiet):
+    records = [record("Outlet A"), record("Outlet B"), record("Outlet A")]
+    frame = backend.outlet_db_frame(records)
+    assert list(frame["outlet"]) == ["Outlet A", "Outlet B"]
+    assert frame.attrs["duplicates_dropped"] == 1
+
+
+def test_conflicting_records_for_one_key_are_rejected(backend, quiet):
+    records = [record("", revenue=1.0), record("", revenue=2.0)]
+    with pytest.raises(ValueError, match="conflicting"):
+        backend.outlet_db_frame(records)
+    status, body = upload(backend, records, filename="conflict.xlsx")
+    assert status == 400 and "conflicting" in body["error"]
+
+
+def test_same_month_name_in_different_years_is_kept(backend, quiet):
+    records = [record("Outlet A", month="June-24"), record("Outlet A", month="June-25")]
+    frame = backend.outlet_db_frame(records)
+    assert list(frame["period"]) == ["2024-06-01", "2025-06-01"]
+
+    status, body = upload(backend, records, filename="two-years.xlsx")
+    assert status == 200 and body["outlets_inserted"] == 2
+    assert sorted(stored(backend, body["file_id"])["Period"]) == ["2024-06-01", "2025-06-01"]
+
+
+def test_month_is_the_key_only_without_a_period(backend, quiet):
+    records = [record("Outlet A", month="Amount"), record("Outlet A", month="Total")]
+    frame = backend.outlet_db_frame(records)
+    assert list(backend.outlet_period_keys(frame)) == ["Amount", "Total"]
+
+
+def test_corrected_upload_replaces_the_file(backend, quiet):
+    first = [record("Outlet A", month="May-25"), record("Outlet B", month="May-25")]
+    status, body = upload(backend, first, filename="may.xlsx")
+    assert status == 200
+    file_id = body["file_id"]
+
+    corrected = [record("Outlet A", month="May-25", revenue=150.0)]
+    status, body = upload(backend, corrected, filename="may.xlsx")
+    assert status == 200 and body["file_id"] == file_id
+    rows = stored(backend, file_id)
+    assert list(rows["Outlet"]) == ["Outlet A"] and list(rows["TOTAL REVENUE"]) == [150.0]
+
+
+def test_posted_file_id_must_name_an_existing_file(backend, quiet):
+    status, body = upload(backend, [record("Outlet A")], file_id="not-a-uuid")
+    assert status == 400
+    unknown = str(uuid.uuid4())
+    status, body = upload(backend, [record("Outlet A")], file_id=unknown)
+    assert status == 400 and "Unknown file_id" in body["error"]
+    assert not backend.storage.has_file(unknown)
+
+    status, body = upload(backend, [record("Outlet A")], filename="known.xlsx")
+    file_id = body["file_id"]
+    status, body = upload(backend, [record("Outlet A", revenue=7.0)], filename="renamed.xlsx", file_id=file_id)
+    assert status == 200 and body["file_id"] == file_id
+    assert list(stored(backend, file_id)["TOTAL REVENUE"]) == [7.0]